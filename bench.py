@@ -0,0 +1,57 @@
+#!/usr/bin/env python2
+from __future__ import print_function
+
+import argparse
+import importlib
+
+from robot.vision.benchmark import STOCK, Benchmark, Variant, report
+
+
+def load_variant(spec):
+    """Import a Variant, given as module.path:NAME."""
+    module, _, name = spec.partition(':')
+    variant = getattr(importlib.import_module(module), name)
+    if not isinstance(variant, Variant):
+        raise argparse.ArgumentTypeError('{} is not a Variant'.format(spec))
+    return variant
+
+
+def parse_args():
+    """Parse the benchmark's commandline arguments."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--frames',
+        type=int,
+        default=300,
+        help='How many frames to time each benchmark on. Default is 300')
+    parser.add_argument(
+        '--noise',
+        type=float,
+        default=4.0,
+        help='How much sensor noise to add to the scenes. Default is 4.0')
+    parser.add_argument(
+        '--color-table',
+        action='store_true',
+        default=False,
+        help='Also benchmark classifying pixels with a color lookup table.')
+    parser.add_argument(
+        '--variant',
+        type=load_variant,
+        action='append',
+        default=[],
+        help='Also benchmark the Variant given as module.path:NAME.')
+    return parser.parse_args()
+
+
+def main(args):
+    """Benchmark the vision pipeline on synthetic scenes."""
+    variants = [STOCK]
+    if args.color_table:
+        variants.append(Variant('color table', color_table=True))
+    variants.extend(args.variant)
+    benchmark = Benchmark(frames=args.frames, noise=args.noise)
+    print(report(benchmark.run(variants)))
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,68 @@
+#!/usr/bin/env python2
+from __future__ import division, print_function
+
+import argparse
+
+from robot.nodes.harness import BrainHarness
+
+
+def parse_args():
+    """Parse the Brain replay's commandline arguments."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        'target',
+        type=int,
+        nargs='?',
+        default=5,
+        help='The target graph node. Default is 5')
+    parser.add_argument(
+        '--recording',
+        default=None,
+        help='Feed the Brain what the vision pipeline finds in this '
+             'recording, without extension, instead of the scripted course.')
+    parser.add_argument(
+        '--event-driven',
+        action='store_true',
+        default=False,
+        help='Step the brain on sensor data, instead of polling at 100 Hz.')
+    parser.add_argument(
+        '--coalesce',
+        action='store_true',
+        default=False,
+        help='Only send wheel commands that change something, and rate limit '
+             'them.')
+    parser.add_argument(
+        '--quiet',
+        '-q',
+        action='store_true',
+        default=False,
+        help='Only print the summary, not every transition.')
+    return parser.parse_args()
+
+
+def main(args):
+    """Run the Brain through a whole course on a virtual clock."""
+    harness = BrainHarness(target=args.target,
+                           event_driven=args.event_driven,
+                           coalesce=args.coalesce)
+    if args.recording is None:
+        run = harness.run()
+    else:
+        from robot.vision.replay import Replay
+        run = harness.replay(Replay(args.recording).run())
+    harness.stop()
+
+    if not args.quiet:
+        for event in run.events:
+            if event.kind == 'state':
+                print('{:8.3f} {}'.format(event.time, event.value.name))
+    commands = sum(1 for event in run.events if event.kind == 'wheels')
+    print('Ended in {} after {:.2f}s of robot time, in {:.3f}s ({:.0f}x), '
+          'from {} frames and {} wheel commands.'.format(
+              run.state.name, run.seconds, run.elapsed,
+              run.seconds / run.elapsed if run.elapsed else 0, run.frames,
+              commands))
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,36 @@
+#!/usr/bin/env python2
+from __future__ import print_function
+
+import argparse
+
+from robot.vision.blob_check import compare, decoded, report
+from robot.vision.scenes import scenes
+
+
+def parse_args():
+    """Parse the blob comparison's commandline arguments."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        'recording',
+        nargs='*',
+        help='Compare on the frames of this recording, without extension. '
+             'The synthetic scenes are always compared on.')
+    parser.add_argument(
+        '--noise',
+        type=float,
+        default=4.0,
+        help='How much sensor noise to add to the scenes. Default is 4.0')
+    return parser.parse_args()
+
+
+def main(args):
+    """Compare the detectors' blobs with the contours they replaced."""
+    images = [scene.image for scene in scenes(args.noise)]
+    print(report('scenes', compare(images)))
+    for path in args.recording:
+        print()
+        print(report(path, compare(decoded(path))))
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -2,7 +2,8 @@
 import sys
 sys.path.append('..')
 
-from robot.nodes import IrPlotter, IrSpammer, NodeManager
+from robot.nodes import NodeManager
+from robot.nodes.ir_sensor import IrPlotter, IrSpammer
 
 
 def main():
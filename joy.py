@@ -1,15 +1,31 @@
 #!/usr/bin/env python2
+import argparse
 import sys
 
-from robot.nodes import Joystick, NodeManager
+from robot.nodes import NodeManager
+from robot.nodes.joystick import Joystick
+from robot.vision.frame_ring import RING_PATH
 
 
-def main():
+def parse_args():
+    """Parse the joystick's commandline arguments."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--frame-ring',
+        nargs='?',
+        const=RING_PATH,
+        default=None,
+        help='Preview the frames a running robot already decoded into the '
+             'shared memory frame ring. Default path is ' + RING_PATH)
+    return parser.parse_args()
+
+
+def main(args):
     """Control the robot with the WASD keys."""
     manager = NodeManager()
-    manager.add_node(Joystick(sys.stdin.fileno()))
+    manager.add_node(Joystick(sys.stdin.fileno(), frame_ring=args.frame_ring))
     manager.spin()
 
 
 if __name__ == "__main__":
-    main()
+    main(parse_args())
@@ -1,6 +1,16 @@
 #!/usr/bin/env python2
 import argparse
-from robot import Robot
+from robot.robot import Robot
+from robot.graph import COURSE
+
+
+def course_node(value):
+    """Parse a node of the course graph."""
+    node = int(value)
+    if node not in COURSE:
+        raise argparse.ArgumentTypeError(
+            '{} is not a node of the course'.format(value))
+    return node
 
 
 def parse_args():
@@ -13,17 +23,88 @@ def parse_args():
         default=False,
         help='Increase robot\'s volume.')
     parser.add_argument(
-        'target',
+        '--color-table',
+        action='store_true',
+        default=False,
+        help='Classify pixels with a precomputed color lookup table.')
+    parser.add_argument(
+        '--latest-frame',
+        action='store_true',
+        default=False,
+        help='Only process the newest camera frame, dropping stale frames.')
+    parser.add_argument(
+        '--threads',
+        type=int,
+        default=0,
+        help='Run the cameras on a pool of this many threads. Default is 0')
+    parser.add_argument(
+        '--single-process',
+        action='store_true',
+        default=False,
+        help='Run every node in one process, on an in-memory topic bus.')
+    parser.add_argument(
+        '--frame-ring',
+        action='store_true',
+        default=False,
+        help='Decode each frame once, into shared memory for every reader.')
+    parser.add_argument(
+        '--stages',
         type=int,
         default=0,
-        help='The target graph node. Default is 0'
+        help='Pipeline decoding, converting, and detecting frames across '
+             'processes, with this many frames waiting per stage. Default is '
+             '0, for one frame at a time.')
+    parser.add_argument(
+        '--event-driven',
+        action='store_true',
+        default=False,
+        help='Step the brain on sensor data, instead of polling at 100 Hz.')
+    parser.add_argument(
+        '--trace',
+        action='store_true',
+        default=False,
+        help='Print histograms of how long frames take to reach the wheels.')
+    parser.add_argument(
+        '--coalesce',
+        action='store_true',
+        default=False,
+        help='Only send wheel commands that change something, and rate limit '
+             'them.')
+    parser.add_argument(
+        '--localize',
+        action='store_true',
+        default=False,
+        help='Estimate where the robot is on the course map with a particle '
+             'filter.')
+    parser.add_argument(
+        '--governor',
+        action='store_true',
+        default=False,
+        help="Run the detectors the robot isn't steering by less often when "
+             'the detectors fall behind the camera.')
+    parser.add_argument(
+        'target',
+        type=course_node,
+        default=0,
+        help='The target node of the course graph. Default is 0'
     )
     return parser.parse_args()
 
 
 def main(args):
     """Main entry point for robot."""
-    robot = Robot(target=args.target, verbose=args.verbose)
+    robot = Robot(target=args.target, verbose=args.verbose,
+                  color_table=args.color_table,
+                  latest_only=args.latest_frame,
+                  threads=args.threads,
+                  single_process=args.single_process,
+                  frame_ring=args.frame_ring,
+                  stages=args.stages,
+                  event_driven=args.event_driven,
+                  trace=args.trace,
+                  coalesce=args.coalesce,
+                  localize=args.localize,
+                  governor=args.governor)
     robot.start()
 
 
@@ -0,0 +1,25 @@
+#!/usr/bin/env python2
+import argparse
+
+from robot.nodes import NodeManager
+from robot.nodes.recorder import FrameRecorder
+
+
+def parse_args():
+    """Parse the recorder's commandline arguments."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        'path',
+        help='Where to save the recording, without extension.')
+    return parser.parse_args()
+
+
+def main(args):
+    """Record the camera feed and robot state until interrupted."""
+    manager = NodeManager()
+    manager.add_node(FrameRecorder(args.path))
+    manager.spin()
+
+
+if __name__ == "__main__":
+    main(parse_args())
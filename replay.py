@@ -0,0 +1,57 @@
+#!/usr/bin/env python2
+from __future__ import division, print_function
+
+import argparse
+import time
+
+from robot.vision.replay import Replay
+
+
+def parse_args():
+    """Parse the replay's commandline arguments."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        'path',
+        help='The recording to replay, without extension.')
+    parser.add_argument(
+        '--realtime',
+        action='store_true',
+        default=False,
+        help='Replay frames at their original timing.')
+    parser.add_argument(
+        '--color-table',
+        action='store_true',
+        default=False,
+        help='Classify pixels with a precomputed color lookup table.')
+    parser.add_argument(
+        '--threads',
+        type=int,
+        default=0,
+        help='Run the cameras on a pool of this many threads. Default is 0')
+    parser.add_argument(
+        '--quiet',
+        '-q',
+        action='store_true',
+        default=False,
+        help='Only print the summary, not every published message.')
+    return parser.parse_args()
+
+
+def main(args):
+    """Replay a recording through the vision pipeline, without ROS."""
+    replay = Replay(args.path, realtime=args.realtime,
+                    color_table=args.color_table, threads=args.threads)
+    start = time.time()
+    outputs = replay.run()
+    elapsed = time.time() - start
+
+    if not args.quiet:
+        for output in outputs:
+            print('{:6d} {:.3f} {}: {}'.format(*output))
+    frames = len(replay.recording)
+    print('Replayed {} frames in {:.2f}s ({:.1f} fps), {} messages.'.format(
+        frames, elapsed, frames / elapsed if elapsed else 0, len(outputs)))
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -1,3 +1,5 @@
-"""The module containing our robot code."""
+"""The module containing our robot code.
 
-from .robot import Robot
+The Robot itself lives in robot.robot, and isn't imported here, so the
+parts of the robot that don't need ROS can be used without it.
+"""
@@ -0,0 +1,180 @@
+from __future__ import division, print_function
+
+import threading
+import time
+
+# Flushes rate limited messages for every CoalescingPublisher not given a
+# scheduler of its own. Started the first time it's needed, so it runs in the
+# Node's process rather than the parent's.
+shared_scheduler = None
+
+
+def flush_scheduler():
+    """Get the shared scheduler, starting it if it isn't running yet."""
+    global shared_scheduler
+    if shared_scheduler is None:
+        # Importing robot.nodes imports the Brain, which imports us, so only
+        # import the scheduler once it's needed.
+        from robot.nodes.scheduler import Scheduler
+        shared_scheduler = Scheduler()
+        shared_scheduler.start()
+    return shared_scheduler
+
+
+class CoalescingPublisher(object):
+    """Wrap a publisher to leave out messages that don't tell anybody much.
+
+    Messages whose data is the same as the last one sent aren't sent again
+    until the keepalive period has passed, and bursts of messages faster than
+    the max rate are coalesced into the newest one, which is sent once the
+    rate allows. Quacks like a rospy.Publisher.
+
+    Only wrap topics whose subscribers care about the latest value, not about
+    every message arriving.
+    """
+
+    def __init__(self, publisher, data_class=None, keepalive=1.0,
+                 max_rate=None, traced=False, scheduler=None):
+        """Create a CoalescingPublisher.
+
+        :param publisher: The publisher to send messages with.
+        :type publisher: rospy.Publisher
+        :param data_class: The message type, for publish_data(), defaults to
+        None
+        :type data_class: A ROS message class, optional
+        :param keepalive: Send unchanged data again after this long, in
+        seconds. Zero sends every message, and None never resends unchanged
+        data, defaults to 1.0
+        :type keepalive: float, optional
+        :param max_rate: The most messages to send a second, defaults to no
+        limit.
+        :type max_rate: float, optional
+        :param traced: Whether the messages are traced, in which case their
+        stamp and trace id don't count as a change. See robot.tracing,
+        defaults to False
+        :type traced: bool, optional
+        :param scheduler: What sends coalesced messages once the rate allows,
+        and tells the time, defaults to a scheduler shared by the whole
+        process.
+        :type scheduler: robot.nodes.scheduler.Scheduler, optional
+        """
+        self.publisher = publisher
+        self.data_class = data_class
+        self.msg = None
+        self.keepalive = keepalive
+        self.interval = 1 / max_rate if max_rate else 0.0
+        self.traced = traced
+        self.scheduler = scheduler
+        self.lock = threading.Lock()
+        self.last = None
+        self.last_sent = None
+        # The newest message waiting on the rate limit, and the flush that
+        # will send it.
+        self.pending = None
+        self.flush_handle = None
+        # How many messages we were given, sent, and didn't send because they
+        # were unchanged, or were coalesced into a newer message.
+        self.given = 0
+        self.sent = 0
+        self.suppressed = 0
+        self.coalesced = 0
+
+    def key(self, data):
+        """What has to change about the data for it to be worth sending."""
+        if self.traced:
+            data = data[:-2]
+        if isinstance(data, list):
+            data = tuple(data)
+        return data
+
+    def now(self):
+        """Get the current time, on our scheduler's clock."""
+        if self.scheduler is None:
+            return time.time()
+        return self.scheduler.clock.time()
+
+    def publish(self, msg, force=False):
+        """Publish a message, unless it's unchanged or too soon.
+
+        :param msg: The message.
+        :param force: Send the message now, no matter what, defaults to False
+        :type force: bool, optional
+        """
+        now = self.now()
+        key = self.key(msg.data)
+        with self.lock:
+            self.given += 1
+            if self.pending is not None:
+                # Whatever was waiting is out of date now.
+                self.pending = None
+                self.flush_handle.cancel()
+                self.flush_handle = None
+                self.coalesced += 1
+            if not force and self.last_sent is not None:
+                if key == self.last and (
+                        self.keepalive is None or
+                        now - self.last_sent < self.keepalive):
+                    self.suppressed += 1
+                    return
+                wait = self.last_sent + self.interval - now
+                if wait > 0:
+                    self.pending = (msg, key)
+                    if self.scheduler is None:
+                        self.scheduler = flush_scheduler()
+                    self.flush_handle = self.scheduler.call_later(wait,
+                                                                  self.flush)
+                    return
+            self.send(msg, key, now)
+
+    def publish_data(self, data, force=False):
+        """Publish the given data, reusing the same message every time.
+
+        rospy serializes a message as it's published, so it's safe to reuse.
+        On a robot.nodes.bus.Bus, a subscriber that hasn't got to an earlier
+        message yet gets the newest data instead, which is all it wants
+        anyway.
+
+        :param data: The message's data.
+        :param force: Send the message now, no matter what, defaults to False
+        :type force: bool, optional
+        """
+        if self.msg is None:
+            self.msg = self.data_class()
+        self.msg.data = data
+        self.publish(self.msg, force)
+
+    def send(self, msg, key, now):
+        """Send a message. Call with the lock held."""
+        self.publisher.publish(msg)
+        self.last = key
+        self.last_sent = now
+        self.sent += 1
+
+    def flush(self):
+        """Send the message that was waiting on the rate limit."""
+        with self.lock:
+            if self.pending is None:
+                return
+            msg, key = self.pending
+            self.pending = None
+            self.flush_handle = None
+            self.send(msg, key, self.now())
+
+    @property
+    def saved(self):
+        """How many messages we didn't send."""
+        return self.suppressed + self.coalesced
+
+    def report(self, name):
+        """Summarize how many messages were saved, under the given name."""
+        return ('{}: sent {} of {} messages, {} unchanged, {} coalesced'
+                .format(name, self.sent, self.given, self.suppressed,
+                        self.coalesced))
+
+    def unregister(self):
+        """Stop publishing."""
+        with self.lock:
+            if self.flush_handle is not None:
+                self.flush_handle.cancel()
+            self.pending = None
+        self.publisher.unregister()
@@ -13,14 +13,15 @@ TOPIC = {
     'IR_FEED': '/geekbot/ir_cm',
     # Current robot state.
     'ROBOT_STATE': '/geekbot/state',
-    # Lane position in the viewing window.
-    'LANE_CENTROID': '/geekbot/lane_centroid',
-    # Notification that we've reached a point of interest.
-    'POINT_OF_INTEREST': '/geekbot/encounter_interest',
-    # Goal position in the viewing window.
-    'GOAL_CENTROID': '/geekbot/goal_centroid',
-    # Centroid of graph node.
-    'NODE_CENTROID': '/geekbot/node_centroid',
+    # Everything the cameras found in each frame: the lane, goal, and node
+    # positions in the viewing window, how confident the lane tracker is,
+    # and the points of interest we've reached. See robot.summary.
+    'VISION_SUMMARY': '/geekbot/vision_summary',
+    # When traced frames pass through each node, for the LatencyCollector.
+    'TRACE': '/geekbot/trace',
+    # Where the Localizer thinks the robot is on the course map, and how
+    # sure it is. See robot.nodes.localizer.
+    'POSE': '/geekbot/pose',
 }
 
 # Camera POI strings
@@ -35,35 +36,6 @@ POI = {
     'NO_OBSTACLE': 'no obstacle',
 }
 
-GRAPH_PATH = {
-    0: (0,),
-    1: (0, 1),
-    2: (0, 1, 2),
-    3: (0, 1, 3),
-    4: (0, 1, 4),
-    5: (0, 1, 4, 5),
-}
-
-# Possible left turns on pruned graph.
-LEFT_TURN = {
-    (1, 4),
-    (4, 5),
-}
-
-# Possible right turns on pruned graph.
-RIGHT_TURN = {
-    (1, 3),
-}
-
-# Possible front "turns" on pruned graph.
-FORWARD = {
-    (0, 1),
-    (1, 2),
-    (1, 3),
-    (1, 4),
-    (4, 5),
-}
-
 
 class State(Enum):
     """Possible robot states.
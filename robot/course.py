@@ -0,0 +1,61 @@
+from __future__ import division, print_function
+
+import math
+import os
+from collections import namedtuple
+
+import cv2
+
+# The course map: a white lane on a black floor, seen from above.
+MAP_PATH = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'experiments', 'map.png')
+# How big the course map is, in map pixels per cm of floor.
+PIXELS_PER_CM = 2.0
+# The fastest the robot turns its wheels, which the Wheels node scales the
+# wheel speeds to a percentage of.
+MAX_WHEEL_SPEED = 10.0
+
+# How far ahead of the axle the bottom and top edges of the webcam's frame
+# land on the floor, and how wide a strip of floor they span, in cm.
+NEAR = 20.0
+NEAR_WIDTH = 100.0
+FAR = 150.0
+FAR_WIDTH = 300.0
+
+# Where the robot is on the floor, in cm from the top left corner of the
+# map, with y pointing down the map. The heading is in radians from the x
+# axis, so positive turns are clockwise on the map.
+Pose = namedtuple('Pose', 'x y heading')
+
+# The middle of the lane at the bottom of the map, heading up it.
+START = Pose(140.0, 195.0, -math.pi / 2)
+
+# Where the points of interest are on the course map, in cm, by summarize()
+# keyword (e.g. stoplight or graph_node). The map only has the lane on it so
+# far. robot.graph.COURSE lays its nodes out from the lot exit, which isn't
+# on the map, so there's nowhere to put them yet.
+LANDMARKS = {}
+
+# The course maps loaded in this process, by path.
+floors = {}
+
+
+def load_floor(path=MAP_PATH):
+    """Load a course map, once per process.
+
+    :param path: The course map image, defaults to MAP_PATH
+    :type path: str, optional
+    :rtype: An OpenCV BGR image.
+    """
+    if path not in floors:
+        floor = cv2.imread(path, cv2.IMREAD_COLOR)
+        if floor is None:
+            raise IOError('Could not read the course map {}'.format(path))
+        floors[path] = floor
+    return floors[path]
+
+
+def quantize(speed):
+    """Round a wheel speed the way the Wheels node sends it."""
+    percent = int(speed / MAX_WHEEL_SPEED * 100)
+    return max(-100, min(100, percent)) * MAX_WHEEL_SPEED / 100
@@ -0,0 +1,293 @@
+from __future__ import division, print_function
+
+import heapq
+import itertools
+import math
+from collections import namedtuple
+
+from enum import Enum
+
+
+class Turn(Enum):
+    """Which way to rotate at a node to face the next one."""
+
+    FORWARD = 0
+    LEFT = 1
+    RIGHT = 2
+
+
+# Turns gentler than this, in radians, are left to line following rather
+# than rotating in place.
+FORWARD_ANGLE = math.radians(30)
+
+# One edge of a route: at the start node, make the turn, rotating by angle
+# radians, then drive to the end node.
+Leg = namedtuple('Leg', 'start end turn angle')
+
+
+def wrap(angle):
+    """Wrap an angle, in radians, into (-pi, pi]."""
+    angle = math.fmod(angle, 2 * math.pi)
+    if angle > math.pi:
+        angle -= 2 * math.pi
+    elif angle <= -math.pi:
+        angle += 2 * math.pi
+    return angle
+
+
+def classify(angle):
+    """Work out which way to turn to rotate by an angle.
+
+    :param angle: The angle, in radians counterclockwise.
+    :type angle: float
+    :returns: A (Turn, angle) tuple, with the angle to rotate by in radians.
+    """
+    angle = wrap(angle)
+    if abs(angle) < FORWARD_ANGLE:
+        return Turn.FORWARD, abs(angle)
+    return (Turn.LEFT if angle > 0 else Turn.RIGHT), abs(angle)
+
+
+def walk(previous, target):
+    """Follow a shortest path tree back from a node to its root.
+
+    :param previous: The node before each node on its path.
+    :type previous: dict
+    :param target: Where the path ends.
+    :returns: The path's nodes, from the root to the target.
+    :rtype: tuple
+    """
+    path = []
+    node = target
+    while node is not None:
+        path.append(node)
+        node = previous[node]
+    return tuple(reversed(path))
+
+
+class CourseGraph(object):
+    """The course's nodes and the edges between them, and routes through it.
+
+    Routes are computed lazily: each path is found with A* the first time
+    it's asked for, and remembered, along with the turns on it. Nothing is
+    computed up front, so a robot that only ever asks for one route never
+    pays for the rest, however big the course. tree() finds every shortest
+    path from a node at once, with Dijkstra's algorithm, and paths from a
+    node whose tree has been computed are looked up in it instead.
+    """
+
+    def __init__(self, nodes, edges, start=0, heading=None):
+        """Create a CourseGraph.
+
+        :param nodes: The position of each node, in cm, with x east and y
+        north.
+        :type nodes: A dict of node to (x, y) tuples.
+        :param edges: The edges, which can be driven either way. Each edge
+        costs its length, unless it's given a weight.
+        :type edges: An iterable of (a, b) or (a, b, weight) tuples.
+        :param start: Where routes start, unless they're told otherwise,
+        defaults to 0
+        :type start: A node, optional
+        :param heading: Which way the robot faces when it reaches the start,
+        in radians counterclockwise from east, defaults to facing its first
+        leg.
+        :type heading: float, optional
+        """
+        self.nodes = dict(nodes)
+        self.neighbors = dict((node, {}) for node in self.nodes)
+        for edge in edges:
+            a, b = edge[:2]
+            weight = edge[2] if len(edge) > 2 else self.distance(a, b)
+            if weight < 0:
+                raise ValueError('Edge {} has a negative weight'.format(edge))
+            self.neighbors[a][b] = weight
+            self.neighbors[b][a] = weight
+        self.start = start
+        self.heading = heading
+        # A* only finds shortest paths if its heuristic never overestimates,
+        # so scale the straight line distance by the cheapest edge per cm.
+        ratios = [weight / self.distance(a, b)
+                  for a, neighbors in self.neighbors.items()
+                  for b, weight in neighbors.items()
+                  if self.distance(a, b) > 0]
+        self.heuristic = min(ratios + [1.0])
+        # The shortest path trees computed so far, by source, as (cost,
+        # previous node) dicts.
+        self.trees = {}
+        # The paths, routes, and turns worked out so far.
+        self.paths = {}
+        self.routes = {}
+        self.turns = {}
+
+    def __contains__(self, node):
+        """Whether the node is on the course."""
+        return node in self.nodes
+
+    def __len__(self):
+        """How many nodes are on the course."""
+        return len(self.nodes)
+
+    def distance(self, a, b):
+        """The straight line distance between two nodes, in cm."""
+        (ax, ay), (bx, by) = self.nodes[a], self.nodes[b]
+        return math.hypot(bx - ax, by - ay)
+
+    def bearing(self, a, b):
+        """The direction from one node to another, in radians
+        counterclockwise from east."""
+        (ax, ay), (bx, by) = self.nodes[a], self.nodes[b]
+        return math.atan2(by - ay, bx - ax)
+
+    def check(self, node):
+        """Raise a ValueError unless the node is on the course."""
+        if node not in self.nodes:
+            raise ValueError('{} is not a node of the course'.format(node))
+
+    def tree(self, source):
+        """Find the shortest path from a node to every other, with Dijkstra's
+        algorithm.
+
+        :param source: Where the paths start.
+        :returns: A (cost, previous) tuple of dicts, giving the cost of the
+        shortest path to each reachable node, and the node before it on the
+        path.
+        """
+        self.check(source)
+        if source in self.trees:
+            return self.trees[source]
+        cost = {source: 0.0}
+        previous = {source: None}
+        done = set()
+        # Ties are broken by insertion order, so nodes are never compared.
+        order = itertools.count()
+        heap = [(0.0, next(order), source)]
+        while heap:
+            so_far, _, node = heapq.heappop(heap)
+            if node in done:
+                continue
+            done.add(node)
+            for neighbor, weight in self.neighbors[node].items():
+                total = so_far + weight
+                if total < cost.get(neighbor, float('inf')):
+                    cost[neighbor] = total
+                    previous[neighbor] = node
+                    heapq.heappush(heap, (total, next(order), neighbor))
+        self.trees[source] = (cost, previous)
+        return self.trees[source]
+
+    def astar(self, source, target):
+        """Find the shortest path between two nodes, with A*.
+
+        :returns: The path's nodes, from the source to the target, or None if
+        there isn't one.
+        :rtype: tuple
+        """
+        self.check(source)
+        self.check(target)
+        cost = {source: 0.0}
+        previous = {source: None}
+        order = itertools.count()
+        heap = [(0.0, next(order), source)]
+        done = set()
+        while heap:
+            _, _, node = heapq.heappop(heap)
+            if node == target:
+                return walk(previous, target)
+            if node in done:
+                continue
+            done.add(node)
+            for neighbor, weight in self.neighbors[node].items():
+                total = cost[node] + weight
+                if total < cost.get(neighbor, float('inf')):
+                    cost[neighbor] = total
+                    previous[neighbor] = node
+                    estimate = (total + self.heuristic *
+                                self.distance(neighbor, target))
+                    heapq.heappush(heap, (estimate, next(order), neighbor))
+        return None
+
+    def path(self, target, source=None):
+        """Get the shortest path between two nodes.
+
+        :param target: Where the path ends.
+        :param source: Where the path starts, defaults to the start.
+        :returns: The path's nodes, from the source to the target.
+        :rtype: tuple
+        :raises ValueError: If there's no such path.
+        """
+        if source is None:
+            source = self.start
+        key = (source, target)
+        if key not in self.paths:
+            if source in self.trees:
+                self.check(target)
+                _, previous = self.trees[source]
+                path = walk(previous, target) if target in previous else None
+            else:
+                path = self.astar(source, target)
+            if path is None:
+                raise ValueError('There is no path from {} to {}'.format(
+                    source, target))
+            self.paths[key] = path
+        return self.paths[key]
+
+    def turn(self, previous, node, following):
+        """Work out which way to turn at a node.
+
+        :param previous: The node we came from.
+        :param node: The node we're at.
+        :param following: The node we're heading for next.
+        :returns: A (Turn, angle) tuple, with the angle to rotate by in
+        radians.
+        """
+        key = (previous, node, following)
+        if key not in self.turns:
+            self.turns[key] = classify(self.bearing(node, following) -
+                                       self.bearing(previous, node))
+        return self.turns[key]
+
+    def route(self, target, source=None):
+        """Get the legs of the shortest route between two nodes.
+
+        The first leg's turn is from the heading the robot reaches the start
+        with, and from any other source, it's left to line following.
+
+        :param target: Where the route ends.
+        :param source: Where the route starts, defaults to the start.
+        :rtype: A tuple of Leg tuples.
+        :raises ValueError: If there's no such route.
+        """
+        if source is None:
+            source = self.start
+        key = (source, target)
+        if key not in self.routes:
+            path = self.path(target, source)
+            legs = []
+            for i, (node, following) in enumerate(zip(path, path[1:])):
+                if i:
+                    turn, angle = self.turn(path[i - 1], node, following)
+                elif source == self.start and self.heading is not None:
+                    turn, angle = classify(self.bearing(node, following) -
+                                           self.heading)
+                else:
+                    turn, angle = Turn.FORWARD, 0.0
+                legs.append(Leg(node, following, turn, angle))
+            self.routes[key] = tuple(legs)
+        return self.routes[key]
+
+
+# The course's graph, from the lot exit. The robot reaches node 0 facing
+# node 1. The turn times were tuned on the robot, so the nodes are laid
+# out with the angles that make the Brain's rotations take those times.
+COURSE = CourseGraph(
+    nodes={
+        0: (0.0, 0.0),
+        1: (0.0, 100.0),
+        2: (0.0, 200.0),
+        3: (98.5, 82.6),
+        4: (-86.6, 150.0),
+        5: (-36.6, 63.4),
+    },
+    edges=[(0, 1), (1, 2), (1, 3), (1, 4), (4, 5)],
+    start=0,
+    heading=math.pi / 2)
@@ -0,0 +1,44 @@
+"""The std_msgs messages the robot's nodes and detectors build.
+
+On the robot, these are the std_msgs types themselves, so they can go over
+ROS. Without ROS (e.g., replaying a recording on a laptop) they're plain
+messages with the same data field, which is all anything but ROS reads, so
+the vision pipeline and the Brain run on an in-memory Bus unchanged. Only
+the nodes that talk to ROS directly import std_msgs.
+"""
+
+try:
+    from std_msgs.msg import (Float64MultiArray, Int32, String, UInt8,
+                              UInt8MultiArray)
+except ImportError:
+    class Message(object):
+        """A message that only carries data, like the simple std_msgs."""
+
+        __slots__ = ('data',)
+
+        def __init__(self, data=None):
+            """Create a message with the given data."""
+            self.data = data
+
+        def __repr__(self):
+            return '{}(data={!r})'.format(type(self).__name__, self.data)
+
+    class Float64MultiArray(Message):
+        """A list of doubles."""
+        __slots__ = ()
+
+    class Int32(Message):
+        """An int."""
+        __slots__ = ()
+
+    class String(Message):
+        """A str."""
+        __slots__ = ()
+
+    class UInt8(Message):
+        """A byte."""
+        __slots__ = ()
+
+    class UInt8MultiArray(Message):
+        """A string of bytes."""
+        __slots__ = ()
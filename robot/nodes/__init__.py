@@ -1,8 +1,14 @@
-"""A collection of ROS nodes for the robot."""
+"""A collection of ROS nodes for the robot.
+
+Only the nodes that can run on a Bus without ROS are imported here. The ones
+that talk to ROS directly are imported from their own modules:
+robot.nodes.frame_service, robot.nodes.ir_sensor, robot.nodes.joystick, and
+robot.nodes.recorder.
+"""
 
 from .drive_line import DriveLine
 from .node_manager import Node, NodeManager
-from .ir_sensor import IrPlotter, IrSpammer
 from .brain import Brain
 from .wheels import Wheels
-from .joystick import Joystick
+from .latency import LatencyCollector
+from .localizer import Localizer
@@ -1,37 +1,104 @@
 from __future__ import division, print_function
 
-import itertools
+import math
 import random
 
-import rospy as ros
-from std_msgs.msg import Float32, Float32MultiArray, String, UInt8
-
 from robot.common import *
+from robot.coalesce import CoalescingPublisher
+from robot.graph import COURSE, Turn
+from robot.messages import Float64MultiArray, UInt8, UInt8MultiArray
 from robot.nodes import DriveLine, Node
+from robot.nodes.scheduler import Scheduler
+from robot.summary import (EXIT_LOT, GOAL, GRAPH_NODE, LANE, NODE, OBSTACLE,
+                           STOPLIGHT, decode)
+from robot.tracing import UNTRACED, Tracer, traced_data
 
 
 class Brain(Node):
     """A ROS Node to handle the brain of our robot."""
 
-    def __init__(self, node=0, verbose=False):
+    # How often the state timer steps the state machine, in seconds.
+    STATE_PERIOD = 0.01
+    # When event driven, how long the state machine can go without sensor
+    # data before the state timer steps it anyway, in seconds.
+    WATCHDOG_PERIOD = 0.1
+    # How long to spin looking for the goal before turning, in seconds.
+    SPIN_TIME = 5.0
+    # When coalescing, resend unchanged wheel speeds this often, in seconds,
+    # and send at most this many a second.
+    WHEEL_KEEPALIVE = 0.5
+    WHEEL_RATE = 30
+    # How long it takes to rotate in place at a node, in seconds a radian.
+    # A 60 degree turn takes 0.6s.
+    TURN_TIME = 1.8 / math.pi
+
+    def __init__(self, node=0, verbose=False, bus=None, event_driven=False,
+                 clock=None, coalesce=False, graph=COURSE):
         """Initialize the Brain node.
 
+        :param node: The node of the graph to drive to, defaults to 0
+        :type node: A node of the graph, optional
         :param verbose: How passionate should the Brain be?, defaults to False
         :param verbose: bool, optional
+        :param bus: What to publish and subscribe with, defaults to rospy
+        :type bus: robot.nodes.bus.Bus, optional
+        :param event_driven: Step the state machine as soon as sensor data
+        arrives, rather than polling it every STATE_PERIOD. The state timer
+        only steps it if no data arrives for WATCHDOG_PERIOD, defaults to
+        False
+        :type event_driven: bool, optional
+        :param clock: What the Brain's timers tell time with, defaults to the
+        wall clock.
+        :type clock: robot.nodes.scheduler.Clock, optional
+        :param coalesce: Only send the wheel speeds when they change, or are
+        due a keepalive, and at most WHEEL_RATE times a second, defaults to
+        False
+        :type coalesce: bool, optional
+        :param graph: The course's graph, defaults to robot.graph.COURSE
+        :type graph: robot.graph.CourseGraph, optional
+        :raises ValueError: If there's no route to the node.
         """
-        super(Brain, self).__init__(name='Brain')
+        super(Brain, self).__init__(name='Brain', bus=bus)
         self.verbose = verbose
         self.state = State.ON_PATH
         self.turn_dir = 1
-        self.node_list = self.pairwise(GRAPH_PATH[node])
+        self.graph = graph
+        self.node_list = iter(graph.route(node))
         self.node_slice = None
         self.rl_count = 0
-        self.spin_timer_counter = 0
         self.node0 = False
         self.done = False
         self.target = node
         self.rotation = 1
         self.lane_detected = False
+        self.event_driven = event_driven
+        # Every callback and timer runs on the scheduler's one thread, so
+        # they never race each other.
+        self.scheduler = Scheduler(clock)
+        self.last_step = None
+
+        # The handler for each state.
+        self.handlers = {
+            # Path
+            State.ON_PATH: self.pathState,
+            State.STOPPING: self.stoppingState,
+            State.STOPPED: self.stoppedState,
+            # Parking Lot
+            State.CANCER: self.cancerState,
+            State.SPIN: self.spinState,
+            State.TURN: self.turnState,
+            State.MTG: self.mtgState,
+            # Graph
+            State.GRAPH: self.graphState,
+            State.ORIENTING: self.orientingState,
+            State.G_ON_PATH: self.graphOnPathState,
+            State.NODE_STOPPING: self.nodeStoppingState,
+            State.NODE_STOPPED: self.nodeStoppedState,
+            State.ROTATE_LEFT: self.rotateLeftState,
+            State.ROTATE_RIGHT: self.rotateRightState,
+            State.FORWARD: self.forwardState,
+            State.END: self.endState,
+        }
 
         # Timer vars
         self.state_timer = None
@@ -52,10 +119,23 @@ class Brain(Node):
         self.goal_error = 0.0
         self.node_error = 0.0
 
-        self.wheel_speeds = ros.Publisher(
-            TOPIC['WHEEL_TWIST'], Float32MultiArray, queue_size=1)
-        self.state_pub = ros.Publisher(
+        self.wheel_speeds = CoalescingPublisher(
+            self.bus.Publisher(TOPIC['WHEEL_TWIST'], Float64MultiArray,
+                               queue_size=1),
+            Float64MultiArray,
+            keepalive=self.WHEEL_KEEPALIVE if coalesce else 0,
+            max_rate=self.WHEEL_RATE if coalesce else None,
+            traced=True,
+            scheduler=self.scheduler)
+        self.state_pub = self.bus.Publisher(
             TOPIC['ROBOT_STATE'], UInt8, queue_size=1)
+        trace_pub = self.bus.Publisher(
+            TOPIC['TRACE'], Float64MultiArray, queue_size=10)
+        self.tracer_in = Tracer(trace_pub, 'brain in')
+        self.tracer_out = Tracer(trace_pub, 'brain out')
+        # The stamp and trace id of the newest frame we've heard about, which
+        # the wheel speeds are derived from.
+        self.source = (0.0, UNTRACED)
         self.DL = DriveLine(r=5.0, L=19.5 / 2.0)
         self.base_sp = 8.0
         self.w1 = self.base_sp
@@ -63,12 +143,19 @@ class Brain(Node):
 
     def init_node(self):
         """Perform custom Node initialization."""
-        ros.Subscriber(TOPIC['LANE_CENTROID'], Float32, self.topicPath)
-        ros.Subscriber(TOPIC['GOAL_CENTROID'], Float32, self.topicGoal)
-        ros.Subscriber(TOPIC['NODE_CENTROID'], Float32, self.topicNode)
-        ros.Subscriber(TOPIC['POINT_OF_INTEREST'],
-                       String,
-                       self.topicPOI)
+        self.scheduler.start()
+        self.bus.Subscriber(TOPIC['VISION_SUMMARY'], UInt8MultiArray,
+                            self.deferred(self.topicSummary))
+
+    def deferred(self, callback):
+        """Wrap a subscriber callback to run on the scheduler's thread."""
+        return lambda msg: self.scheduler.call_soon(callback, msg)
+
+    def stop(self):
+        """Stop the scheduler before terminating this node."""
+        self.scheduler.stop()
+        print(self.wheel_speeds.report('Wheel speeds'))
+        super(Brain, self).stop()
 
     def transition(self, state):
         """Transition the robot's state to that given.
@@ -83,86 +170,65 @@ class Brain(Node):
         msg.data = self.state.value
         self.state_pub.publish(msg)
 
-    def topicPath(self, msg):
-        # We require a bootstrap.
-        if self.state_timer is None:
-            self.stateTimer()
-        self.path_error = msg.data
-        self.lane_detected = True
+    def topicSummary(self, msg):
+        """Handle the summary of everything the cameras found in a frame.
 
-    def topicGoal(self, msg):
-        # We require a bootstrap.
-        if self.state_timer is None:
-            self.stateTimer()
-        self.goal_error = msg.data
+        This determines the robot's current state.
 
-    def topicNode(self, msg):
-        # We require a bootstrap.
-        if self.state_timer is None:
+        :param msg: The frame's summary.
+        :type msg: A message built by robot.summary.encode()
+        """
+        summary = decode(msg)
+        valid, seen = summary.valid, summary.seen
+        self.source = (summary.stamp, summary.trace)
+        self.tracer_in.report(summary.stamp, summary.trace)
+
+        if valid & LANE:
+            self.path_error = summary.lane
+            self.lane_detected = True
+        if valid & GOAL:
+            self.goal_error = summary.goal
+        if valid & NODE:
+            self.node_error = summary.node
+        if seen & STOPLIGHT and self.state == State.ON_PATH:
+            self.stoplight_POI = True
+        if valid & OBSTACLE:
+            self.obstacle_POI = bool(seen & OBSTACLE)
+        if valid & EXIT_LOT:
+            self.goal_POI = bool(seen & EXIT_LOT)
+        if seen & GRAPH_NODE:
+            self.node_POI = True
+
+        # We require a bootstrap from the centroids.
+        if self.state_timer is None and valid & (LANE | GOAL | NODE):
             self.stateTimer()
-        self.node_error = msg.data
+        # Don't start the state machine before the centroids bootstrap it.
+        if self.state_timer is not None:
+            self.sensorEvent()
 
-    def topicPOI(self, msg):
-        """Handle a Point of Interest notification.
+    def sensorEvent(self):
+        """Step the state machine on new sensor data, if event driven."""
+        if self.event_driven:
+            self.step()
 
-        This determines the robot's current state.
+    def stateHandler(self):
+        """Step the state machine on the state timer.
 
-        :param msg: The point of interest notification.
-        :type msg: std_msgs.msg.String
+        When event driven, the timer is only a watchdog, stepping the state
+        machine when no sensor data has arrived for a while.
         """
-        if msg.data == POI['STOPLIGHT'] and self.state == State.ON_PATH:
-            self.stoplight_POI = True
-        elif msg.data == POI['OBSTACLE']:
-            # print('OBSTRUCTED')
-            self.obstacle_POI = True
-        elif msg.data == POI['NO_OBSTACLE']:
-            # print('\tNO OBSTRUCTION')
-            self.obstacle_POI = False
-        elif msg.data == POI['EXIT_LOT']:
-            self.goal_POI = True
-        elif msg.data == POI['NO_EXIT_LOT']:
-            self.goal_POI = False
-        elif msg.data == POI['GRAPH_NODE']:
-            self.node_POI = True
+        now = self.scheduler.clock.time()
+        if (self.event_driven and self.last_step is not None and
+                now - self.last_step < self.WATCHDOG_PERIOD):
+            return
+        self.step()
 
-    def stateHandler(self, event):
-        # Path
-        if self.state == State.ON_PATH:
-            self.pathState()
-        elif self.state == State.STOPPING:
-            self.stoppingState()
-        elif self.state == State.STOPPED:
-            self.stoppedState()
-        # Parking Lot
-        elif self.state == State.CANCER:
-            self.base_sp = 7.0
-            self.cancerState()
-        elif self.state == State.SPIN:
-            self.spinState()
-        elif self.state == State.TURN:
-            self.turnState()
-        elif self.state == State.MTG:
-            self.mtgState()
-        # Graph
-        elif self.state == State.GRAPH:
-            self.base_sp = 8.0
-            self.graphState()
-        elif self.state == State.ORIENTING:
-            self.orientingState()
-        elif self.state == State.G_ON_PATH:
-            self.graphOnPathState()
-        elif self.state == State.NODE_STOPPING:
-            self.nodeStoppingState()
-        elif self.state == State.NODE_STOPPED:
-            self.nodeStoppedState()
-        elif self.state == State.ROTATE_LEFT:
-            self.rotateLeftState()
-        elif self.state == State.ROTATE_RIGHT:
-            self.rotateRightState()
-        elif self.state == State.FORWARD:
-            self.forwardState()
-        elif self.state == State.END:
-            self.endState()
+    def step(self):
+        """Run the current state's handler."""
+        self.last_step = self.scheduler.clock.time()
+        handler = self.handlers.get(self.state)
+        if handler is not None:
+            handler()
 
     # Path section
 
@@ -195,6 +261,7 @@ class Brain(Node):
     # Parking lot section
 
     def cancerState(self):
+        self.base_sp = 7.0
         if self.obstacle_POI:
             self.rotation = -1 * self.rotation
             self.transition(State.SPIN)
@@ -205,6 +272,12 @@ class Brain(Node):
             self.setWheels(self.base_sp, self.base_sp)
 
     def spinState(self):
+        if (self.spin_timer is not None and not self.obstacle_POI and
+                self.goal_POI):
+            # We spun until we saw the goal.
+            self.timerSpinShutdown()
+            self.transition(State.MTG)
+            return
         self.setWheels(self.base_sp * self.rotation,
                        -self.base_sp * self.rotation)
         self.startSpinTimer()
@@ -229,6 +302,7 @@ class Brain(Node):
     # Graph section
 
     def graphState(self):
+        self.base_sp = 8.0
         # I am slightly worried about losing goal vision.
         self.lane_detected = False
         self.transition(State.ORIENTING)
@@ -271,23 +345,20 @@ class Brain(Node):
             self.transition(State.ROTATE_LEFT)
 
     def rotateLeftState(self):
-        if self.node_slice in LEFT_TURN:
+        if self.node_slice.turn == Turn.LEFT:
             if self.rotate_timer is None:
                 print('Rotate left.')
                 self.setWheels(-self.base_sp, self.base_sp)
-                if self.node_slice[1] == 5:
-                    self.rotateTimer(1.5)
-                else:
-                    self.rotateTimer(0.6)
+                self.rotateTimer(self.TURN_TIME * self.node_slice.angle)
         else:
             self.transition(State.ROTATE_RIGHT)
 
     def rotateRightState(self):
-        if self.node_slice in RIGHT_TURN:
+        if self.node_slice.turn == Turn.RIGHT:
             if self.rotate_timer is None:
                 print('Rotate right.')
                 self.setWheels(self.base_sp, -self.base_sp)
-                self.rotateTimer(1.0)
+                self.rotateTimer(self.TURN_TIME * self.node_slice.angle)
         else:
             self.transition(State.FORWARD)
 
@@ -313,64 +384,53 @@ class Brain(Node):
         if w1 is None or w2 is None:
             w1 = self.w1
             w2 = self.w2
-        wheels = Float32MultiArray()
-        wheels.data = [w1 + 0.5, w2]
-        self.wheel_speeds.publish(wheels)
+        self.wheel_speeds.publish_data(traced_data([w1 + 0.5, w2],
+                                                   *self.source))
+        self.tracer_out.report(*self.source)
 
     def printError(self, msg):
         for i in range(20):
             print(msg)
 
-    @staticmethod
-    def pairwise(iterable):
-        """s -> (s0,s1), (s{1,s2), (s2, s3), ..."""
-        a, b = itertools.tee(iterable)
-        next(b, None)
-        return itertools.izip(a, b)
-
     # Timer section
 
     def stateTimer(self):
         if self.state_timer is None:
             print('Creating state timer')
-            self.state_timer = ros.Timer(
-                ros.Duration(secs=0.01), self.stateHandler)
+            period = self.STATE_PERIOD
+            if self.event_driven:
+                period = self.WATCHDOG_PERIOD
+            self.state_timer = self.scheduler.call_every(period,
+                                                         self.stateHandler)
 
     def rlTimer(self):
         if self.rl_timer is None:
             print('Creating RL timer')
-            self.rl_timer = ros.Timer(
-                ros.Duration(secs=1.3), self.timerRLShutdown)
+            self.rl_timer = self.scheduler.call_later(1.3,
+                                                      self.timerRLShutdown)
 
-    def timerRLShutdown(self, event):
-        self.rl_timer.shutdown()
+    def timerRLShutdown(self):
         self.rl_timer = None
         self.stoplight_POI = False
 
     def startSpinTimer(self):
         if self.spin_timer is None:
-            self.spin_timer = ros.Timer(
-                ros.Duration(secs=0.01), self.timerSpinCallback)
-
-    def timerSpinCallback(self, event):
-        if self.spin_timer_counter > 500:
-            self.timerSpinShutdown()
-            # Set turn direction and set state to TURN
-            if bool(random.getrandbits(1)):
-                self.turn_dir = 1
-            else:
-                self.turn_dir = -1
-            self.transition(State.TURN)
-        elif not self.obstacle_POI and self.goal_POI:
-            self.timerSpinShutdown()
-            self.transition(State.MTG)
+            self.spin_timer = self.scheduler.call_later(self.SPIN_TIME,
+                                                        self.timerSpinCallback)
+
+    def timerSpinCallback(self):
+        # We spun for long enough without seeing the goal.
+        self.timerSpinShutdown()
+        # Set turn direction and set state to TURN
+        if bool(random.getrandbits(1)):
+            self.turn_dir = 1
         else:
-            self.spin_timer_counter += 1
+            self.turn_dir = -1
+        self.transition(State.TURN)
 
     def timerSpinShutdown(self):
-        self.spin_timer.shutdown()
+        self.spin_timer.cancel()
         self.spin_timer = None
-        self.spin_timer_counter = 0
         self.w1 = self.base_sp
         self.w2 = self.base_sp
         self.setWheels(0.0, 0.0)
@@ -379,11 +439,10 @@ class Brain(Node):
         if self.node_timer is None:
             self.setWheels(8.0, 8.0)
             print('Creating Node timer')
-            self.node_timer = ros.Timer(
-                ros.Duration(secs=time), self.timerNodeShutdown)
+            self.node_timer = self.scheduler.call_later(
+                time, self.timerNodeShutdown)
 
-    def timerNodeShutdown(self, event):
-        self.node_timer.shutdown()
+    def timerNodeShutdown(self):
         self.node_timer = None
         self.transition(State.NODE_STOPPED)
         self.node_POI = False
@@ -392,11 +451,10 @@ class Brain(Node):
     def rotateTimer(self, time):
         if self.rotate_timer is None:
             print('Creating Rotate timer')
-            self.rotate_timer = ros.Timer(
-                ros.Duration(secs=time), self.timerRotateShutdown)
+            self.rotate_timer = self.scheduler.call_later(
+                time, self.timerRotateShutdown)
 
-    def timerRotateShutdown(self, event):
-        self.rotate_timer.shutdown()
+    def timerRotateShutdown(self):
         self.rotate_timer = None
         self.transition(State.FORWARD)
         self.setWheels(0.0, 0.0)
@@ -404,12 +462,11 @@ class Brain(Node):
     def node0Timer(self):
         if self.node0_timer is None:
             print('Creating Node ZERO timer')
-            self.node0_timer = ros.Timer(
-                ros.Duration(secs=0.5), self.timerNode0Shutdown)
+            self.node0_timer = self.scheduler.call_later(
+                0.5, self.timerNode0Shutdown)
 
-    def timerNode0Shutdown(self, event):
+    def timerNode0Shutdown(self):
         print('Shutting down Node ZERO timer')
-        self.node0_timer.shutdown()
         self.node0_timer = None
         self.node0 = True
         self.setWheels(0.0, 0.0)
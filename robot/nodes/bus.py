@@ -0,0 +1,209 @@
+from __future__ import division, print_function
+
+import threading
+import time
+from collections import defaultdict, deque
+
+# Only the BusManager talks to ROS, so a Bus runs without it.
+try:
+    import rospy as ros
+except ImportError:
+    ros = None
+
+class BusPublisher(object):
+    """Publish messages on a Bus topic. Quacks like a rospy.Publisher."""
+
+    def __init__(self, bus, topic):
+        """Create a publisher for the given topic."""
+        self.bus = bus
+        self.topic = topic
+
+    def publish(self, msg):
+        """Publish a message, by reference, to every subscriber."""
+        self.bus.publish(self.topic, msg)
+
+    def unregister(self):
+        """Stop publishing. There's nothing to clean up."""
+        pass
+
+
+class BusSubscriber(object):
+    """A subscription to a Bus topic. Quacks like a rospy.Subscriber.
+
+    Like rospy, each subscriber holds at most queue_size messages, dropping
+    the oldest when its callback can't keep up.
+    """
+
+    def __init__(self, bus, topic, callback, queue_size=None):
+        """Subscribe the callback to the given topic."""
+        self.bus = bus
+        self.topic = topic
+        self.callback = callback
+        self.pending = deque(maxlen=queue_size)
+
+    def unregister(self):
+        """Stop receiving messages."""
+        self.bus.unsubscribe(self)
+
+
+class Bus(object):
+    """An in-memory publish/subscribe bus, and the loop that runs it.
+
+    The Bus has the same Publisher and Subscriber API as rospy, so a Node
+    constructed with a Bus runs on it unchanged. Messages are handed to
+    subscribers by reference, without being serialized, and the subscriber
+    callbacks run one at a time on the thread running the loop.
+
+    The Nodes' own threads run alongside the loop, though: the Brain's
+    scheduler, the CameraController's frame workers, and the coalescing
+    publishers' flush scheduler. So a Node still has to lock anything its
+    callbacks share with its threads. Publishing is thread-safe, so messages
+    can come in from those threads, and rospy's, too.
+    """
+
+    def __init__(self):
+        """Create an empty Bus."""
+        self.condition = threading.Condition()
+        self.subscribers = defaultdict(list)
+        # Subscribers with pending messages, in the order they got them.
+        self.ready = deque()
+        self.running = False
+        # How many messages were delivered, for the curious.
+        self.delivered = 0
+
+    def Publisher(self, topic, data_class=None, queue_size=None, **kwargs):
+        """Create a publisher, like rospy.Publisher."""
+        return BusPublisher(self, topic)
+
+    def Subscriber(self, topic, data_class=None, callback=None,
+                   queue_size=None, **kwargs):
+        """Subscribe to a topic, like rospy.Subscriber."""
+        subscriber = BusSubscriber(self, topic, callback, queue_size)
+        with self.condition:
+            self.subscribers[topic].append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Remove a subscriber from its topic."""
+        with self.condition:
+            subscribers = self.subscribers[subscriber.topic]
+            if subscriber in subscribers:
+                subscribers.remove(subscriber)
+            subscriber.pending.clear()
+
+    def publish(self, topic, msg):
+        """Queue a message for every subscriber of the topic."""
+        with self.condition:
+            for subscriber in self.subscribers[topic]:
+                if not subscriber.pending:
+                    self.ready.append(subscriber)
+                subscriber.pending.append(msg)
+            self.condition.notify()
+
+    def next_callback(self, timeout):
+        """Wait for the next callback that's due.
+
+        :param timeout: The longest to wait, in seconds.
+        :type timeout: float
+        :returns: A function to call, or None if nothing came due in time.
+        """
+        deadline = time.time() + timeout
+        with self.condition:
+            while True:
+                if self.ready:
+                    subscriber = self.ready.popleft()
+                    msg = subscriber.pending.popleft()
+                    if subscriber.pending:
+                        self.ready.append(subscriber)
+                    self.delivered += 1
+                    return lambda: subscriber.callback(msg)
+
+                wait = deadline - time.time()
+                if wait <= 0 or not self.running:
+                    return None
+                self.condition.wait(wait)
+
+    def drain(self):
+        """Deliver every pending message, without waiting for more."""
+        while True:
+            with self.condition:
+                if not self.ready:
+                    return
+                subscriber = self.ready.popleft()
+                msg = subscriber.pending.popleft()
+                if subscriber.pending:
+                    self.ready.append(subscriber)
+            subscriber.callback(msg)
+
+    def stop(self):
+        """Stop the loop."""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+
+class BusManager(object):
+    """Run ROS nodes as cooperative tasks on one Bus, in this process.
+
+    A drop-in replacement for the NodeManager for Nodes constructed with the
+    manager's bus. Topics they share never leave the process. Selected topics
+    are bridged to and from ROS, so the Nodes can still talk to the robot.
+    """
+
+    def __init__(self, bridge_in=(), bridge_out=()):
+        """Create a BusManager.
+
+        :param bridge_in: The ROS topics to republish on the bus.
+        :type bridge_in: An iterable of (topic, message type) tuples.
+        :param bridge_out: The bus topics to republish on ROS.
+        :type bridge_out: An iterable of (topic, message type) tuples.
+        """
+        self.bus = Bus()
+        self.jobs = []
+        self.bridge_in = list(bridge_in)
+        self.bridge_out = list(bridge_out)
+        # Held while running callbacks, so shutting down doesn't interrupt
+        # one.
+        self.lock = threading.Lock()
+
+    def add_node(self, node):
+        """Add a node to the BusManager.
+
+        :param node: A Node constructed with this manager's bus.
+        :type node: robot.nodes.Node
+        """
+        self.jobs.append(node)
+
+    def bridge(self):
+        """Connect the bridged topics between ROS and the bus."""
+        for topic, data_class in self.bridge_in:
+            # Leave the queueing to the bus subscribers.
+            ros.Subscriber(topic, data_class,
+                           lambda msg, topic=topic: self.bus.publish(topic,
+                                                                     msg))
+        for topic, data_class in self.bridge_out:
+            publisher = ros.Publisher(topic, data_class, queue_size=1)
+            self.bus.Subscriber(topic, data_class, publisher.publish)
+
+    def spin(self):
+        """Run every node on the bus until ROS shuts down."""
+        ros.init_node('BusManager', anonymous=True, disable_signals=False)
+        ros.on_shutdown(self.stop)
+        self.bridge()
+        for job in self.jobs:
+            job.init_node()
+
+        self.bus.running = True
+        while self.bus.running and not ros.is_shutdown():
+            callback = self.bus.next_callback(timeout=0.1)
+            if callback is not None:
+                with self.lock:
+                    callback()
+
+    def stop(self):
+        """Stop every node, and deliver their parting messages."""
+        self.bus.stop()
+        with self.lock:
+            for job in self.jobs:
+                job.stop()
+            self.bus.drain()
@@ -0,0 +1,71 @@
+from __future__ import division, print_function
+
+import os
+import time
+
+import rospy as ros
+from sensor_msgs.msg import CompressedImage
+
+from robot.common import TOPIC
+from robot.nodes import Node
+from robot.vision.decode import FrameDecoder
+from robot.vision.frame_ring import RING_PATH, FrameRing
+
+
+class FrameService(Node):
+    """A ROS Node to decode each camera frame once, for everybody.
+
+    Every frame is decoded into a shared memory FrameRing, so any number of
+    processes can look at the camera feed without each decoding every frame.
+    """
+
+    def __init__(self, path=RING_PATH, slots=4, hsv=False):
+        """Create a FrameService.
+
+        :param path: Where to create the ring, defaults to RING_PATH
+        :type path: str, optional
+        :param slots: How many frames the ring holds, defaults to 4
+        :type slots: int, optional
+        :param hsv: Also convert each frame to HSV, defaults to False
+        :type hsv: bool, optional
+        """
+        super(FrameService, self).__init__(name='FrameService')
+        self.path = path
+        self.slots = slots
+        self.hsv = hsv
+        self.decoder = FrameDecoder()
+        self.ring = None
+
+    def init_node(self):
+        """Perform custom Node initialization."""
+        ros.Subscriber(TOPIC['CAMERA_FEED'], CompressedImage,
+                       self.image_handler, queue_size=1)
+
+    def image_handler(self, compressed):
+        """Decode a compressed video frame into the ring.
+
+        :param compressed: The compressed video frame.
+        :type compressed: sensor_msgs.msg.CompressedImage
+        """
+        # Stamp the frame when it reaches us, like the CameraController does,
+        # since the camera driver's clock isn't synced with ours.
+        stamp = time.time()
+        bgr_frame, _ = self.decoder.decode(compressed.data)
+        if bgr_frame is None:
+            print('Failed to decode frame.')
+            return
+
+        height, width = bgr_frame.shape[:2]
+        if self.ring is None or self.ring.shape[:2] != (height, width):
+            # The ring is sized by the first frame, or whenever the camera's
+            # resolution changes.
+            self.ring = FrameRing.create(self.path, width, height, self.slots,
+                                         self.hsv)
+
+        self.ring.write(bgr_frame, stamp)
+
+    def stop(self):
+        """Remove the ring before terminating this node."""
+        if self.ring is not None and os.path.exists(self.path):
+            os.remove(self.path)
+        super(FrameService, self).stop()
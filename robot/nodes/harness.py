@@ -0,0 +1,214 @@
+from __future__ import division, print_function
+
+import time
+from collections import namedtuple
+
+from robot.common import TOPIC, State
+from robot.messages import Float64MultiArray, UInt8, UInt8MultiArray
+from robot.summary import encode, summarize
+from robot.tracing import untrace
+
+from .brain import Brain
+from .bus import Bus
+from .scheduler import VirtualClock
+
+# Something the Brain did, at a time on the harness' clock. The value of a
+# 'state' event is the State transitioned to, and of a 'wheels' event the
+# (left, right) wheel speeds.
+Event = namedtuple('Event', 'time kind value')
+
+# How a run went. The events are everything the Brain did, state is where it
+# ended up, seconds is how long the run took on the harness' clock, elapsed
+# is how long it took for real, and frames is how many summaries it was fed.
+Run = namedtuple('Run', 'events state seconds elapsed frames')
+
+# The rate scripted summaries come in at, in frames a second.
+FRAME_RATE = 30
+
+
+class CourseScript(object):
+    """Script what the cameras see, based on the Brain's state.
+
+    In each state, the cameras see the state's base fields, plus the fields
+    of any window of time (since the Brain entered the state) we're in. The
+    fields are robot.summary.summarize() keywords.
+    """
+
+    def __init__(self, states):
+        """Create a CourseScript.
+
+        :param states: The (fields, windows) of each state. The windows are
+        (start, end, fields) tuples, in seconds since entering the state.
+        States that aren't given see nothing.
+        :type states: A dict of robot.common.State to tuples.
+        """
+        self.states = states
+
+    def __call__(self, state, elapsed):
+        """Get what the cameras see.
+
+        :param state: The Brain's state.
+        :type state: robot.common.State
+        :param elapsed: How long the Brain has been in that state, in seconds.
+        :type elapsed: float
+        :returns: The summarize() keywords of what the cameras see.
+        :rtype: dict
+        """
+        base, windows = self.states.get(state, ({}, ()))
+        fields = dict(base)
+        for start, end, extra in windows:
+            if start <= elapsed < end:
+                fields.update(extra)
+        return fields
+
+
+FOREVER = float('inf')
+
+# The whole course: two red lights, an obstacle in the parking lot, then the
+# graph. Every node is seen a second after heading for it.
+COURSE = CourseScript({
+    State.ON_PATH: ({'lane': 0.0, 'confidence': 1.0},
+                    [(1.0, 1.2, {'stoplight': True})]),
+    State.STOPPING: ({'lane': 0.0, 'confidence': 1.0}, []),
+    State.STOPPED: ({'lane': 0.0, 'confidence': 1.0}, []),
+    State.CANCER: ({'obstacle': False, 'exit_lot': False, 'goal': 0.0},
+                   [(0.0, 0.3, {'obstacle': True})]),
+    State.SPIN: ({'obstacle': False, 'exit_lot': False, 'goal': 0.0},
+                 [(1.0, FOREVER, {'exit_lot': True, 'goal': 0.2})]),
+    State.TURN: ({'obstacle': False, 'exit_lot': False, 'goal': 0.0}, []),
+    State.MTG: ({'obstacle': False, 'exit_lot': False, 'goal': 0.0},
+                [(0.0, 1.5, {'exit_lot': True, 'goal': 0.1})]),
+    State.ORIENTING: ({}, [(0.5, FOREVER, {'lane': 0.0})]),
+    State.G_ON_PATH: ({'lane': 0.0, 'graph_node': False},
+                      [(1.0, 1.2, {'graph_node': True})]),
+    State.NODE_STOPPING: ({'node': 0.0, 'graph_node': False}, []),
+    State.NODE_STOPPED: ({'node': 0.0, 'graph_node': False}, []),
+    State.FORWARD: ({'node': 0.0, 'graph_node': False},
+                    [(1.0, 1.2, {'graph_node': True})]),
+})
+
+
+class BrainHarness(object):
+    """Drive a Brain with scripted or recorded camera summaries, on a virtual
+    clock.
+
+    The Brain's timers run on the harness' clock, which only moves as fast as
+    the Brain can keep up with, so whole runs take a fraction of the time
+    they would for real, and come out exactly the same every time. Every
+    transition and wheel command is recorded.
+    """
+
+    def __init__(self, target=0, event_driven=False, **options):
+        """Create a BrainHarness.
+
+        :param target: The Brain's target graph node, defaults to 0
+        :type target: int, optional
+        :param event_driven: Whether the Brain is event driven, defaults to
+        False
+        :type event_driven: bool, optional
+        :param options: Any other robot.nodes.Brain options.
+        """
+        self.clock = VirtualClock()
+        self.bus = Bus()
+        self.brain = Brain(node=target, bus=self.bus,
+                           event_driven=event_driven, clock=self.clock,
+                           **options)
+        self.events = []
+        self.state = self.brain.state
+        # When the Brain entered its state.
+        self.entered = 0.0
+        self.frames = 0
+        self.publisher = self.bus.Publisher(TOPIC['VISION_SUMMARY'],
+                                            UInt8MultiArray)
+        self.bus.Subscriber(TOPIC['ROBOT_STATE'], UInt8, self.topicState)
+        self.bus.Subscriber(TOPIC['WHEEL_TWIST'], Float64MultiArray,
+                            self.topicWheels)
+        self.brain.init_node()
+
+    def topicState(self, msg):
+        """Record a transition."""
+        self.state = State(msg.data)
+        self.entered = self.clock.time()
+        self.events.append(Event(self.entered, 'state', self.state))
+
+    def topicWheels(self, msg):
+        """Record a wheel command."""
+        (left, right), _, _ = untrace(msg)
+        self.events.append(Event(self.clock.time(), 'wheels', (left, right)))
+
+    def advance(self, when):
+        """Run the Brain until the given time on the harness' clock."""
+        scheduler = self.brain.scheduler
+        while True:
+            deadline = scheduler.next_deadline()
+            if deadline is None or deadline > when:
+                break
+            scheduler.run_until(deadline)
+            # Record what the Brain did at the time it did it.
+            self.bus.drain()
+        scheduler.run_until(when)
+
+    def feed(self, summary, when):
+        """Feed the Brain a summary at the given time on the harness' clock.
+
+        :param summary: What the cameras saw.
+        :type summary: robot.summary.Summary
+        :param when: When the Brain gets it, in seconds.
+        :type when: float
+        """
+        self.advance(when)
+        self.publisher.publish(encode(summary))
+        self.frames += 1
+        self.bus.drain()
+        self.advance(when)
+
+    def result(self, start):
+        """Sum up the run so far, which started at the given real time."""
+        return Run(list(self.events), self.state, self.clock.time(),
+                   time.time() - start, self.frames)
+
+    def run(self, script=COURSE, timeout=120.0, frame_rate=FRAME_RATE):
+        """Run the Brain on a scripted course until it's done.
+
+        :param script: What the cameras see in each state, defaults to COURSE
+        :type script: A function of the Brain's state and how long it's been
+        in it, like a CourseScript.
+        :param timeout: Give up after this long on the harness' clock, in
+        seconds, defaults to 120.0
+        :type timeout: float, optional
+        :param frame_rate: How many summaries to feed a second, defaults to
+        FRAME_RATE
+        :type frame_rate: float, optional
+        :rtype: Run
+        """
+        start = time.time()
+        frame = 0
+        while not self.brain.done:
+            when = frame / frame_rate
+            if when > timeout:
+                break
+            frame += 1
+            fields = script(self.state, when - self.entered)
+            self.feed(summarize(when, frame, **fields), when)
+        return self.result(start)
+
+    def replay(self, outputs):
+        """Replay what the vision pipeline published to the Brain.
+
+        :param outputs: The outputs of a robot.vision.replay.Replay. They're
+        fed at the times they were recorded at, relative to the first one.
+        :type outputs: A list of robot.vision.replay.Output tuples.
+        :rtype: Run
+        """
+        start = time.time()
+        summaries = [output for output in outputs
+                     if output.topic == 'VISION_SUMMARY']
+        if summaries:
+            first = summaries[0].stamp
+            for output in summaries:
+                self.feed(output.data, output.stamp - first)
+        return self.result(start)
+
+    def stop(self):
+        """Stop the Brain."""
+        self.brain.stop()
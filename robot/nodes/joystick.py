@@ -7,12 +7,13 @@ import termios
 
 import cv2
 import rospy as ros
-from cv_bridge import CvBridge, CvBridgeError
 from sensor_msgs.msg import CompressedImage
 from std_msgs.msg import Int32
 
 from robot.common import TOPIC
 from robot.nodes import Node
+from robot.vision.decode import FrameDecoder
+from robot.vision.frame_ring import FrameRing
 
 
 class Joystick(Node):
@@ -30,8 +31,19 @@ class Joystick(Node):
         ' ': (0, 0),
     }
 
-    def __init__(self, stdin):
-        """Initialize the Joystick node."""
+    # Downscale the camera preview by this factor (1, 2, 4, or 8).
+    PREVIEW_SCALE = 1
+
+    def __init__(self, stdin, frame_ring=None):
+        """Initialize the Joystick node.
+
+        :param stdin: The file descriptor to read keypresses from.
+        :type stdin: int
+        :param frame_ring: Preview the frames a FrameService already decoded
+        into the frame ring at this path, instead of decoding the camera feed
+        ourselves, defaults to None
+        :type frame_ring: str, optional
+        """
         super(Joystick, self).__init__(name='Joystick')
         self.stdin = stdin
         self.settings = None
@@ -40,11 +52,18 @@ class Joystick(Node):
         self.right_publisher = ros.Publisher(
             TOPIC['WHEEL_RIGHT'], Int32, queue_size=1)
         self.camera_topic = TOPIC['CAMERA_FEED']
-        self.bridge = CvBridge()
+        self.decoder = FrameDecoder()
+        self.frame_ring = frame_ring
+        self.ring = None
+        self.sequence = 0
 
     def init_node(self):
         """Perform custom Node initialization."""
-        ros.Subscriber(self.camera_topic, CompressedImage, self.image_handler)
+        if self.frame_ring is not None:
+            ros.Timer(ros.Duration(1 / 30), self.ring_handler)
+        else:
+            ros.Subscriber(self.camera_topic, CompressedImage,
+                           self.image_handler)
         ros.Timer(ros.Duration(0.1), self.callback)
         sys.stdin = os.fdopen(self.stdin)
         self.settings = termios.tcgetattr(sys.stdin)
@@ -104,13 +123,32 @@ class Joystick(Node):
         :param compressed: The compressed video frame.
         :type compressed: sensor_msgs.msg.CompressedImage
         """
-        try:
-            # Decompress the message into an openCV frame.
-            bgr_frame = self.bridge.compressed_imgmsg_to_cv2(
-                compressed, 'bgr8')
-        except CvBridgeError as e:
-            print(e)
+        # Decompress the message into an openCV frame.
+        bgr_frame, _ = self.decoder.decode(compressed.data,
+                                           scale=self.PREVIEW_SCALE)
+        if bgr_frame is None:
+            print('Failed to decode frame.')
+            return
 
         cv2.namedWindow('Joystick', cv2.WINDOW_NORMAL)
         cv2.imshow('Joystick', bgr_frame)
         cv2.waitKey(10)
+
+    def ring_handler(self, event):
+        """Show the newest frame in the frame ring, if there's a new one."""
+        if self.ring is None or self.ring.stale:
+            self.ring = FrameRing.open(self.frame_ring)
+            self.sequence = 0
+            if self.ring is None:
+                return
+        frame = self.ring.latest()
+        if frame is None or frame.sequence == self.sequence:
+            return
+        self.sequence = frame.sequence
+
+        preview = frame.bgr
+        if self.PREVIEW_SCALE > 1:
+            preview = preview[::self.PREVIEW_SCALE, ::self.PREVIEW_SCALE]
+        cv2.namedWindow('Joystick', cv2.WINDOW_NORMAL)
+        cv2.imshow('Joystick', preview)
+        cv2.waitKey(10)
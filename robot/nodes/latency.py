@@ -0,0 +1,136 @@
+from __future__ import division, print_function
+
+import random
+from collections import OrderedDict
+
+import numpy as np
+
+from robot.common import TOPIC
+from robot.messages import Float64MultiArray
+from robot.nodes import Node
+from robot.tracing import HOPS
+
+
+class LatencyHistogram(object):
+    """A histogram of latencies, in milliseconds.
+
+    The count, mean, and max are of every latency added. The percentiles are
+    of a uniform random sample of at most RESERVOIR of them, so a long run
+    doesn't keep every latency in memory.
+    """
+
+    # The upper edge of each bucket, in milliseconds.
+    EDGES = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, float('inf'))
+    # How wide the bars of the report are, in characters.
+    WIDTH = 40
+    # How many latencies to keep for the percentiles.
+    RESERVOIR = 10000
+
+    def __init__(self, seed=None):
+        """Create an empty LatencyHistogram.
+
+        :param seed: Seeds which latencies are kept for the percentiles,
+        defaults to seeding from the system.
+        :type seed: int, optional
+        """
+        self.counts = np.zeros(len(self.EDGES), dtype=np.int64)
+        self.samples = np.empty(self.RESERVOIR)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.random = random.Random(seed)
+
+    def add(self, seconds):
+        """Count a latency, in seconds."""
+        ms = seconds * 1000
+        self.counts[np.searchsorted(self.EDGES, ms)] += 1
+        self.total += ms
+        self.max = ms if self.count == 0 else max(self.max, ms)
+        # Keep each of the latencies so far with the same chance.
+        if self.count < self.RESERVOIR:
+            self.samples[self.count] = ms
+        else:
+            i = self.random.randint(0, self.count)
+            if i < self.RESERVOIR:
+                self.samples[i] = ms
+        self.count += 1
+
+    def report(self, name):
+        """Format the histogram, under the given name."""
+        if not self.count:
+            return '{}: no samples'.format(name)
+        samples = self.samples[:min(self.count, self.RESERVOIR)]
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        lines = ['{}: {} samples, mean {:.1f} ms, p50 {:.1f} ms, p95 {:.1f} '
+                 'ms, p99 {:.1f} ms, max {:.1f} ms'.format(
+                     name, self.count, self.total / self.count, p50, p95,
+                     p99, self.max)]
+        scale = self.WIDTH / self.counts.max()
+        lower = 0
+        for edge, count in zip(self.EDGES, self.counts):
+            if count:
+                lines.append('  {:>5}-{:<5} ms {:>7} {}'.format(
+                    lower, edge, count, '#' * int(np.ceil(count * scale))))
+            lower = edge
+        return '\n'.join(lines)
+
+
+class LatencyCollector(Node):
+    """A ROS Node that collects how long each frame takes to reach the wheels.
+
+    Every node a traced frame's data passes through reports when it did on
+    the TRACE topic. Once a frame reaches the wheels, its latency from each
+    hop to the next, and in total, goes in the histograms, which are printed
+    when the node stops.
+    """
+
+    # How many frames that haven't reached the wheels (yet) to keep track of.
+    PENDING = 1000
+
+    def __init__(self, bus=None):
+        """Create a LatencyCollector."""
+        super(LatencyCollector, self).__init__(name='LatencyCollector',
+                                               bus=bus)
+        # When each hop saw each pending frame, by trace id.
+        self.pending = OrderedDict()
+        self.histograms = OrderedDict(
+            ('{} -> {}'.format(a, b), LatencyHistogram())
+            for a, b in zip(HOPS, HOPS[1:]))
+        self.histograms['total'] = LatencyHistogram()
+
+    def init_node(self):
+        """Perform custom Node initialization."""
+        self.bus.Subscriber(TOPIC['TRACE'], Float64MultiArray,
+                            self.topicTrace)
+
+    def topicTrace(self, msg):
+        """Record that a frame passed through a hop."""
+        trace, hop, stamp, when = msg.data
+        times = self.pending.get(trace)
+        if times is None:
+            times = self.pending[trace] = [stamp] + [None] * (len(HOPS) - 1)
+            while len(self.pending) > self.PENDING:
+                self.pending.popitem(last=False)
+        times[int(hop)] = when
+        if int(hop) == len(HOPS) - 1:
+            del self.pending[trace]
+            self.collect(times)
+
+    def collect(self, times):
+        """Add the times a frame reached each hop to the histograms."""
+        hops = zip(times, times[1:])
+        for histogram, (start, end) in zip(self.histograms.values(), hops):
+            # Skip the hops on either side of one that wasn't reported.
+            if start is not None and end is not None:
+                histogram.add(end - start)
+        self.histograms['total'].add(times[-1] - times[0])
+
+    def report(self):
+        """Format every histogram."""
+        return '\n'.join(histogram.report(name)
+                         for name, histogram in self.histograms.items())
+
+    def stop(self):
+        """Print the histograms before terminating this node."""
+        print(self.report())
+        super(LatencyCollector, self).stop()
@@ -0,0 +1,338 @@
+from __future__ import division, print_function
+
+import threading
+import time
+
+import numpy as np
+
+from robot.common import TOPIC
+from robot.course import (MAP_PATH, NEAR, NEAR_WIDTH, PIXELS_PER_CM, Pose,
+                          load_floor, quantize)
+from robot.messages import Float64MultiArray, UInt8MultiArray
+from robot.nodes import Node
+from robot.nodes.scheduler import Clock
+from robot.summary import LANE, SEEN_BITS, decode
+from robot.tracing import traced, untrace
+
+
+def lane_map(floor):
+    """Find the lane on a course map.
+
+    :param floor: The course map.
+    :type floor: An OpenCV BGR image.
+    :returns: Whether each map pixel is lane.
+    :rtype: A 2D bool array.
+    """
+    return floor.min(axis=2) > 127
+
+
+class ParticleFilter(object):
+    """Track where the robot might be on the course map with particles.
+
+    Every particle is a pose, in the robot.course frame, and all of them
+    are moved and weighed at once with NumPy, so thousands of particles take
+    a few milliseconds an update.
+    """
+
+    # How noisy the robot's motion is: the spread of the forward speed, as a
+    # fraction of it, and of the turn rate, in radians a second.
+    SPEED_NOISE = 0.1
+    TURN_NOISE = 0.2
+    # How far off the lane camera's error is from the lane's centroid, as a
+    # fraction of the frame, and how likely it is to be off by anything at
+    # all, since it only follows the largest blob of the lane.
+    LANE_NOISE = 0.3
+    LANE_OUTLIER = 0.1
+    # How likely a particle that wouldn't see the lane at all is to have
+    # seen it anyway.
+    LANE_MISSING = 0.05
+    # How many points across the frame's bottom row to look for the lane at.
+    LANE_SAMPLES = 16
+    # How close to a landmark a particle sees it from, in cm, how likely it
+    # is to, and how likely it is to see one that isn't there.
+    LANDMARK_RANGE = 30.0
+    DETECTION = 0.9
+    FALSE_ALARM = 0.05
+    # Resample once fewer than this fraction of the particles carry the
+    # weight.
+    RESAMPLE = 0.5
+    # How spread out particles start around a known start, in cm and
+    # radians.
+    START_SPREAD = (5.0, 5.0, 0.1)
+
+    def __init__(self, floor, count=2000, start=None, landmarks=None,
+                 scale=PIXELS_PER_CM, seed=None):
+        """Create a ParticleFilter.
+
+        :param floor: The course map.
+        :type floor: An OpenCV BGR image.
+        :param count: How many particles to track, defaults to 2000
+        :type count: int, optional
+        :param start: Where the robot starts, defaults to anywhere on the
+        lane.
+        :type start: robot.course.Pose, optional
+        :param landmarks: Where the points of interest are on the course, in
+        cm, by summarize() keyword (e.g. stoplight or graph_node), defaults
+        to none.
+        :type landmarks: A dict of str to lists of (x, y) tuples, optional
+        :param scale: How big the course map is, in map pixels per cm,
+        defaults to PIXELS_PER_CM
+        :type scale: float, optional
+        :param seed: Seed the particles' randomness, defaults to None
+        :type seed: int, optional
+        """
+        self.lane = np.pad(lane_map(floor), 1, 'constant')
+        self.scale = scale
+        self.count = count
+        self.random = np.random.RandomState(seed)
+        self.landmarks = dict((kind, np.array(points, dtype=float))
+                              for kind, points in (landmarks or {}).items()
+                              if len(points))
+        # Where the lane samples are, right of the axle, in cm.
+        half_width = NEAR_WIDTH / 2
+        self.across = np.linspace(-half_width, half_width, self.LANE_SAMPLES)
+        self.reset(start)
+
+    def reset(self, start=None):
+        """Spread the particles around the start, or over the whole lane.
+
+        :param start: Where the robot starts, defaults to anywhere on the
+        lane.
+        :type start: robot.course.Pose, optional
+        """
+        if start is None:
+            rows, columns = np.nonzero(self.lane)
+            picks = self.random.randint(len(rows), size=self.count)
+            # Don't count the border.
+            rows -= 1
+            columns -= 1
+            self.x = (columns[picks] + self.random.uniform(
+                size=self.count)) / self.scale
+            self.y = (rows[picks] + self.random.uniform(
+                size=self.count)) / self.scale
+            self.heading = self.random.uniform(-np.pi, np.pi, self.count)
+        else:
+            spread = self.START_SPREAD
+            self.x = self.random.normal(start.x, spread[0], self.count)
+            self.y = self.random.normal(start.y, spread[1], self.count)
+            self.heading = self.random.normal(start.heading, spread[2],
+                                              self.count)
+        self.weights = np.full(self.count, 1 / self.count)
+
+    def predict(self, v, w, dt):
+        """Move every particle, with some noise.
+
+        :param v: The robot's forward speed, in cm a second.
+        :type v: float
+        :param w: The robot's turn rate, in radians a second clockwise.
+        :type w: float
+        :param dt: How long it moved for, in seconds.
+        :type dt: float
+        """
+        if dt <= 0:
+            return
+        speed = v * (1 + self.random.normal(0, self.SPEED_NOISE, self.count))
+        turn = w + self.random.normal(0, self.TURN_NOISE, self.count)
+        # Head off at the average heading over the step.
+        middle = self.heading + turn * dt / 2
+        self.x += speed * dt * np.cos(middle)
+        self.y += speed * dt * np.sin(middle)
+        self.heading += turn * dt
+
+    def lane_errors(self):
+        """Work out the lane error each particle would see.
+
+        :returns: The lane error, as a fraction of the frame, and whether the
+        lane would be in view at all, for each particle.
+        :rtype: A tuple of arrays.
+        """
+        cos, sin = np.cos(self.heading), np.sin(self.heading)
+        ahead = NEAR
+        # Right of the heading is a quarter turn clockwise on the map.
+        x = (self.x + ahead * cos)[:, None] - self.across * sin[:, None]
+        y = (self.y + ahead * sin)[:, None] + self.across * cos[:, None]
+        # The map has a border of floor around it, so anywhere off the map
+        # clips to floor.
+        height, width = self.lane.shape
+        rows = np.clip(y * self.scale + 1, 0, height - 1).astype(int)
+        columns = np.clip(x * self.scale + 1, 0, width - 1).astype(int)
+        lane = self.lane[rows, columns]
+        seen = lane.sum(axis=1)
+        visible = seen > 0
+        errors = np.zeros(self.count)
+        errors[visible] = ((lane[visible] * self.across).sum(axis=1) /
+                           seen[visible] / self.across[-1])
+        return errors, visible
+
+    def observe_lane(self, error):
+        """Weigh the particles by how well they explain a lane error.
+
+        :param error: The lane error, as a fraction of the frame.
+        :type error: float
+        """
+        expected, visible = self.lane_errors()
+        likelihood = np.exp(-0.5 * ((expected - error) /
+                                    self.LANE_NOISE) ** 2) + self.LANE_OUTLIER
+        self.weigh(np.where(visible, likelihood, self.LANE_MISSING))
+
+    def observe_landmark(self, kind, seen):
+        """Weigh the particles by whether they'd see a kind of landmark.
+
+        :param kind: The landmark's summarize() keyword.
+        :type kind: str
+        :param seen: Whether it was seen.
+        :type seen: bool
+        """
+        points = self.landmarks.get(kind)
+        if points is None:
+            return
+        dx = self.x[:, None] - points[:, 0]
+        dy = self.y[:, None] - points[:, 1]
+        near = ((dx ** 2 + dy ** 2).min(axis=1) <
+                self.LANDMARK_RANGE ** 2)
+        if seen:
+            likelihood = np.where(near, self.DETECTION, self.FALSE_ALARM)
+        else:
+            likelihood = np.where(near, 1 - self.DETECTION,
+                                  1 - self.FALSE_ALARM)
+        self.weigh(likelihood)
+
+    def weigh(self, likelihood):
+        """Multiply in an observation's likelihood, and resample if too few
+        particles are left carrying the weight."""
+        weights = self.weights * likelihood
+        total = weights.sum()
+        if total <= 0:
+            # Nothing explains the observation, so ignore it.
+            return
+        self.weights = weights / total
+        if 1 / (self.weights ** 2).sum() < self.RESAMPLE * self.count:
+            self.resample()
+
+    def resample(self):
+        """Draw a fresh set of particles in proportion to their weights,
+        with one random offset, so the draw is even."""
+        positions = ((self.random.uniform() + np.arange(self.count)) /
+                     self.count)
+        picks = np.searchsorted(np.cumsum(self.weights), positions)
+        np.minimum(picks, self.count - 1, out=picks)
+        self.x = self.x[picks]
+        self.y = self.y[picks]
+        self.heading = self.heading[picks]
+        self.weights = np.full(self.count, 1 / self.count)
+
+    def estimate(self):
+        """Get the weighted average pose, and how spread out the particles
+        are around it.
+
+        :returns: A (pose, spread) tuple, with the spread in cm.
+        :rtype: tuple
+        """
+        x = np.dot(self.weights, self.x)
+        y = np.dot(self.weights, self.y)
+        heading = np.arctan2(np.dot(self.weights, np.sin(self.heading)),
+                             np.dot(self.weights, np.cos(self.heading)))
+        spread = np.sqrt(np.dot(self.weights,
+                                (self.x - x) ** 2 + (self.y - y) ** 2))
+        return Pose(float(x), float(y), float(heading)), float(spread)
+
+
+class Localizer(Node):
+    """A ROS Node estimating where the robot is on the course map.
+
+    The wheel commands move the particles, and every frame's summary weighs
+    them, after which the estimate is published on POSE, traced with the
+    frame it's derived from.
+    """
+
+    def __init__(self, floor=MAP_PATH, count=2000, start=None,
+                 landmarks=None, r=5.0, L=19.5 / 2.0, bus=None, clock=None):
+        """Create a Localizer.
+
+        :param floor: The course map image, defaults to MAP_PATH
+        :type floor: str, optional
+        :param count: How many particles to track, defaults to 2000
+        :type count: int, optional
+        :param start: Where the robot starts, defaults to anywhere on the
+        lane.
+        :type start: robot.course.Pose, optional
+        :param landmarks: Where the points of interest are on the course. See
+        ParticleFilter, defaults to none.
+        :type landmarks: dict, optional
+        :param r: The robot wheel radius, defaults to 5.0
+        :type r: float, optional
+        :param L: The robot half-axle length, defaults to 19.5 / 2.0
+        :type L: float, optional
+        :param bus: What to publish and subscribe with, defaults to rospy
+        :type bus: robot.nodes.bus.Bus, optional
+        :param clock: What to tell time with, defaults to the wall clock.
+        :type clock: robot.nodes.scheduler.Clock, optional
+        """
+        super(Localizer, self).__init__(name='Localizer', bus=bus)
+        self.filter = ParticleFilter(load_floor(floor), count, start,
+                                     landmarks)
+        self.r = r
+        self.L = L
+        self.clock = Clock() if clock is None else clock
+        # The rospy subscribers each call back on their own thread.
+        self.lock = threading.Lock()
+        # The wheel speeds, and when the particles were last moved.
+        self.left = 0.0
+        self.right = 0.0
+        self.last = None
+        self.pose_pub = self.bus.Publisher(TOPIC['POSE'], Float64MultiArray,
+                                           queue_size=1)
+        # How many updates we've made, and how long they took, in seconds.
+        self.updates = 0
+        self.seconds = 0.0
+
+    def init_node(self):
+        """Perform custom Node initialization."""
+        self.bus.Subscriber(TOPIC['WHEEL_TWIST'], Float64MultiArray,
+                            self.topicWheels)
+        self.bus.Subscriber(TOPIC['VISION_SUMMARY'], UInt8MultiArray,
+                            self.topicSummary)
+
+    def move(self):
+        """Move the particles on the current wheel speeds until now. Call
+        with the lock held."""
+        now = self.clock.time()
+        if self.last is not None:
+            v = self.r * (self.left + self.right) / 2
+            w = self.r * (self.left - self.right) / (2 * self.L)
+            self.filter.predict(v, w, now - self.last)
+        self.last = now
+
+    def topicWheels(self, msg):
+        """Move the particles up to the new wheel command, then obey it."""
+        (left, right), _, _ = untrace(msg)
+        with self.lock:
+            self.move()
+            self.left = quantize(left)
+            self.right = quantize(right)
+
+    def topicSummary(self, msg):
+        """Weigh the particles by what the cameras saw, and publish the
+        estimate."""
+        summary = decode(msg)
+        with self.lock:
+            start = time.time()
+            self.move()
+            if summary.valid & LANE:
+                self.filter.observe_lane(summary.lane)
+            for kind, bit in SEEN_BITS.items():
+                if summary.valid & bit:
+                    self.filter.observe_landmark(kind,
+                                                 bool(summary.seen & bit))
+            pose, spread = self.filter.estimate()
+            self.pose_pub.publish(traced([pose.x, pose.y, pose.heading,
+                                          spread],
+                                         summary.stamp, summary.trace))
+            self.updates += 1
+            self.seconds += time.time() - start
+
+    def stop(self):
+        """Terminate this node."""
+        print('Localizer: {} updates, {:.2f}ms each'.format(
+            self.updates, 1000 * self.seconds / max(self.updates, 1)))
+        super(Localizer, self).stop()
@@ -2,7 +2,11 @@ from __future__ import division, print_function
 
 import multiprocessing
 
-import rospy as ros
+# Nodes can run on a Bus without ROS, e.g., replaying a course on a laptop.
+try:
+    import rospy as ros
+except ImportError:
+    ros = None
 
 
 class Node(multiprocessing.Process):
@@ -12,13 +16,22 @@ class Node(multiprocessing.Process):
     spun in its own process.
     """
 
-    def __init__(self, name):
+    def __init__(self, name, bus=None):
         """Create and runs a ROS node with the given name.
 
         NOTE: This method gets run in the main process.
+
+        :param name: The Node's name.
+        :type name: str
+        :param bus: What the Node publishes and subscribes with. Anything with
+        rospy's Publisher and Subscriber API, defaults to rospy itself.
+        :type bus: robot.nodes.bus.Bus, optional
         """
         super(Node, self).__init__()
         self.__name = name
+        if bus is None and ros is None:
+            raise ImportError('Nodes need rospy unless they run on a bus')
+        self.bus = ros if bus is None else bus
 
     def run(self):
         """Run the ROS Node.
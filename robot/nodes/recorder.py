@@ -0,0 +1,60 @@
+from __future__ import division, print_function
+
+import rospy as ros
+from sensor_msgs.msg import CompressedImage
+from std_msgs.msg import UInt8
+
+from robot.common import TOPIC, State
+from robot.nodes import Node
+from robot.vision.recording import RecordingWriter
+
+
+class FrameRecorder(Node):
+    """A ROS Node to record the camera feed for replaying later.
+
+    Each compressed frame is recorded as is, along with when it was taken, and
+    the robot's state when it arrived, so the vision pipeline can be replayed
+    on it without ROS. See robot.vision.replay.
+    """
+
+    def __init__(self, path):
+        """Create a FrameRecorder.
+
+        :param path: Where to save the recording, without extension.
+        :type path: str
+        """
+        super(FrameRecorder, self).__init__(name='FrameRecorder')
+        self.path = path
+        self.writer = None
+        self.state = None
+
+    def init_node(self):
+        """Perform custom Node initialization."""
+        # Only the Node's process should create the recording.
+        self.writer = RecordingWriter(self.path)
+        ros.Subscriber(TOPIC['ROBOT_STATE'], UInt8, self.state_handler)
+        ros.Subscriber(TOPIC['CAMERA_FEED'], CompressedImage,
+                       self.image_handler)
+
+    def state_handler(self, state):
+        """Remember the robot's current state."""
+        self.state = State(state.data)
+
+    def image_handler(self, compressed):
+        """Record a compressed video frame.
+
+        :param compressed: The compressed video frame.
+        :type compressed: sensor_msgs.msg.CompressedImage
+        """
+        stamp = compressed.header.stamp.to_sec()
+        if stamp == 0:
+            # Not every camera driver stamps its frames.
+            stamp = ros.get_time()
+        self.writer.write(compressed.data, stamp, self.state)
+
+    def stop(self):
+        """Finish the recording before terminating this node."""
+        if self.writer is not None:
+            self.writer.close()
+            print('Recorded {} frames.'.format(self.writer.count))
+        super(FrameRecorder, self).stop()
@@ -0,0 +1,218 @@
+from __future__ import division, print_function
+
+import heapq
+import itertools
+import sys
+import threading
+import time
+import traceback
+
+
+class Clock(object):
+    """The wall clock."""
+
+    @staticmethod
+    def time():
+        """Get the current time, in seconds."""
+        return time.time()
+
+
+class VirtualClock(object):
+    """A clock that only moves when it's told to.
+
+    Drive a Scheduler on a VirtualClock with Scheduler.run_until(), rather
+    than starting its thread, and everything happens exactly on time.
+    """
+
+    def __init__(self, start=0.0):
+        """Create a VirtualClock starting at the given time, in seconds."""
+        self.now = start
+
+    def time(self):
+        """Get the current time, in seconds."""
+        return self.now
+
+    def set(self, now):
+        """Move the clock to the given time. Clocks never go backwards."""
+        self.now = max(self.now, now)
+
+
+class Handle(object):
+    """A scheduled callback, which can be cancelled."""
+
+    __slots__ = ('when', 'period', 'callback', 'args', 'cancelled')
+
+    def __init__(self, when, period, callback, args):
+        """Schedule a callback at the given time, repeating every period."""
+        self.when = when
+        self.period = period
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """Never call the callback again."""
+        self.cancelled = True
+
+
+class Scheduler(object):
+    """Run callbacks at their deadlines, one at a time, on a single thread.
+
+    Every callback runs on the scheduler's thread, so callbacks never race
+    each other. Callbacks may schedule and cancel other callbacks, and other
+    threads can hand work to the scheduler's thread with call_soon().
+    """
+
+    def __init__(self, clock=None):
+        """Create a Scheduler.
+
+        :param clock: What tells the time, defaults to the wall clock.
+        :type clock: Clock or VirtualClock, optional
+        """
+        self.clock = Clock() if clock is None else clock
+        self.condition = threading.Condition()
+        # A heap of (when, order, handle), so ties run in scheduled order.
+        self.heap = []
+        self.order = itertools.count()
+        self.thread = None
+        self.running = False
+
+    def call_at(self, when, callback, args=(), period=None):
+        """Call a callback at the given time.
+
+        :param when: When to call the callback, in seconds on the clock.
+        :type when: float
+        :param callback: The function to call.
+        :param args: What to call it with, defaults to nothing.
+        :type args: tuple, optional
+        :param period: Call it again every period seconds, defaults to once.
+        :type period: float, optional
+        :returns: The cancellable handle of the callback.
+        :rtype: Handle
+        """
+        handle = Handle(when, period, callback, args)
+        with self.condition:
+            heapq.heappush(self.heap, (when, next(self.order), handle))
+            self.condition.notify()
+        return handle
+
+    def call_later(self, delay, callback, *args):
+        """Call a callback once, delay seconds from now."""
+        return self.call_at(self.clock.time() + delay, callback, args)
+
+    def call_every(self, period, callback, *args):
+        """Call a callback every period seconds, starting a period from now."""
+        return self.call_at(self.clock.time() + period, callback, args,
+                            period)
+
+    def call_soon(self, callback, *args):
+        """Call a callback as soon as possible, on the scheduler's thread."""
+        return self.call_at(self.clock.time(), callback, args)
+
+    def pop_due(self, now):
+        """Take the next callback due by the given time.
+
+        :returns: The callback's handle, or None if nothing is due.
+        """
+        with self.condition:
+            while self.heap:
+                when, _, handle = self.heap[0]
+                if handle.cancelled:
+                    heapq.heappop(self.heap)
+                    continue
+                if when > now:
+                    return None
+                heapq.heappop(self.heap)
+                if handle.period is not None:
+                    # Don't try to catch up on periods we missed.
+                    handle.when = max(when + handle.period, now)
+                    heapq.heappush(self.heap,
+                                   (handle.when, next(self.order), handle))
+                return handle
+            return None
+
+    def next_deadline(self):
+        """When the next callback is due, or None if nothing is scheduled."""
+        with self.condition:
+            while self.heap and self.heap[0][2].cancelled:
+                heapq.heappop(self.heap)
+            return self.heap[0][0] if self.heap else None
+
+    def run_due(self):
+        """Run every callback that's due now.
+
+        A callback that raises is reported and otherwise ignored, like a
+        failing rospy.Timer, so one bad callback (or message) can't stop the
+        rest, and periodic callbacks keep being called.
+
+        :returns: How many callbacks were run.
+        """
+        count = 0
+        now = self.clock.time()
+        handle = self.pop_due(now)
+        while handle is not None:
+            try:
+                handle.callback(*handle.args)
+            except Exception:
+                print('Scheduled callback {!r} raised:'.format(
+                    handle.callback), file=sys.stderr)
+                traceback.print_exc()
+            count += 1
+            handle = self.pop_due(now)
+        return count
+
+    def run_until(self, when):
+        """Run every callback due by the given time, moving a VirtualClock.
+
+        The clock is moved to each callback's deadline before it runs, so
+        callbacks see the time they were scheduled for.
+
+        :param when: Run until this time, in seconds on the clock.
+        :type when: float
+        :returns: How many callbacks were run.
+        """
+        count = 0
+        while True:
+            deadline = self.next_deadline()
+            if deadline is None or deadline > when:
+                break
+            self.clock.set(deadline)
+            count += self.run_due()
+        self.clock.set(when)
+        return count
+
+    def start(self):
+        """Start running callbacks on the scheduler's own thread.
+
+        Schedulers on a VirtualClock don't have a thread. Drive them with
+        run_until() instead.
+        """
+        if self.thread is not None or isinstance(self.clock, VirtualClock):
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def loop(self):
+        """Run callbacks as they come due, until stopped."""
+        while self.running:
+            with self.condition:
+                deadline = self.next_deadline()
+                wait = None
+                if deadline is not None:
+                    wait = deadline - self.clock.time()
+                if wait is None or wait > 0:
+                    self.condition.wait(wait)
+                    continue
+            self.run_due()
+
+    def stop(self):
+        """Stop the scheduler's thread."""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if (self.thread is not None and
+                self.thread is not threading.current_thread()):
+            self.thread.join(1)
+        self.thread = None
@@ -1,46 +1,62 @@
 from __future__ import division, print_function
 
-import rospy as ros
-from std_msgs.msg import Int32, Float32MultiArray
-
+from robot.coalesce import CoalescingPublisher
 from robot.common import TOPIC
+from robot.messages import Int32, Float64MultiArray
 from robot.nodes import Node
+from robot.tracing import Tracer, untrace
 
 
 class Wheels(Node):
     """A ROS Node to handle the wheels of our robot."""
 
-    def __init__(self, verbose=False):
-        """Initialize the ROS Node."""
-        super(Wheels, self).__init__(name='Wheels')
+    # When coalescing, resend unchanged wheel speeds this often, in seconds.
+    KEEPALIVE = 0.5
+
+    def __init__(self, verbose=False, bus=None, coalesce=False):
+        """Initialize the ROS Node.
+
+        :param verbose: Whether or not to console spam, defaults to False
+        :type verbose: bool, optional
+        :param bus: What to publish and subscribe with, defaults to rospy
+        :type bus: robot.nodes.bus.Bus, optional
+        :param coalesce: Only send each wheel's speed to the robot when it
+        changes, or is due a keepalive, defaults to False
+        :type coalesce: bool, optional
+        """
+        super(Wheels, self).__init__(name='Wheels', bus=bus)
         self.verbose = verbose
-        self.left_pub = ros.Publisher(
-            TOPIC['WHEEL_LEFT'], Int32, queue_size=1)
-        self.right_pub = ros.Publisher(
-            TOPIC['WHEEL_RIGHT'], Int32, queue_size=1)
+        keepalive = self.KEEPALIVE if coalesce else 0
+        self.left_pub = CoalescingPublisher(
+            self.bus.Publisher(TOPIC['WHEEL_LEFT'], Int32, queue_size=1),
+            Int32, keepalive=keepalive)
+        self.right_pub = CoalescingPublisher(
+            self.bus.Publisher(TOPIC['WHEEL_RIGHT'], Int32, queue_size=1),
+            Int32, keepalive=keepalive)
+        self.tracer = Tracer(self.bus.Publisher(
+            TOPIC['TRACE'], Float64MultiArray, queue_size=10), 'wheels')
 
     def init_node(self):
         """Perform custom Node initialization."""
-        ros.Subscriber(TOPIC['WHEEL_TWIST'], Float32MultiArray,
-                       self.__processTwist)
+        self.bus.Subscriber(TOPIC['WHEEL_TWIST'], Float64MultiArray,
+                            self.__processTwist)
 
     def __processTwist(self, msg):
         """Process the Twist message and sends that to the publish method."""
-        self.__publishWheels(msg.data[0], msg.data[1])
+        (left, right), stamp, trace = untrace(msg)
+        self.__publishWheels(left, right)
+        self.tracer.report(stamp, trace)
 
     def __publishWheels(self, left, right):
         """Publish the left hand right wheel speeds."""
-        msg = Int32()
         upper = 10.0  # Maximum wheel speed coming from left/right
-        msg.data = int((left / upper) * 100)
-        self.left_pub.publish(msg)
-        msg.data = int((right / upper) * 100)
-        self.right_pub.publish(msg)
+        self.left_pub.publish_data(int((left / upper) * 100))
+        self.right_pub.publish_data(int((right / upper) * 100))
 
     def stop(self):
         """Handle the shutdown signal from the NodeManager."""
         super(Wheels, self).stop()
-        msg = Int32()
-        msg.data = 0
-        self.left_pub.publish(msg)
-        self.right_pub.publish(msg)
+        self.left_pub.publish_data(0, force=True)
+        self.right_pub.publish_data(0, force=True)
+        print(self.left_pub.report('Left wheel'))
+        print(self.right_pub.report('Right wheel'))
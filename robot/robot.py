@@ -1,31 +1,122 @@
+from sensor_msgs.msg import CompressedImage
+from std_msgs.msg import Float64MultiArray, Int32, UInt8
+
 from .common import TOPIC
-from .nodes import Brain, NodeManager, Wheels
-from .vision import CameraController
+from .course import LANDMARKS, START
+from .nodes import Brain, LatencyCollector, Localizer, NodeManager, Wheels
+from .nodes.bus import BusManager
+from .nodes.frame_service import FrameService
+from .vision.camera import CameraController
+from .vision.frame_ring import RING_PATH
+
+# The topics a single process robot exchanges with the rest of ROS. Everything
+# else stays on the in-memory bus.
+BRIDGE_IN = (
+    (TOPIC['CAMERA_FEED'], CompressedImage),
+)
+BRIDGE_OUT = (
+    (TOPIC['WHEEL_LEFT'], Int32),
+    (TOPIC['WHEEL_RIGHT'], Int32),
+    (TOPIC['ROBOT_STATE'], UInt8),
+    (TOPIC['POSE'], Float64MultiArray),
+)
 
 
 class Robot(object):
     """Class to assemble all of the ROS nodes together in one happy family."""
 
-    def __init__(self, target, verbose):
+    def __init__(self, target, verbose, color_table=False, latest_only=False,
+                 threads=0, single_process=False, frame_ring=False,
+                 stages=0, event_driven=False, trace=False, coalesce=False,
+                 localize=False, governor=False):
         """Initialize the robot.
 
         :param target: The target graph node.
-        :type target: An integer between 0 and 5 inclusive.
+        :type target: A node of robot.graph.COURSE.
         :param verbose: Be very passionate about robotics.
         :type verbose: bool
+        :param color_table: Classify pixels with a color lookup table,
+        defaults to False
+        :type color_table: bool, optional
+        :param latest_only: Only process the newest camera frame, dropping any
+        that arrive while busy, defaults to False
+        :type latest_only: bool, optional
+        :param threads: Run the cameras on a pool of this many threads,
+        defaults to 0
+        :type threads: int, optional
+        :param single_process: Run every node in this process on an in-memory
+        bus, rather than each in its own process talking over ROS, defaults to
+        False
+        :type single_process: bool, optional
+        :param frame_ring: Decode each camera frame once into a shared memory
+        frame ring, for the cameras and any other process to read, defaults
+        to False
+        :type frame_ring: bool, optional
+        :param stages: Run the decode, convert, and detect stages of the
+        cameras concurrently, with up to this many frames waiting per stage,
+        defaults to 0
+        :type stages: int, optional
+        :param event_driven: Step the Brain as soon as sensor data arrives,
+        rather than polling, defaults to False
+        :type event_driven: bool, optional
+        :param trace: Collect how long each camera frame takes to reach the
+        wheels, and print the histograms on shutdown, defaults to False
+        :type trace: bool, optional
+        :param coalesce: Leave out wheel commands that repeat what the wheels
+        already know, and limit their rate, defaults to False
+        :type coalesce: bool, optional
+        :param localize: Estimate where the robot is on the course map, and
+        publish it on POSE. The robot starts at robot.course.START, and is
+        only localized by the lane until the map has robot.course.LANDMARKS
+        on it, defaults to False
+        :type localize: bool, optional
+        :param governor: Run the detectors the robot isn't steering by less
+        often when the detectors fall behind the camera, defaults to False
+        :type governor: bool, optional
         """
         self.target = target
         self.verbose = verbose
-        self.nm = NodeManager()
+        self.color_table = color_table
+        self.latest_only = latest_only
+        self.threads = threads
+        self.frame_ring = RING_PATH if frame_ring else None
+        self.stages = stages
+        self.event_driven = event_driven
+        self.trace = trace
+        self.coalesce = coalesce
+        self.localize = localize
+        self.governor = governor
+        if single_process:
+            self.nm = BusManager(BRIDGE_IN, BRIDGE_OUT)
+            self.bus = self.nm.bus
+        else:
+            self.nm = NodeManager()
+            self.bus = None
         self.initNodes()
 
     def initNodes(self):
         """Add each node to the node manager."""
-        self.nm.add_node(Wheels())
-        self.nm.add_node(Brain(node=self.target, verbose=self.verbose))
+        if self.frame_ring is not None:
+            self.nm.add_node(FrameService(self.frame_ring))
+        if self.trace:
+            self.nm.add_node(LatencyCollector(bus=self.bus))
+        if self.localize:
+            self.nm.add_node(Localizer(start=START, landmarks=LANDMARKS,
+                                       bus=self.bus))
+        self.nm.add_node(Wheels(bus=self.bus, coalesce=self.coalesce))
+        self.nm.add_node(Brain(node=self.target, verbose=self.verbose,
+                               bus=self.bus, event_driven=self.event_driven,
+                               coalesce=self.coalesce))
         self.nm.add_node(CameraController(TOPIC['CAMERA_FEED'],
                                           TOPIC['ROBOT_STATE'],
-                                          verbose=self.verbose))
+                                          verbose=self.verbose,
+                                          color_table=self.color_table,
+                                          latest_only=self.latest_only,
+                                          threads=self.threads,
+                                          governor=self.governor,
+                                          bus=self.bus,
+                                          frame_ring=self.frame_ring,
+                                          stages=self.stages))
 
     def start(self):
         """Start the robot."""
@@ -0,0 +1,343 @@
+from __future__ import division, print_function
+
+import math
+import multiprocessing
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from robot.common import TOPIC
+from robot.course import (FAR, FAR_WIDTH, MAP_PATH, NEAR, NEAR_WIDTH,
+                          PIXELS_PER_CM, START, Pose, load_floor, quantize)
+from robot.messages import Float64MultiArray
+from robot.nodes.harness import FRAME_RATE, BrainHarness
+from robot.summary import LANE, decode
+from robot.tracing import untrace
+from robot.vision.pipeline import VisionPipeline
+from robot.vision.recording import RecordingWriter
+from robot.vision.scenes import HEIGHT, WIDTH, encode
+
+# A simulation to run: where the robot starts, how long to run it for, in
+# seconds of robot time, the DriveLine's (Kp, Ki, Kd) gains, or None for
+# the stock ones, and any other Simulator options.
+Episode = namedtuple('Episode', 'start seconds gains options')
+
+# How a simulation went. The run is the Brain's robot.nodes.harness.Run,
+# the poses are where the robot was at each frame, the errors are the lane
+# errors the cameras saw, on_lane is the fraction of frames the robot was
+# over the lane, distance is how far it drove, in cm, and left_map is
+# whether it drove off the map.
+Trip = namedtuple('Trip', 'run poses errors on_lane distance left_map')
+
+
+class DiffDrive(object):
+    """Integrate a differential drive robot's pose from its wheel speeds.
+
+    Uses the same wheel model as the DriveLine, and sends the wheel speeds
+    through the same percentage the Wheels node does.
+    """
+
+    def __init__(self, pose, r, L):
+        """Create a DiffDrive.
+
+        :param pose: Where the robot starts.
+        :type pose: Pose
+        :param r: The robot wheel radius, in cm.
+        :param L: The robot half-axle length, in cm.
+        """
+        self.pose = pose
+        self.r = r
+        self.L = L
+        self.left = 0.0
+        self.right = 0.0
+        # How far along the robot's pose is, in seconds.
+        self.time = 0.0
+        # How far the robot has driven, in cm.
+        self.distance = 0.0
+
+    def command(self, left, right):
+        """Turn the wheels at the given speeds from now on."""
+        self.left = quantize(left)
+        self.right = quantize(right)
+
+    def advance(self, when):
+        """Drive at the current wheel speeds until the given time.
+
+        :param when: The time, in seconds.
+        :type when: float
+        """
+        dt = when - self.time
+        if dt <= 0:
+            return
+        self.time = when
+        v = self.r * (self.left + self.right) / 2
+        w = self.r * (self.left - self.right) / (2 * self.L)
+        x, y, heading = self.pose
+        turned = heading + w * dt
+        if abs(w) < 1e-9:
+            x += v * dt * math.cos(heading)
+            y += v * dt * math.sin(heading)
+        else:
+            # Drive along the arc exactly, so big steps don't drift.
+            x += v / w * (math.sin(turned) - math.sin(heading))
+            y -= v / w * (math.cos(turned) - math.cos(heading))
+        self.pose = Pose(x, y, turned)
+        self.distance += abs(v) * dt
+
+
+class CameraModel(object):
+    """Render what the webcam sees of the floor, from the course map.
+
+    The webcam looks down at the floor in front of the robot, so its frame
+    is a trapezoid of the floor, warped into a rectangle.
+    """
+
+    # How hard the webcam compresses its frames.
+    QUALITY = 80
+
+    def __init__(self, floor, scale=PIXELS_PER_CM):
+        """Create a CameraModel.
+
+        :param floor: The course map.
+        :type floor: An OpenCV BGR image.
+        :param scale: How big the course map is, in map pixels per cm,
+        defaults to PIXELS_PER_CM
+        :type scale: float, optional
+        """
+        self.floor = floor
+        self.scale = scale
+        self.frame = np.empty((HEIGHT, WIDTH, 3), dtype=np.uint8)
+        # The frame's bottom left, bottom right, top right, and top left
+        # corners, and where they are ahead of and right of the axle.
+        self.corners = np.float32([[0, HEIGHT], [WIDTH, HEIGHT],
+                                   [WIDTH, 0], [0, 0]])
+        self.ground = [(NEAR, -NEAR_WIDTH / 2), (NEAR, NEAR_WIDTH / 2),
+                       (FAR, FAR_WIDTH / 2), (FAR, -FAR_WIDTH / 2)]
+
+    def footprint(self, pose):
+        """Find the corners of the frame on the course map.
+
+        :type pose: Pose
+        :returns: The map pixel of each of the frame's corners.
+        :rtype: A 4x2 float32 array.
+        """
+        x, y, heading = pose
+        cos, sin = math.cos(heading), math.sin(heading)
+        # Right of the heading is a quarter turn clockwise on the map.
+        return np.float32([[(x + ahead * cos - right * sin) * self.scale,
+                            (y + ahead * sin + right * cos) * self.scale]
+                           for ahead, right in self.ground])
+
+    def render(self, pose):
+        """Render the webcam's frame from the given pose.
+
+        The frame is reused, so copy it to keep it. Anything off the map is
+        black floor.
+
+        :type pose: Pose
+        :rtype: An OpenCV BGR image.
+        """
+        warp = cv2.getPerspectiveTransform(self.corners,
+                                           self.footprint(pose))
+        return cv2.warpPerspective(
+            self.floor, warp, (WIDTH, HEIGHT), dst=self.frame,
+            flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+            borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+
+    def capture(self, pose):
+        """Render and compress the webcam's frame from the given pose.
+
+        :type pose: Pose
+        :returns: The data of a sensor_msgs.msg.CompressedImage message.
+        """
+        return encode(self.render(pose), self.QUALITY)
+
+    def pixel(self, pose):
+        """Get the map pixel under the robot's axle, or None if it's off the
+        map."""
+        row = int(pose.y * self.scale)
+        column = int(pose.x * self.scale)
+        height, width = self.floor.shape[:2]
+        if 0 <= row < height and 0 <= column < width:
+            return self.floor[row, column]
+        return None
+
+
+class SummaryInbox(object):
+    """Stand in for the VISION_SUMMARY publisher, keeping the newest summary.
+    """
+
+    def __init__(self):
+        """Create an empty SummaryInbox."""
+        self.summary = None
+
+    def publish(self, msg):
+        """Keep the summary."""
+        self.summary = decode(msg)
+
+
+class Simulator(object):
+    """Drive the real Brain and vision pipeline around the course map.
+
+    Each frame, the webcam's view is rendered from where the robot is, and
+    processed by the vision pipeline, whose summary is fed to the Brain. The
+    Brain's WHEEL_TWIST commands drive the robot until the next frame. It
+    all runs on the BrainHarness' virtual clock, so a run takes as long as
+    the code takes, not as long as the robot would.
+    """
+
+    def __init__(self, start=START, floor=MAP_PATH, gains=None,
+                 compress=True, frame_rate=FRAME_RATE, recording=None,
+                 **options):
+        """Create a Simulator.
+
+        :param start: Where the robot starts, defaults to START
+        :type start: Pose, optional
+        :param floor: The course map image, defaults to MAP_PATH
+        :type floor: str, optional
+        :param gains: The DriveLine's (Kp, Ki, Kd) gains, defaults to the
+        stock ones.
+        :type gains: tuple, optional
+        :param compress: JPEG compress each frame, like the webcam does, so
+        the pipeline decodes it too, defaults to True
+        :type compress: bool, optional
+        :param frame_rate: How many frames the webcam takes a second,
+        defaults to FRAME_RATE
+        :type frame_rate: float, optional
+        :param recording: Also record every frame the webcam takes to this
+        path, without extension, defaults to not recording them
+        :type recording: str, optional
+        :param options: Any other robot.nodes.harness.BrainHarness options.
+        """
+        self.harness = BrainHarness(**options)
+        drive_line = self.harness.brain.DL
+        if gains is not None:
+            drive_line.Kp, drive_line.Ki, drive_line.Kd = gains
+        self.drive = DiffDrive(start, drive_line.r, drive_line.L)
+        self.camera = CameraModel(load_floor(floor))
+        self.compress = compress
+        self.frame_rate = frame_rate
+        self.frame = 0
+        self.recording = None
+        if recording is not None:
+            self.recording = RecordingWriter(recording)
+        self.inbox = SummaryInbox()
+        # The simulation has to be repeatable, so don't let how long frames
+        # take change which detectors run.
+        self.pipeline = VisionPipeline({'VISION_SUMMARY': self.inbox},
+                                       governor=False)
+        self.harness.bus.Subscriber(TOPIC['WHEEL_TWIST'], Float64MultiArray,
+                                    self.topicWheels)
+        self.poses = []
+        self.errors = []
+        self.on_lane = 0
+
+    def topicWheels(self, msg):
+        """Drive to when the wheel command came in, then obey it."""
+        (left, right), _, _ = untrace(msg)
+        self.drive.advance(self.harness.clock.time())
+        self.drive.command(left, right)
+
+    def step(self):
+        """Take and process the next frame.
+
+        :returns: Whether the robot is still on the map.
+        :rtype: bool
+        """
+        when = self.frame / self.frame_rate
+        self.frame += 1
+        self.harness.advance(when)
+        self.drive.advance(when)
+        pose = self.drive.pose
+        pixel = self.camera.pixel(pose)
+        if pixel is None:
+            return False
+        self.poses.append(pose)
+        if pixel.min() > 127:
+            self.on_lane += 1
+
+        self.inbox.summary = None
+        if self.compress or self.recording is not None:
+            data = self.camera.capture(pose)
+            if self.recording is not None:
+                self.recording.write(data, when, self.harness.state)
+        if self.compress:
+            self.pipeline.process(data, self.harness.state, when)
+        else:
+            self.pipeline.process_decoded(self.camera.render(pose),
+                                          self.harness.state, when)
+        summary = self.inbox.summary
+        if summary is not None:
+            if summary.valid & LANE:
+                self.errors.append(summary.lane)
+            self.harness.feed(summary, when)
+        return True
+
+    def run(self, seconds=30.0):
+        """Run until the Brain's done, the robot drives off the map, or the
+        given time is up.
+
+        :param seconds: How long to run for, in seconds of robot time,
+        defaults to 30.0
+        :type seconds: float, optional
+        :rtype: Trip
+        """
+        start = time.time()
+        left_map = False
+        while (not self.harness.brain.done and
+               self.frame / self.frame_rate <= seconds):
+            if not self.step():
+                left_map = True
+                break
+        return Trip(self.harness.result(start), self.poses, self.errors,
+                    self.on_lane / max(len(self.poses), 1),
+                    self.drive.distance, left_map)
+
+    def stop(self):
+        """Stop the Brain and the vision pipeline, and finish the recording.
+        """
+        self.pipeline.stop()
+        self.harness.stop()
+        if self.recording is not None:
+            self.recording.close()
+
+
+def run_episode(episode):
+    """Run an episode in a fresh Simulator.
+
+    :type episode: Episode
+    :rtype: Trip
+    """
+    simulator = Simulator(start=episode.start, gains=episode.gains,
+                          **episode.options)
+    try:
+        return simulator.run(episode.seconds)
+    finally:
+        simulator.stop()
+
+
+def init_worker():
+    """Keep OpenCV to one thread in each worker, since there's one worker a
+    core."""
+    cv2.setNumThreads(1)
+
+
+def sweep(episodes, processes=None):
+    """Run many episodes in parallel, one per core.
+
+    :param episodes: The episodes to run.
+    :type episodes: A list of Episode tuples.
+    :param processes: How many episodes to run at once, defaults to one per
+    core.
+    :type processes: int, optional
+    :returns: The Trip of each episode, in order.
+    :rtype: list
+    """
+    pool = multiprocessing.Pool(processes, initializer=init_worker)
+    try:
+        return pool.map(run_episode, episodes, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
@@ -0,0 +1,203 @@
+from __future__ import division, print_function
+
+import struct
+from collections import namedtuple
+
+from robot.common import POI
+from robot.messages import UInt8MultiArray
+from robot.tracing import UNTRACED, untrace
+
+# Which fields of a summary the frame's detectors filled in, and which points
+# of interest they saw.
+LANE = 1 << 0
+CONFIDENCE = 1 << 1
+GOAL = 1 << 2
+NODE = 1 << 3
+STOPLIGHT = 1 << 4
+OBSTACLE = 1 << 5
+EXIT_LOT = 1 << 6
+GRAPH_NODE = 1 << 7
+
+# The point of interest bit each POI string sets, and whether it saw it.
+POI_BITS = {
+    POI['STOPLIGHT']: (STOPLIGHT, True),
+    POI['NO_STOPLIGHT']: (STOPLIGHT, False),
+    POI['OBSTACLE']: (OBSTACLE, True),
+    POI['NO_OBSTACLE']: (OBSTACLE, False),
+    POI['EXIT_LOT']: (EXIT_LOT, True),
+    POI['NO_EXIT_LOT']: (EXIT_LOT, False),
+    POI['GRAPH_NODE']: (GRAPH_NODE, True),
+    POI['NO_GRAPH_NODE']: (GRAPH_NODE, False),
+}
+
+# The point of interest bits, by summarize() keyword.
+SEEN_BITS = {
+    'stoplight': STOPLIGHT,
+    'obstacle': OBSTACLE,
+    'exit_lot': EXIT_LOT,
+    'graph_node': GRAPH_NODE,
+}
+
+# The value each centroid output fills in.
+VALUE_BITS = {
+    'LANE_CENTROID': LANE,
+    'LANE_CONFIDENCE': CONFIDENCE,
+    'GOAL_CENTROID': GOAL,
+    'GOAL_CONFIDENCE': GOAL,
+    'NODE_CENTROID': NODE,
+    'NODE_CONFIDENCE': NODE,
+}
+
+# Everything the detectors found in a frame. The lane, goal, and node errors
+# and the lane confidence only mean something if their bit is set in valid.
+# The goal and node confidences go with the goal and node errors. All three
+# confidences run from 0.0 to 1.0: the lane's is how sure the lane tracker
+# is, the goal's is the share of recent frames the goal was seen in, and the
+# node's is how big the node is, half at the detection threshold and full at
+# twice it. The points of interest only mean something if their bit is set in
+# valid, and were seen if their bit is set in seen.
+Summary = namedtuple('Summary', 'stamp trace lane goal node confidence '
+                                'goal_confidence node_confidence valid seen')
+
+# 38 bytes, little endian: the stamp as a double, the trace id as a uint32,
+# the six values as floats, and the two bitfields as a byte each.
+LAYOUT = struct.Struct('<dIffffffBB')
+
+
+def summarize(stamp, trace=UNTRACED, lane=None, goal=None, node=None,
+              confidence=None, goal_confidence=None, node_confidence=None,
+              **seen):
+    """Build a summary from scratch, e.g., to script what the cameras see.
+
+    Leave out (or pass None for) anything the cameras didn't look for.
+
+    :param stamp: When the frame was taken, in seconds.
+    :type stamp: float
+    :param trace: The frame's trace id, defaults to untraced.
+    :type trace: int, optional
+    :param lane: The lane error.
+    :param goal: The goal error.
+    :param node: The node error.
+    :param confidence: The lane confidence.
+    :param goal_confidence: The goal confidence.
+    :param node_confidence: The node confidence.
+    :param seen: Whether each of stoplight, obstacle, exit_lot, and
+    graph_node was seen.
+    :rtype: Summary
+    """
+    valid = 0
+    values = []
+    for bit, value in ((LANE, lane), (GOAL, goal), (NODE, node),
+                       (CONFIDENCE, confidence), (GOAL, goal_confidence),
+                       (NODE, node_confidence)):
+        if value is not None:
+            valid |= bit
+        values.append(0.0 if value is None else value)
+    bits = 0
+    for name, value in seen.items():
+        if value is not None:
+            valid |= SEEN_BITS[name]
+            if value:
+                bits |= SEEN_BITS[name]
+    return Summary(stamp, trace, *values, valid=valid, seen=bits)
+
+
+def encode(summary):
+    """Pack a summary into a message.
+
+    :type summary: Summary
+    :rtype: robot.messages.UInt8MultiArray
+    """
+    msg = UInt8MultiArray()
+    msg.data = LAYOUT.pack(*summary)
+    return msg
+
+
+def decode(msg):
+    """Unpack a summary from a message.
+
+    :type msg: robot.messages.UInt8MultiArray
+    :rtype: Summary
+    """
+    return Summary._make(LAYOUT.unpack(bytes(bytearray(msg.data))))
+
+
+class SummaryOutput(object):
+    """Stand in for one of a detector's publishers, filling in a summary."""
+
+    def __init__(self, builder, name):
+        """Fill in the given builder's summary with what's published.
+
+        :param builder: The summary's builder.
+        :type builder: SummaryBuilder
+        :param name: LANE_CENTROID, LANE_CONFIDENCE, GOAL_CENTROID,
+        GOAL_CONFIDENCE, NODE_CENTROID, NODE_CONFIDENCE, or
+        POINT_OF_INTEREST.
+        :type name: str
+        """
+        self.builder = builder
+        self.name = name
+
+    def publish(self, msg):
+        """Fill in the summary with a detector's message."""
+        self.builder.add(self.name, msg)
+
+
+class SummaryBuilder(object):
+    """Collect what each detector publishes about a frame into one summary."""
+
+    # The outputs a summary is made of.
+    OUTPUTS = ('LANE_CENTROID', 'LANE_CONFIDENCE', 'GOAL_CENTROID',
+               'GOAL_CONFIDENCE', 'NODE_CENTROID', 'NODE_CONFIDENCE',
+               'POINT_OF_INTEREST')
+
+    def __init__(self):
+        """Create a SummaryBuilder."""
+        self.outputs = dict((name, SummaryOutput(self, name))
+                            for name in self.OUTPUTS)
+        self.reset(0.0, UNTRACED)
+
+    def reset(self, stamp, trace):
+        """Start summarizing a new frame.
+
+        :param stamp: When the frame was taken, in seconds.
+        :type stamp: float
+        :param trace: The frame's trace id.
+        :type trace: int
+        """
+        self.stamp = stamp
+        self.trace = trace
+        # The values published on each output.
+        self.values = dict.fromkeys(VALUE_BITS, 0.0)
+        self.valid = 0
+        self.seen = 0
+
+    def add(self, name, msg):
+        """Fill in the summary with a message published on an output.
+
+        :param name: Which output the message was published on.
+        :type name: str
+        :param msg: A traced message for the centroids and confidences, or a
+        String for a point of interest.
+        """
+        if name == 'POINT_OF_INTEREST':
+            bit, seen = POI_BITS[msg.data]
+            if seen:
+                self.seen |= bit
+            else:
+                self.seen &= ~bit
+        else:
+            bit = VALUE_BITS[name]
+            (self.values[name],), _, _ = untrace(msg)
+        self.valid |= bit
+
+    def summary(self):
+        """Get the summary of the frame so far.
+
+        :rtype: Summary
+        """
+        values = self.values
+        return Summary(self.stamp, self.trace, values['LANE_CENTROID'],
+                       values['GOAL_CENTROID'], values['NODE_CENTROID'],
+                       values['LANE_CONFIDENCE'], values['GOAL_CONFIDENCE'],
+                       values['NODE_CONFIDENCE'], self.valid, self.seen)
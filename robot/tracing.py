@@ -0,0 +1,88 @@
+from __future__ import division, print_function
+
+import time
+
+from robot.messages import Float64MultiArray
+
+# Where a traced frame's data goes, in order. The capture is when the frame
+# reached the CameraController (or the FrameService, with a frame ring),
+# since the robot's clock isn't synced with ours. A hop's latency is how long
+# after the previous hop it happened.
+HOPS = ('capture', 'vision', 'brain in', 'brain out', 'wheels')
+
+# Frames are traced from 1, so 0 means a message isn't traced.
+UNTRACED = 0
+
+
+def traced(values, stamp, trace):
+    """Build a message derived from a traced frame.
+
+    The message is a Float64MultiArray of the values, followed by the capture
+    stamp and trace id of the frame the values were derived from. Doubles
+    hold both exactly, which floats don't.
+
+    :param values: The message's payload.
+    :type values: A list of floats.
+    :param stamp: When the frame was captured, in seconds.
+    :type stamp: float
+    :param trace: The frame's trace id.
+    :type trace: int
+    :rtype: robot.messages.Float64MultiArray
+    """
+    msg = Float64MultiArray()
+    msg.data = traced_data(values, stamp, trace)
+    return msg
+
+
+def traced_data(values, stamp, trace):
+    """Build the data of a traced message. See traced()."""
+    return list(values) + [stamp, trace]
+
+
+def untrace(msg):
+    """Split a traced message into its values, stamp, and trace id.
+
+    :param msg: A message built by traced().
+    :type msg: robot.messages.Float64MultiArray
+    :returns: A (values, stamp, trace) tuple.
+    """
+    data = msg.data
+    return data[:-2], data[-2], int(data[-1])
+
+
+class Tracer(object):
+    """Report when traced frames pass through a hop to a LatencyCollector.
+
+    Only the first message of each frame through the hop is reported, so a
+    node can report every message it handles.
+    """
+
+    def __init__(self, publisher, hop):
+        """Create a Tracer.
+
+        :param publisher: The TRACE topic publisher, or None to not report.
+        :type publisher: rospy.Publisher
+        :param hop: Which of HOPS this is.
+        :type hop: str
+        """
+        self.publisher = publisher
+        self.hop = HOPS.index(hop)
+        self.last = UNTRACED
+
+    def report(self, stamp, trace, when=None):
+        """Report that a frame's data passed through the hop.
+
+        :param stamp: When the frame was captured, in seconds.
+        :type stamp: float
+        :param trace: The frame's trace id.
+        :type trace: int
+        :param when: When the data passed through, defaults to now.
+        :type when: float, optional
+        """
+        if self.publisher is None or trace == UNTRACED or trace == self.last:
+            return
+        self.last = trace
+        msg = Float64MultiArray()
+        msg.data = [trace, self.hop, stamp,
+                    time.time() if when is None else when]
+        self.publisher.publish(msg)
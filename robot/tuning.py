@@ -0,0 +1,231 @@
+from __future__ import division, print_function
+
+from collections import namedtuple
+
+import numpy as np
+
+from robot.course import MAX_WHEEL_SPEED, NEAR, NEAR_WIDTH
+from robot.nodes import Brain, DriveLine
+from robot.nodes.harness import FRAME_RATE
+from robot.summary import LANE
+
+# The Brain's DriveLine's wheel radius and half-axle length, in cm, and the
+# speed it line follows at, in wheel speed units.
+WHEEL_RADIUS = 5.0
+HALF_AXLE = 19.5 / 2
+BASE_SPEED = 8.0
+# Brain.setWheels() adds this to the left wheel speed the DriveLine asks
+# for, but doesn't feed it back to the DriveLine.
+TRIM = 0.5
+
+# The lane camera reads the bottom rows of the frame, so it sees the lane
+# this far ahead of the axle, across this wide a strip of floor, in cm.
+LOOKAHEAD = NEAR
+HALF_WIDTH = NEAR_WIDTH / 2
+
+# An error inside this band, as a fraction of the frame, counts as settled.
+BAND = 0.05
+# What a gain set costs: the seconds it takes to settle in each scenario,
+# plus this much per unit of overshoot and per crossing of the lane, plus
+# this much if it ever loses the lane off the side of the frame.
+OVERSHOOT_WEIGHT = 10.0
+CROSSING_WEIGHT = 0.5
+LOST_PENALTY = 100.0
+
+# Gain sets, as parallel arrays of each gain.
+Gains = namedtuple('Gains', 'kp ki kd')
+
+# Something for the robot to line follow. The offset is how far right of
+# the lane the robot starts, in cm. The lane is how far right of a straight
+# line the lane is at each tick, in cm, and the curvature is how sharply it
+# bends right at each tick, in 1/cm.
+Scenario = namedtuple('Scenario', 'name offset lane curvature')
+
+# How each gain set did in each scenario, as (gains, scenarios) arrays: the
+# furthest the error overshot zero, as a fraction of the frame, how long it
+# took to settle within BAND, in seconds, how many times the error crossed
+# the lane, and whether the lane was lost off the side of the frame. The
+# cost of each gain set is summed up over every scenario.
+Scores = namedtuple('Scores', 'gains overshoot settling crossings lost cost')
+
+
+def grid(kp, ki, kd):
+    """Every combination of the given gains.
+
+    :param kp: The Kp gains.
+    :param ki: The Ki gains.
+    :param kd: The Kd gains.
+    :type kp, ki, kd: Sequences of floats.
+    :rtype: Gains
+    """
+    kp, ki, kd = np.meshgrid(kp, ki, kd, indexing='ij')
+    return Gains(kp.ravel(), ki.ravel(), kd.ravel())
+
+
+def ticks(seconds, period=Brain.STATE_PERIOD):
+    """The times of the Brain's state steps over the given time, in seconds.
+    """
+    return np.arange(int(round(seconds / period))) * period
+
+
+def plant_scenarios(times):
+    """Starting off to either side of a straight lane, and bends either way.
+
+    :param times: The times of each tick, in seconds.
+    :type times: A NumPy array.
+    :rtype: A list of Scenario tuples.
+    """
+    straight = np.zeros_like(times)
+    scenarios = [Scenario('offset {:+.0f}cm'.format(offset), offset,
+                          straight, straight)
+                 for offset in (-20.0, -10.0, 10.0, 20.0)]
+    # Bends start a second in, once the robot has settled.
+    bend = (times >= 1.0).astype(float)
+    scenarios.extend(Scenario('bend r={:+.0f}cm'.format(radius), 0.0,
+                              straight, bend / radius)
+                     for radius in (-150.0, -80.0, 80.0, 150.0))
+    return scenarios
+
+
+def trace_scenario(name, stamps, errors, times):
+    """Follow a lane that moves the way a recorded lane error did.
+
+    The robot's own steering is part of a recorded error, so this isn't a
+    replay of what happened, but a realistically messy lane to follow.
+
+    :param name: The scenario's name.
+    :type name: str
+    :param stamps: When each error was seen, in seconds.
+    :param errors: The lane errors, as a fraction of the frame.
+    :param times: The times of each tick, in seconds.
+    :type stamps, errors, times: NumPy arrays.
+    :rtype: Scenario
+    """
+    lane = np.interp(times, stamps - stamps[0], errors) * HALF_WIDTH
+    return Scenario(name, 0.0, lane, np.zeros_like(times))
+
+
+def recorded_errors(path):
+    """Replay a recording through the vision pipeline for its lane errors.
+
+    :param path: The recording's path, without extension.
+    :type path: str
+    :returns: A (stamps, errors) tuple of NumPy arrays.
+    """
+    from robot.common import State
+    from robot.vision.replay import Replay
+    outputs = Replay(path).run(states=State.ON_PATH)
+    lanes = [(output.stamp, output.data.lane) for output in outputs
+             if output.topic == 'VISION_SUMMARY' and output.data.valid & LANE]
+    if not lanes:
+        raise ValueError('{} never sees the lane'.format(path))
+    stamps, errors = zip(*lanes)
+    return np.array(stamps), np.array(errors)
+
+
+def quantize(speed):
+    """Round wheel speeds the way the Wheels node sends them."""
+    percent = np.clip(np.trunc(speed / MAX_WHEEL_SPEED * 100), -100, 100)
+    return percent * MAX_WHEEL_SPEED / 100
+
+
+def evaluate(gains, scenarios, times, event_driven=False,
+             frame_rate=FRAME_RATE):
+    """Line follow every scenario with every gain set at once.
+
+    Each Brain state step runs the DriveLine's velocity form PID and wheel
+    model, exactly, on the newest lane error, and the robot drives on the
+    quantized wheel speeds, with the Brain's TRIM on the left one, until the
+    next step. The lane error is measured at the lane camera's lookahead,
+    once a frame. The lane tracker's smoothing isn't modeled.
+
+    :param gains: The gain sets.
+    :type gains: Gains
+    :param scenarios: What to line follow.
+    :type scenarios: A list of Scenario tuples.
+    :param times: The times of each tick, from ticks().
+    :type times: A NumPy array.
+    :param event_driven: Whether the Brain only steps when a frame arrives,
+    rather than every tick, defaults to False
+    :type event_driven: bool, optional
+    :param frame_rate: How many frames the camera takes a second, defaults
+    to FRAME_RATE
+    :type frame_rate: float, optional
+    :rtype: Scores
+    """
+    kp = np.asarray(gains.kp, dtype=float)[:, None]
+    ki = np.asarray(gains.ki, dtype=float)[:, None]
+    kd = np.asarray(gains.kd, dtype=float)[:, None]
+    shape = (kp.shape[0], len(scenarios))
+    lane = np.array([scenario.lane for scenario in scenarios]).T
+    curvature = np.array([scenario.curvature for scenario in scenarios]).T
+    frames = np.floor(times * frame_rate + 1e-9)
+    arrivals = np.concatenate(([True], np.diff(frames) > 0))
+    dt = times[1] - times[0]
+
+    # The robot's offset right of the lane, and heading right of it.
+    offset = np.empty(shape)
+    offset[:] = [scenario.offset for scenario in scenarios]
+    heading = np.zeros(shape)
+    # The DriveLine's state. The Brain feeds its wheel speeds back in, so
+    # the forward velocity never changes.
+    e_1 = np.zeros(shape)
+    e_2 = np.zeros(shape)
+    U = np.zeros(shape)
+    vel = WHEEL_RADIUS * BASE_SPEED
+    error = np.zeros(shape)
+
+    overshoot = np.zeros(shape)
+    settled = np.zeros(shape)
+    crossings = np.zeros(shape, dtype=int)
+    lost = np.zeros(shape, dtype=bool)
+    first = np.zeros(shape)
+    last = np.zeros(shape)
+
+    frame = 0
+    for tick in range(len(times)):
+        if arrivals[tick]:
+            frame += 1
+            seen = (lane[tick] + curvature[tick] * LOOKAHEAD ** 2 / 2 -
+                    offset - LOOKAHEAD * np.sin(heading)) / HALF_WIDTH
+            lost |= np.abs(seen) >= 1
+            error = np.clip(seen, -1, 1)
+
+            outside = np.abs(error) > BAND
+            settled[outside] = frame
+            sign = np.sign(error) * outside
+            crossings += (sign != 0) & (last != 0) & (sign != last)
+            last = np.where(sign != 0, sign, last)
+            first = np.where(first == 0, sign, first)
+            np.maximum(overshoot, -first * error, out=overshoot)
+
+        if arrivals[tick] or not event_driven:
+            # DriveLine.calcWheelSpeeds(), for every gain set.
+            U += (kp * (error - e_1) + ki * (error + e_1) +
+                  kd * (error - 2 * e_1 + e_2))
+            e_2 = e_1
+            e_1 = error
+        left = quantize((vel + HALF_AXLE * U) / WHEEL_RADIUS + TRIM)
+        right = quantize((vel - HALF_AXLE * U) / WHEEL_RADIUS)
+
+        v = WHEEL_RADIUS * (left + right) / 2
+        w = WHEEL_RADIUS * (left - right) / (2 * HALF_AXLE)
+        offset += v * np.sin(heading) * dt
+        heading += (w - curvature[tick] * v * np.cos(heading)) * dt
+
+    settling = settled / frame_rate
+    cost = (settling + OVERSHOOT_WEIGHT * overshoot +
+            CROSSING_WEIGHT * crossings).mean(axis=1)
+    cost += LOST_PENALTY * lost.any(axis=1)
+    return Scores(gains, overshoot, settling, crossings, lost, cost)
+
+
+def stock():
+    """The DriveLine's own gains, as a gain set of one."""
+    return Gains(np.array([DriveLine.Kp]), np.array([DriveLine.Ki]),
+                 np.array([DriveLine.Kd]))
+
+
+def ranked(scores, count=10):
+    """The indices of the cheapest gain sets, cheapest first."""
+    return np.argsort(scores.cost, kind='mergesort')[:count]
@@ -1,4 +1,7 @@
-"""A collection of computer vision nodes and utilities."""
+"""A collection of computer vision nodes and utilities.
 
-from .contours import ContourDetector
-from .camera import CameraController
+The CameraController lives in robot.vision.camera, and isn't imported here,
+so the pipeline and its tools can be used without ROS.
+"""
+
+from .frame_graph import FrameGraph
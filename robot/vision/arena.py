@@ -0,0 +1,60 @@
+from __future__ import division, print_function
+
+import numpy as np
+
+
+class BufferArena(object):
+    """A collection of preallocated arrays, reused from frame to frame.
+
+    Every frame is the same size, so once each buffer has been allocated on the
+    first frame, processing a frame doesn't need to allocate any more arrays.
+    Pass the buffers to OpenCV and NumPy functions as their dst= (or out=)
+    arguments.
+
+    NOTE: The contents of a buffer are only good until the next frame.
+    """
+
+    def __init__(self):
+        """Create an empty BufferArena."""
+        self.buffers = {}
+        self.kept = {}
+
+    def buffer(self, key, shape, dtype=np.uint8):
+        """Get the buffer with the given key, allocating it if needed.
+
+        The buffer is a view of the start of a flat buffer that only ever
+        grows, so a shape that changes from frame to frame (e.g., the width
+        of the lane window, or the band of rows the current state's Cameras
+        read) only allocates when it's bigger than it's ever been.
+
+        :param key: Anything hashable that uniquely names the buffer.
+        :param shape: The shape the buffer should have.
+        :type shape: tuple
+        :param dtype: The type the buffer should have, defaults to np.uint8
+        :type dtype: numpy.dtype, optional
+        """
+        size = 1
+        for length in shape:
+            size *= length
+        flat = self.buffers.get(key)
+        if flat is None or flat.size < size or flat.dtype != dtype:
+            flat = np.empty(size, dtype=dtype)
+            self.buffers[key] = flat
+        return flat[:size].reshape(shape)
+
+    def like(self, key, array):
+        """Get the buffer with the given key, shaped like the given array."""
+        return self.buffer(key, array.shape, array.dtype)
+
+    def reuse(self, key):
+        """Get an array kept with keep(), or None if there isn't one."""
+        return self.kept.get(key)
+
+    def keep(self, key, array):
+        """Keep an array somebody else allocated, to reuse next frame.
+
+        For outputs whose shape isn't known until they're computed, e.g., the
+        stats of however many blobs a mask has. OpenCV reuses an output it's
+        given if it's the right shape, and it usually is.
+        """
+        self.kept[key] = array
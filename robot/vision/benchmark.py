@@ -0,0 +1,302 @@
+from __future__ import division, print_function
+
+from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
+from timeit import default_timer as timer
+
+import cv2
+import numpy as np
+
+from robot.common import TOPIC
+
+from . import frame_graph
+from .arena import BufferArena
+from .frame_graph import FrameGraph
+from .pipeline import VisionPipeline
+from .scenes import encode, scenes as render_scenes
+from .schedule import SCHEDULE
+
+# We can only measure allocations on Pythons with tracemalloc (or its
+# pytracemalloc backport).
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+# The pipeline outputs each detector is constructed with.
+DETECTOR_OUTPUTS = {
+    'lane': ('LANE_CENTROID', 'LANE_CONFIDENCE'),
+    'stoplight': ('POINT_OF_INTEREST',),
+    'obstacle': ('POINT_OF_INTEREST',),
+    'goal': ('GOAL_CENTROID', 'POINT_OF_INTEREST', 'GOAL_CONFIDENCE'),
+    'node': ('NODE_CENTROID', 'POINT_OF_INTEREST', 'NODE_CONFIDENCE'),
+}
+
+# The frame rate the stamps of benchmarked frames advance at.
+FRAME_RATE = 30
+
+# How long some benchmark took per frame. The latencies are in seconds, and
+# allocated is the average peak bytes allocated while processing a frame, or
+# None if we can't measure it.
+Timing = namedtuple('Timing', 'name frames fps p50 p95 p99 allocated')
+
+
+class Variant(namedtuple('Variant', 'name cameras mask options')):
+    """An implementation of the vision pipeline to benchmark.
+
+    :param name: What to call the variant in the report.
+    :param cameras: Camera classes to use instead of the stock ones, keyed by
+    their schedule name (lane, stoplight, obstacle, goal, node). They're
+    constructed with the same arguments as the stock Cameras.
+    :param mask: A function to use instead of robot.vision.mask.mask_image.
+    :param options: Any robot.vision.pipeline.VisionPipeline options.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, name, cameras=None, mask=None, **options):
+        """Declare a variant of the vision pipeline."""
+        return super(Variant, cls).__new__(cls, name, cameras or {}, mask,
+                                           options)
+
+
+# The pipeline as it is.
+STOCK = Variant('stock')
+
+
+class NullPublisher(object):
+    """Stand in for a ROS publisher, counting and discarding messages."""
+
+    def __init__(self):
+        """Create a NullPublisher."""
+        self.count = 0
+
+    def publish(self, msg):
+        """Discard a message."""
+        self.count += 1
+
+
+@contextmanager
+def masking_with(mask):
+    """Have every Mask use the given masking function for a while."""
+    if mask is None:
+        yield
+        return
+    stock = frame_graph.mask_image
+    frame_graph.mask_image = mask
+    try:
+        yield
+    finally:
+        frame_graph.mask_image = stock
+
+
+def summarize(name, seconds, allocated=None):
+    """Summarize the per-frame processing times of a benchmark.
+
+    :param name: The benchmark's name.
+    :type name: str
+    :param seconds: How long each frame took.
+    :type seconds: A list of floats.
+    :param allocated: The peak bytes allocated by each frame, if measured.
+    :type allocated: A list of ints, optional
+    :rtype: Timing
+    """
+    seconds = np.asarray(seconds)
+    p50, p95, p99 = np.percentile(seconds, [50, 95, 99])
+    total = seconds.sum()
+    return Timing(name, len(seconds), len(seconds) / total if total else 0.0,
+                  p50, p95, p99,
+                  np.mean(allocated) if allocated else None)
+
+
+def measure(process, frames, allocations=10):
+    """Time a function over some frames, and measure what it allocates.
+
+    :param process: Process the ith frame.
+    :type process: A function of the frame number.
+    :param frames: How many frames to time.
+    :type frames: int
+    :param allocations: How many extra frames to measure the allocations of.
+    Allocations are measured separately, since tracing them is slow.
+    :type allocations: int
+    :returns: The (seconds, allocated) lists of each frame.
+    """
+    seconds = []
+    for i in range(frames):
+        start = timer()
+        process(i)
+        seconds.append(timer() - start)
+
+    allocated = []
+    if tracemalloc is not None and allocations:
+        for i in range(frames, frames + allocations):
+            allocated.append(peak_allocated(process, i))
+    return seconds, allocated
+
+
+def peak_allocated(process, *args):
+    """Measure the most memory a function has allocated at once while running.
+
+    :param process: The function.
+    :param args: What to call it with.
+    :returns: The peak bytes allocated.
+    :rtype: int
+    """
+    # Only what's allocated since tracing started is traced, so restarting
+    # it zeroes the traced memory and its peak. tracemalloc.reset_peak()
+    # would do, but it's new in Python 3.9.
+    tracemalloc.start()
+    try:
+        process(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+class Benchmark(object):
+    """Benchmark the vision pipeline on synthetic scenes, without ROS.
+
+    Each detector is timed on its own, on already converted frames of the
+    scenes it would see, and the whole pipeline (what the CameraController
+    does for every frame) is timed on the compressed scenes for every state.
+    """
+
+    def __init__(self, frames=300, noise=4.0):
+        """Create a Benchmark.
+
+        :param frames: How many frames to time each benchmark on, defaults to
+        300
+        :type frames: int, optional
+        :param noise: How much sensor noise to add to the scenes, defaults to
+        4.0
+        :type noise: float, optional
+        """
+        self.frames = frames
+        self.scenes = render_scenes(noise)
+        self.compressed = [encode(scene.image) for scene in self.scenes]
+
+    @staticmethod
+    def pipeline(variant):
+        """Build the vision pipeline of a variant, with stub publishers."""
+        publishers = dict((key, NullPublisher()) for key in TOPIC)
+        options = dict(governor=False)
+        options.update(variant.options)
+        pipeline = VisionPipeline(publishers, **options)
+        for name, cls in variant.cameras.items():
+            camera = cls(*[pipeline.outputs[output]
+                           for output in DETECTOR_OUTPUTS[name]])
+            stock = pipeline.scheduler.detectors[name]
+            pipeline.cameras[pipeline.cameras.index(stock)] = camera
+            pipeline.scheduler.detectors[name] = camera
+        return pipeline
+
+    def detectors(self, variant=STOCK):
+        """Time each detector on its own.
+
+        :returns: A Timing for each detector.
+        """
+        pipeline = self.pipeline(variant)
+        timings = []
+        for name, camera in sorted(pipeline.scheduler.detectors.items()):
+            # Only show each detector the scenes it would actually see.
+            frames = []
+            for scene in self.scenes:
+                if name not in [n for n, _ in SCHEDULE.get(scene.state, ())]:
+                    continue
+                scale = camera.DECODE_SCALE
+                bgr = scene.image
+                if scale > 1:
+                    bgr = cv2.resize(bgr, None, fx=1 / scale, fy=1 / scale,
+                                     interpolation=cv2.INTER_AREA)
+                graph = pipeline.convert_frame(bgr, 0, scale, [camera], 0.0)
+                frames.append((graph.image.copy(), graph.offset, graph.scale))
+            if not frames:
+                continue
+
+            graph = FrameGraph(frames[0][0], arena=BufferArena())
+
+            def process(i):
+                image, offset, scale = frames[i % len(frames)]
+                graph.reset(image, offset=offset,
+                            height=pipeline.frame_height, scale=scale,
+                            table=pipeline.color_table, stamp=i / FRAME_RATE)
+                camera.process_frame(graph)
+
+            with masking_with(variant.mask):
+                timings.append(summarize(name, *measure(process,
+                                                        self.frames)))
+        return timings
+
+    def end_to_end(self, variant=STOCK):
+        """Time the whole pipeline on compressed frames, in every state.
+
+        :returns: A Timing for each state the scenes were rendered for, and
+        one for every scene together.
+        """
+        benchmarks = OrderedDict()
+        for scene, data in zip(self.scenes, self.compressed):
+            name = 'e2e ' + scene.state.name
+            benchmarks.setdefault(name, []).append((scene.state, data))
+        benchmarks['e2e all'] = [(scene.state, data) for scene, data
+                                 in zip(self.scenes, self.compressed)]
+
+        timings = []
+        for name, frames in benchmarks.items():
+            pipeline = self.pipeline(variant)
+            pipeline.start()
+
+            def process(i):
+                state, data = frames[i % len(frames)]
+                pipeline.process(data, state, i / FRAME_RATE)
+
+            try:
+                with masking_with(variant.mask):
+                    timings.append(summarize(name, *measure(process,
+                                                            self.frames)))
+            finally:
+                pipeline.stop()
+        return timings
+
+    def run(self, variants=(STOCK,)):
+        """Run every benchmark on each variant.
+
+        :returns: A list of Timings for each variant, keyed by variant name.
+        :rtype: collections.OrderedDict
+        """
+        results = OrderedDict()
+        for variant in variants:
+            results[variant.name] = (self.detectors(variant) +
+                                     self.end_to_end(variant))
+        return results
+
+
+def report(results):
+    """Format benchmark results as a table, with variants side by side.
+
+    :param results: The results of Benchmark.run().
+    :returns: The table.
+    :rtype: str
+    """
+    names = list(results)
+    rows = OrderedDict()
+    for variant, timings in results.items():
+        for timing in timings:
+            rows.setdefault(timing.name, {})[variant] = timing
+
+    lines = ['{:<18} {:<14} {:>8} {:>8} {:>8} {:>8} {:>10}'.format(
+        'benchmark', 'variant', 'fps', 'p50 ms', 'p95 ms', 'p99 ms',
+        'alloc KiB')]
+    for row, timings in rows.items():
+        for variant in names:
+            timing = timings.get(variant)
+            if timing is None:
+                continue
+            allocated = '-' if timing.allocated is None else '{:.1f}'.format(
+                timing.allocated / 1024)
+            lines.append(
+                '{:<18} {:<14} {:>8.1f} {:>8.3f} {:>8.3f} {:>8.3f} {:>10}'
+                .format(row, variant, timing.fps, timing.p50 * 1000,
+                        timing.p95 * 1000, timing.p99 * 1000, allocated))
+            row = ''
+    return '\n'.join(lines)
@@ -0,0 +1,77 @@
+from __future__ import division, print_function
+
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# A connected blob of mask pixels. The area is in pixels, the centroid (cx, cy)
+# is the mean pixel position, and (left, top, width, height) is its bounding
+# box.
+Blob = namedtuple('Blob', 'area cx cy left top width height')
+
+
+def largest_blob(mask, arena=None, key=None):
+    """Find the biggest blob in a mask in one pass.
+
+    This replaces finding the contours of the mask, picking the one with the
+    biggest area, and then computing its moments.
+
+    :param mask: The mask to search.
+    :type mask: A 2D numpy array of 0 and 255 values.
+    :param arena: Where to keep the labels and stats of the mask's blobs, so
+    they aren't reallocated every frame, defaults to allocating them.
+    :type arena: robot.vision.arena.BufferArena, optional
+    :param key: Which of the arena's blob buffers to use. Blobs searched for
+    at the same time need their own, defaults to None
+    :returns: The biggest blob, or None if the mask is empty.
+    :rtype: Blob
+    """
+    labels = stats = centroids = None
+    if arena is not None:
+        labels = arena.buffer(('labels', key), mask.shape, np.int32)
+        stats = arena.reuse(('stats', key))
+        centroids = arena.reuse(('centroids', key))
+    count, _, stats, centroids = cv2.connectedComponentsWithStats(
+        mask, labels, stats, centroids, 8, cv2.CV_32S)
+    if arena is not None:
+        arena.keep(('stats', key), stats)
+        arena.keep(('centroids', key), centroids)
+    # Label 0 is the background.
+    if count < 2:
+        return None
+    i = 1 + stats[1:, cv2.CC_STAT_AREA].argmax()
+    left, top, width, height, area = stats[i]
+    cx, cy = centroids[i]
+    return Blob(int(area), cx, cy, int(left), int(top), int(width),
+                int(height))
+
+
+def contour_blob(mask):
+    """Find the biggest blob in a mask from its contours, the way we used to.
+
+    The area and centroid are of the polygon through the centers of the
+    blob's edge pixels, so they come up short of largest_blob's by about
+    half a perimeter. This is only kept to check largest_blob against.
+
+    :param mask: The mask to search.
+    :type mask: A 2D numpy array of 0 and 255 values.
+    :returns: The biggest blob, or None if the mask is empty. If the blob is
+    only a line of pixels, its centroid is None.
+    :rtype: Blob
+    """
+    # OpenCV 3 returns the image, contours, and hierarchy, and 2 and 4 only
+    # the contours and hierarchy.
+    contours = cv2.findContours(mask, cv2.RETR_LIST,
+                                cv2.CHAIN_APPROX_SIMPLE)[-2]
+    if not contours:
+        return None
+    areas = [cv2.contourArea(contour) for contour in contours]
+    contour = contours[int(np.argmax(areas))]
+    moments = cv2.moments(contour)
+    cx = cy = None
+    if moments['m00'] != 0:
+        cx = moments['m10'] / moments['m00']
+        cy = moments['m01'] / moments['m00']
+    left, top, width, height = cv2.boundingRect(contour)
+    return Blob(max(areas), cx, cy, left, top, width, height)
@@ -0,0 +1,176 @@
+from __future__ import division, print_function
+
+from collections import namedtuple, OrderedDict
+
+import cv2
+import numpy as np
+
+from robot.common import TOPIC
+
+from .benchmark import NullPublisher
+from .blob import contour_blob, largest_blob
+from .camera_goal import GoalCamera
+from .camera_lane import LaneCamera
+from .camera_node import NodeCamera
+from .frame_graph import LargestBlob
+from .pipeline import VisionPipeline
+from .recording import Recording
+
+# The blob searches the detectors steer by or threshold, by name: the
+# detector that runs each one, and the search. The lane camera only searches
+# its mask around where it tracks the lane, so its whole mask is compared.
+SEARCHES = OrderedDict([
+    ('lane', ('lane', LargestBlob(LaneCamera.WHITE_MASK))),
+    ('goal', ('goal', GoalCamera.GOAL)),
+    ('node', ('node', NodeCamera.NODE)),
+    ('node poi', ('node', NodeCamera.NODE_POI)),
+])
+
+# The area thresholds of the searches that have one, as (contour, blob)
+# areas in full resolution pixels. The contour areas are the thresholds the
+# detectors were tuned with.
+THRESHOLDS = {
+    'goal': (10000, GoalCamera.MIN_GOAL_AREA),
+    'node': (20000, NodeCamera.MIN_NODE_AREA),
+    'node poi': (5000, NodeCamera.MIN_POI_AREA),
+}
+
+# The centroids may differ by this many pixels of the frame the detector
+# searched, which moves the published centroid signal by twice that over
+# the frame's width.
+CENTROID_TOLERANCE = 2
+# A blob may land on the other side of a threshold than its contour did if
+# its contour area is within this fraction of the threshold, since how far
+# the contour runs inside the blob depends on its shape.
+AREA_TOLERANCE = 0.02
+
+# The biggest blob a search found in one frame, both ways. The areas are in
+# full resolution pixels, and the centroids in pixels of the searched frame.
+# The contour centroid is None if the contour has no area.
+Pair = namedtuple('Pair', 'search area contour_area cx contour_cx')
+
+# How the blobs of a search compared over many frames: how many frames
+# either way found a blob in, how many only one way did, the furthest apart
+# their centroids were, the smallest and biggest ratio of blob to contour
+# area, and how many frames landed on different sides of the threshold,
+# outside AREA_TOLERANCE.
+Agreement = namedtuple('Agreement', 'search frames missed centroid '
+                                    'low_ratio high_ratio flipped')
+
+
+def decoded(path):
+    """Decode every frame of a recording.
+
+    :param path: The recording's path, without extension.
+    :type path: str
+    :returns: An iterator of OpenCV BGR images.
+    """
+    recording = Recording(path)
+    for i in range(len(recording)):
+        data, _, _ = recording[i]
+        yield cv2.imdecode(np.asarray(data), cv2.IMREAD_COLOR)
+
+
+def pairs(images):
+    """Find the biggest blob of every search in some frames, both ways.
+
+    :param images: The full resolution frames.
+    :type images: An iterable of OpenCV BGR images.
+    :returns: An iterator of Pairs, or of (search, None, None, None, None)
+    tuples where neither way finds a blob.
+    """
+    publishers = dict((key, NullPublisher()) for key in TOPIC)
+    pipeline = VisionPipeline(publishers, governor=False)
+    for image in images:
+        for name, (detector, search) in SEARCHES.items():
+            camera = pipeline.scheduler.detectors[detector]
+            scale = camera.DECODE_SCALE
+            bgr = image
+            if scale > 1:
+                bgr = cv2.resize(image, None, fx=1 / scale, fy=1 / scale,
+                                 interpolation=cv2.INTER_AREA)
+            graph = pipeline.convert_frame(bgr, 0, scale, [camera], 0.0)
+            mask = graph.crop(graph[search.mask], search.crop)
+            blob = largest_blob(mask)
+            contour = contour_blob(mask)
+            yield Pair(name,
+                       None if blob is None else blob.area * scale ** 2,
+                       None if contour is None else
+                       contour.area * scale ** 2,
+                       None if blob is None else blob.cx,
+                       None if contour is None else contour.cx)
+
+
+def flipped(pair):
+    """Whether a blob and its contour land on different sides of their
+    search's threshold, and the contour isn't within AREA_TOLERANCE of it.
+    """
+    if pair.search not in THRESHOLDS or pair.area is None:
+        return False
+    old, new = THRESHOLDS[pair.search]
+    if abs(pair.contour_area - old) <= AREA_TOLERANCE * old:
+        return False
+    return (pair.contour_area > old) != (pair.area > new)
+
+
+def compare(images):
+    """Compare largest_blob with the contour search it replaced.
+
+    :param images: The full resolution frames.
+    :type images: An iterable of OpenCV BGR images.
+    :returns: An Agreement for each search.
+    :rtype: A list of Agreements.
+    """
+    found = OrderedDict((name, []) for name in SEARCHES)
+    missed = dict.fromkeys(SEARCHES, 0)
+    for pair in pairs(images):
+        if pair.area is None and pair.contour_area is None:
+            continue
+        if pair.area is None or pair.contour_area is None:
+            missed[pair.search] += 1
+        else:
+            found[pair.search].append(pair)
+
+    agreements = []
+    for name, matched in found.items():
+        centroid = max([abs(int(pair.cx) - int(pair.contour_cx))
+                        for pair in matched
+                        if pair.contour_cx is not None] or [0])
+        # Blobs of a pixel or two have no contour area.
+        ratios = [pair.area / pair.contour_area for pair in matched
+                  if pair.contour_area]
+        agreements.append(Agreement(
+            name, len(matched) + missed[name], missed[name], centroid,
+            min(ratios or [1.0]), max(ratios or [1.0]),
+            sum(flipped(pair) for pair in matched)))
+    return agreements
+
+
+def agrees(agreement):
+    """Whether a search's blobs are within tolerance of its contours."""
+    return (not agreement.missed and not agreement.flipped and
+            agreement.centroid <= CENTROID_TOLERANCE)
+
+
+def report(source, agreements):
+    """Format how the searches compared on some frames as a table.
+
+    :param source: Where the frames came from.
+    :type source: str
+    :param agreements: The results of compare().
+    :returns: The table.
+    :rtype: str
+    """
+    lines = ['{}: blob vs. contour, within {}px and {:.0%} of the '
+             'thresholds'.format(source, CENTROID_TOLERANCE, AREA_TOLERANCE),
+             '{:<10} {:>7} {:>7} {:>9} {:>13} {:>8} {:>4}'.format(
+                 'search', 'frames', 'missed', 'cx px', 'area ratio',
+                 'flipped', 'ok')]
+    for agreement in agreements:
+        lines.append('{:<10} {:>7} {:>7} {:>9} {:>6.3f}-{:<6.3f} {:>8} {:>4}'
+                     .format(agreement.search, agreement.frames,
+                             agreement.missed, agreement.centroid,
+                             agreement.low_ratio, agreement.high_ratio,
+                             agreement.flipped,
+                             'yes' if agrees(agreement) else 'NO'))
+    return '\n'.join(lines)
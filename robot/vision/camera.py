@@ -1,19 +1,22 @@
 from __future__ import division, print_function
 
-import cv2
+import sys
+import threading
+import time
+import traceback
+
+import numpy as np
 import rospy as ros
-from cv_bridge import CvBridge, CvBridgeError
 from sensor_msgs.msg import CompressedImage
-from std_msgs.msg import Float32, String, UInt8
+from std_msgs.msg import Float64MultiArray, UInt8, UInt8MultiArray
 
 from robot.common import TOPIC, State
 from robot.nodes import Node
 
-from .camera_goal import GoalCamera
-from .camera_lane import LaneCamera
-from .camera_node import NodeCamera
-from .camera_obstacle import ObstacleCamera
-from .camera_stoplight import StoplightCamera
+from .frame_ring import FrameRing
+from .mailbox import Mailbox
+from .pipeline import VisionPipeline
+from .stages import StagedPipeline
 
 
 class CameraController(Node):
@@ -28,17 +31,16 @@ class CameraController(Node):
 
     This node publishes:
 
-    /robot/centroid (Float32) - The centroid of the lane contour. There well be
-    no messages published on this topic if the current state is not currently
-    line-following.
-    /robot/encounter (String) - A string serialization of any points we
-    encounter. E.g., a stoplight, or the parking lot entrance.
+    /geekbot/vision_summary (UInt8MultiArray) - A fixed layout summary of
+    everything the cameras found in each frame they processed: the lane,
+    goal, and node centroids, any points we encounter (e.g., a stoplight, or
+    the parking lot exit), and the frame's stamp and trace id. See
+    robot.summary.
     """
 
-    # How much do we blur the image
-    BLUR_KERNEL = (5, 5)
-
-    def __init__(self, camera_topic, state_topic, verbose=False):
+    def __init__(self, camera_topic, state_topic, verbose=False,
+                 color_table=False, latest_only=False, threads=0,
+                 governor=False, bus=None, frame_ring=None, stages=0):
         """Initialize the CameraController node with the proper topics.
 
         :param camera_topic: The topic publishing the compressed video feed.
@@ -48,8 +50,37 @@ class CameraController(Node):
         :param verbose: Whether or not to console spam with useless random
         info.
         :type verbose: bool
+        :param color_table: Classify pixels with a precomputed lookup table
+        instead of converting to HSV and masking each color separately. The
+        table path blurs in BGR rather than HSV, so masks can differ at color
+        edges, but not enough to change what the detectors publish, beyond
+        the node confidence (see ColorTable), defaults to False
+        :type color_table: bool, optional
+        :param latest_only: Process frames in a worker thread that always takes
+        the newest frame, dropping any stale frames that arrived while it was
+        busy, defaults to False
+        :type latest_only: bool, optional
+        :param threads: Run the active Cameras concurrently on a pool of this
+        many threads. OpenCV releases the GIL, so this actually helps. Ignored
+        when verbose, since the GUI must stay on one thread, defaults to 0
+        :type threads: int, optional
+        :param governor: Run the goal, node, and obstacle detectors less often
+        when the detectors take longer than VisionPipeline.FRAME_BUDGET a
+        frame, except the one the robot's state steers by, defaults to False
+        :type governor: bool, optional
+        :param bus: What to publish and subscribe with, defaults to rospy
+        :type bus: robot.nodes.bus.Bus, optional
+        :param frame_ring: Read frames a FrameService already decoded out of
+        the frame ring at this path, instead of decoding the camera feed
+        ourselves, defaults to None
+        :type frame_ring: str, optional
+        :param stages: Decode, convert, and detect consecutive frames
+        concurrently, in separate processes, with up to this many frames
+        waiting per stage. Ignored with a frame ring, defaults to 0
+        :type stages: int, optional
         """
-        super(CameraController, self).__init__(name='CameraController')
+        super(CameraController, self).__init__(name='CameraController',
+                                               bus=bus)
 
         self.camera_topic = camera_topic
         self.state_topic = state_topic
@@ -57,26 +88,103 @@ class CameraController(Node):
         self.verbose = verbose
         # Force the camera's state during testing:wq
         self.state = State.ON_PATH
-        self.bridge = CvBridge()
-
-        poi_pub = ros.Publisher(
-            TOPIC['POINT_OF_INTEREST'], String, queue_size=1)
-        lane_pub = ros.Publisher(TOPIC['LANE_CENTROID'], Float32, queue_size=1)
-        exit_pub = ros.Publisher(TOPIC['GOAL_CENTROID'], Float32, queue_size=1)
-        node_pub = ros.Publisher(TOPIC['NODE_CENTROID'], Float32, queue_size=1)
 
-        self.lane_camera = LaneCamera(lane_pub, verbose=False)
-        self.stoplight_cam = StoplightCamera(poi_pub, verbose=False)
-        self.obstacle_cam = ObstacleCamera(poi_pub, verbose=False)
-        self.exit_cam = GoalCamera(exit_pub, poi_pub, verbose=verbose)
-        self.node_cam = NodeCamera(node_pub, poi_pub, verbose=verbose)
+        publishers = {
+            'VISION_SUMMARY': self.bus.Publisher(
+                TOPIC['VISION_SUMMARY'], UInt8MultiArray, queue_size=1),
+            'TRACE': self.bus.Publisher(
+                TOPIC['TRACE'], Float64MultiArray, queue_size=10),
+        }
+        self.pipeline = VisionPipeline(publishers,
+                                       verbose=verbose,
+                                       color_table=color_table,
+                                       threads=threads,
+                                       governor=governor)
+        # What the camera feed's frames are handed to.
+        self.runner = self.pipeline
+        if stages and frame_ring is None:
+            self.runner = StagedPipeline(self.pipeline, depth=stages)
+
+        self.frame_ring = frame_ring
+        # Our copy of the frame ring's newest frame, reused every frame.
+        self.ring_copy = None
+        # How many frames the FrameService overwrote while we copied them.
+        self.overwritten = 0
+        self.latest_only = latest_only
+        self.mailbox = None
+        self.worker = None
 
     def init_node(self):
         """Perform custom Node initialization."""
-        # We only want the subscribers running in the Node's process, not the
-        # parent's too...
-        ros.Subscriber(self.camera_topic, CompressedImage, self.image_handler)
-        ros.Subscriber(self.state_topic, UInt8, self.state_handler)
+        # We only want the subscribers (and threads) running in the Node's
+        # process, not the parent's too...
+        self.runner.start()
+        if self.frame_ring is not None:
+            # The ring only ever has the newest frames anyway.
+            self.worker = threading.Thread(target=self.ring_worker)
+            self.worker.daemon = True
+            self.worker.start()
+        elif self.latest_only:
+            # Keep the subscriber callback as quick as possible, so frames
+            # never queue up behind a slow frame.
+            self.mailbox = Mailbox()
+            self.worker = threading.Thread(target=self.frame_worker)
+            self.worker.daemon = True
+            self.worker.start()
+            self.bus.Subscriber(self.camera_topic, CompressedImage,
+                                self.mailbox.put, queue_size=1)
+        else:
+            self.bus.Subscriber(self.camera_topic, CompressedImage,
+                                self.image_handler)
+        self.bus.Subscriber(self.state_topic, UInt8, self.state_handler)
+
+    def frame_worker(self):
+        """Process the newest frame in the mailbox until we're shut down."""
+        while not ros.is_shutdown() and not self.mailbox.closed:
+            compressed = self.mailbox.get(timeout=0.5)
+            if compressed is None:
+                continue
+            # rospy would log a callback's exception and carry on with the
+            # next frame, so we do too.
+            try:
+                self.image_handler(compressed)
+            except Exception:
+                print('Processing a frame raised:', file=sys.stderr)
+                traceback.print_exc()
+
+    def ring_worker(self):
+        """Process each new frame in the frame ring until we're shut down."""
+        ring = None
+        sequence = 0
+        while not ros.is_shutdown():
+            if ring is None:
+                ring = FrameRing.open(self.frame_ring, timeout=0.5)
+                sequence = 0
+                continue
+            frame = ring.wait(sequence, timeout=0.5)
+            if frame is None:
+                if ring.stale:
+                    ring = None
+                continue
+            sequence = frame.sequence
+            # The frame is a view of the ring, which the FrameService will
+            # overwrite once it comes back around to the slot, so copy it out
+            # before the detectors see it. If it was overwritten while we
+            # copied it, the copy may be half one frame and half another.
+            if self.ring_copy is None or self.ring_copy.shape != ring.shape:
+                self.ring_copy = np.empty_like(frame.bgr)
+            np.copyto(self.ring_copy, frame.bgr)
+            if not ring.valid(frame):
+                self.overwritten += 1
+                continue
+            # Like frame_worker(), carry on with the next frame.
+            try:
+                self.pipeline.process_decoded(self.ring_copy, self.state,
+                                              frame.stamp)
+            except Exception:
+                print('Processing frame {} raised:'.format(frame.sequence),
+                      file=sys.stderr)
+                traceback.print_exc()
 
     def image_handler(self, compressed):
         """Handle each compressed video frame.
@@ -87,53 +195,7 @@ class CameraController(Node):
         :param compressed: The compressed video frame.
         :type compressed: sensor_msgs.msg.CompressedImage
         """
-        try:
-            # Decompress the message into an openCV frame.
-            bgr_frame = self.bridge.compressed_imgmsg_to_cv2(
-                compressed, 'bgr8')
-        except CvBridgeError as e:
-            print(e)
-
-        # Convert BGR to HSV.
-        hsv_frame = cv2.cvtColor(bgr_frame, cv2.COLOR_BGR2HSV)
-
-        # Blur the image before doing anything.
-        hsv_frame = cv2.GaussianBlur(hsv_frame, self.BLUR_KERNEL, 0)
-
-        if self.state == State.ON_PATH or                                     \
-           self.state == State.G_ON_PATH or                                   \
-           self.state == State.ORIENTING or                                   \
-           self.state == State.STOPPING:
-            self.lane_camera.process_image(hsv_frame)
-
-        if self.state == State.ON_PATH or                                     \
-           self.state == State.STOPPING:
-            self.stoplight_cam.process_image(hsv_frame)
-
-        if self.state == State.CANCER or                                      \
-           self.state == State.SPIN or                                        \
-           self.state == State.TURN:
-            self.obstacle_cam.process_image(hsv_frame)
-
-        if self.state == State.CANCER or                                      \
-           self.state == State.SPIN or                                        \
-           self.state == State.MTG:
-            self.exit_cam.process_image(hsv_frame)
-
-        if self.state == State.G_ON_PATH or                                   \
-           self.state == State.END or                                         \
-           self.state == State.NODE_STOPPING or                               \
-           self.state == State.NODE_STOPPED or                                \
-           self.state == State.ROTATE_LEFT or                                 \
-           self.state == State.ROTATE_RIGHT or                                \
-           self.state == State.ORIENTING or                                   \
-           self.state == State.FORWARD:
-            self.node_cam.process_image(hsv_frame)
-
-        if self.verbose:
-            cv2.namedWindow('Camera', cv2.WINDOW_NORMAL)
-            cv2.imshow('Camera', bgr_frame)
-            cv2.waitKey(10)
+        self.runner.process(compressed.data, self.state, time.time())
 
     def state_handler(self, state):
         """Handle each state update.
@@ -147,6 +209,10 @@ class CameraController(Node):
 
     def stop(self):
         """Destroy any open OpenCV windows before terminating this node."""
-        if self.verbose:
-            cv2.destroyAllWindows()
+        if self.mailbox is not None:
+            self.mailbox.close()
+            print('Dropped {} stale frames.'.format(self.mailbox.dropped))
+        if self.frame_ring is not None:
+            print('Dropped {} overwritten frames.'.format(self.overwritten))
+        self.runner.stop()
         super(CameraController, self).stop()
@@ -1,11 +1,24 @@
 from abc import ABCMeta, abstractmethod
 
+from .arena import BufferArena
+from .frame_graph import FrameGraph, Mask, thaw
+
 
 class Camera(object):
     """An abstract base class for camera processing."""
 
     __metaclass__ = ABCMeta
 
+    # The largest factor this Camera can tolerate frames being downscaled by.
+    DECODE_SCALE = 1
+
+    # How many times any Camera's Masks have been changed with set_mask(), so
+    # whatever is worked out from them knows when to work it out again.
+    mask_version = 0
+    # The Masks each Camera class declared, as a (mask_version, Masks) tuple
+    # by class.
+    declared = {}
+
     def __init__(self, publisher, verbose=False):
         """Create a base Camera that publishes on the given publisher.
 
@@ -17,15 +30,76 @@ class Camera(object):
         """
         self.publisher = publisher
         self.verbose = verbose
+        # Scratch space for the Camera's own per-frame temporaries.
+        self.arena = BufferArena()
+
+    @classmethod
+    def set_mask(cls, name, mask):
+        """Change one of this Camera class' Masks, e.g., to retune its
+        thresholds on the fly.
+
+        Assigning the class attribute directly goes unnoticed by masks, and
+        so by the color table and the rows each frame is converted for.
+        Operations declared on the old Mask (e.g., LargestBlobs) keep using
+        it, so replace them as well.
+
+        :param name: The Mask's class attribute.
+        :type name: str
+        :param mask: The new Mask.
+        :type mask: robot.vision.frame_graph.Mask
+        :raises ValueError: If the attribute isn't a Mask.
+        """
+        if not isinstance(getattr(cls, name, None), Mask):
+            raise ValueError('{} has no Mask {}'.format(cls.__name__, name))
+        setattr(cls, name, mask)
+        Camera.mask_version += 1
+
+    @property
+    def masks(self):
+        """The Masks this Camera declared, and thus the regions it reads.
+
+        They're only looked up again after set_mask() changes a Mask.
+        """
+        cls = type(self)
+        version, masks = Camera.declared.get(cls, (None, None))
+        if version != Camera.mask_version:
+            masks = [op for op in (getattr(cls, name) for name in dir(cls))
+                     if isinstance(op, Mask)]
+            Camera.declared[cls] = (Camera.mask_version, masks)
+        return masks
+
+    def rows(self, height):
+        """Get the band of rows this Camera reads out of each frame.
+
+        :param height: The height of the full frame.
+        :type height: int
+        :returns: A (top, bottom) tuple of rows.
+        """
+        bands = [thaw(mask.roi)[0].indices(height)[:2] for mask in self.masks]
+        if not bands:
+            # We don't know what this Camera looks at, so give it everything.
+            return 0, height
+        return min(top for top, _ in bands), max(bottom for _, bottom in bands)
 
-    @abstractmethod
     def process_image(self, hsv_image):
-        """Process an HSV image.
+        """Process an HSV image on its own.
 
-        This function returns nothing, but publishes messages on the publisher
-        this Camera was instantiated with.
+        Use process_frame() instead when several Cameras look at the same
+        frame, so they can share their work.
 
         :param hsv_image: The HSV image to process.
         :type hsv_image: An OpenCV HSV image.
         """
+        self.process_frame(FrameGraph(hsv_image))
+
+    @abstractmethod
+    def process_frame(self, frame):
+        """Process a frame's operation graph.
+
+        This function returns nothing, but publishes messages on the publisher
+        this Camera was instantiated with.
+
+        :param frame: The operation graph of the HSV frame to process.
+        :type frame: robot.vision.frame_graph.FrameGraph
+        """
         pass
@@ -2,12 +2,13 @@ from __future__ import division, print_function
 
 from collections import deque
 import cv2
-from std_msgs.msg import Float32, String
 
 from robot.common import POI
+from robot.messages import String
+from robot.tracing import traced
 
 from .camera_base import Camera
-from .mask import mask_image
+from .frame_graph import LargestBlob, Mask
 
 
 class GoalCamera(Camera):
@@ -15,10 +16,20 @@ class GoalCamera(Camera):
 
     # Sensitivity for the blue color detection.
     BLUE_SENSITIVITY = 10
-    # The minimum area of a contour required to be considered the goal.
-    MIN_GOAL_AREA = 10000
-
-    def __init__(self, error_pub, poi_pub, verbose=False):
+    # The minimum area of a blob required to be considered the goal. This was
+    # 10000 when it was the area of the blob's contour, which runs about half
+    # a quarter resolution pixel in from its edge all round.
+    MIN_GOAL_AREA = 10800
+    # The goal is big, so quarter resolution frames are plenty. The area above
+    # is in full resolution pixels.
+    DECODE_SCALE = 4
+
+    # These values are appropriate at max brightness.
+    BLUE_MASK = Mask((110, 80, 80), (130, 255, 255))
+    GOAL = LargestBlob(BLUE_MASK)
+
+    def __init__(self, error_pub, poi_pub, confidence_pub=None,
+                 verbose=False):
         """Construct a GoalCamera.
 
         Overrides the default __init__ defined by the parent class.
@@ -27,6 +38,9 @@ class GoalCamera(Camera):
         :type error_pub: rospy.publisher
         :param poi_pub: The Point Of Interest publisher.
         :type poi_pub: rospy.publisher
+        :param confidence_pub: The goal confidence publisher, defaults to
+        None
+        :type confidence_pub: rospy.Publisher, optional
         :param verbose: If we should spam stuff, defaults to False
         :type verbose: bool, optional
         """
@@ -36,12 +50,13 @@ class GoalCamera(Camera):
 
         self.error_pub = error_pub
         self.poi_pub = poi_pub
+        self.confidence_pub = confidence_pub
         history = 30
         self.detections = deque([0]*history, maxlen=history)
         self.goal_state = False
         # self.counter = 0
 
-    def process_image(self, hsv_image):
+    def process_frame(self, frame):
         """Publish left/right relative position of the goal.
 
         Publish a float between -1 and 1 to indicate relative position of the
@@ -51,45 +66,37 @@ class GoalCamera(Camera):
         # self.counter += 1
         # if self.counter % 10 == 0:
         #     print('counter:', self.counter)
-        # These values are appropriate at max brightness.
-        blue_mask = mask_image(hsv_image, (110, 80, 80), (130, 255, 255))
-
         if self.verbose:
             cv2.namedWindow('Goal B Mask', cv2.WINDOW_NORMAL)
-            cv2.imshow('Goal B Mask', blue_mask)
+            cv2.imshow('Goal B Mask', frame[self.BLUE_MASK])
 
-        _, contours, _ = cv2.findContours(blue_mask, 1, cv2.CHAIN_APPROX_SIMPLE)
+        blob = frame[self.GOAL]
 
         goal_in_sight = False
-        error = Float32()
-        error.data = 0.0
+        error = 0.0
         poi = String()
         poi.data = POI['NO_EXIT_LOT']
 
-        # If we find any contours, find the biggest and call that the goal.
-        if contours:
-            max_contour = max(contours, key=cv2.contourArea)
-            area = cv2.contourArea(max_contour)
-            # print('goal area:', area)
+        # If we find any blobs, find the biggest and call that the goal.
+        if blob is not None:
+            # print('goal area:', blob.area)
 
-            M = cv2.moments(max_contour)
-            # If the contour area is bigger than some threshold, try to find
-            # its centroid, if possible.
-            if area > self.MIN_GOAL_AREA and M['m00'] != 0:
-                cx = int(M['m10'] / M['m00'])
-                # cy = int(M['m01'] / M['m00'])
+            # If the blob area is bigger than some threshold, use its
+            # centroid.
+            if blob.area * frame.scale ** 2 > self.MIN_GOAL_AREA:
+                cx = int(blob.cx)
 
                 # Normalize the error so that it's -1.0 to 1.0, with 0.0 being
                 # an indication that the goal centroid is in the exact center
                 # of the frame.
                 signal = 0.0
-                mid = hsv_image.shape[1] / 2
+                mid = frame.width / 2
                 if cx <= mid:
                     signal = (cx - mid) / mid
                 else:
                     signal = -(mid - cx) / mid
 
-                error.data = signal
+                error = signal
                 goal_in_sight = True
 
         self.detections.appendleft(goal_in_sight)
@@ -103,5 +110,10 @@ class GoalCamera(Camera):
         else:
             poi.data = POI['NO_EXIT_LOT']
 
-        self.error_pub.publish(error)
+        self.error_pub.publish(traced([error], frame.stamp, frame.trace))
+        if self.confidence_pub is not None:
+            # How many of the recent frames we saw the goal in.
+            confidence = sum(self.detections) / len(self.detections)
+            self.confidence_pub.publish(traced([confidence], frame.stamp,
+                                               frame.trace))
         self.poi_pub.publish(poi)
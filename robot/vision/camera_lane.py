@@ -1,10 +1,12 @@
 from __future__ import division, print_function
 
 import cv2
-from std_msgs.msg import Float32
+
+from robot.tracing import traced
 
 from .camera_base import Camera
-from .mask import mask_image
+from .frame_graph import LargestBlob, Mask
+from .tracker import LaneTracker
 
 
 class LaneCamera(Camera):
@@ -19,41 +21,62 @@ class LaneCamera(Camera):
     # The white mask sensitivity.
     WHITE_SENSITIVITY = 50
 
-    def process_image(self, hsv_image):
-        """Implement lane detection and publishes the lane centroid."""
-        # Crop the image to deal only with whatever is directly in front of us.
-        hsv_image = hsv_image[self.REGION_OF_INTEREST]
+    # Mask out everything but white directly in front of us.
+    WHITE_MASK = Mask((0, 0, 255 - WHITE_SENSITIVITY),
+                      (255, WHITE_SENSITIVITY, 255),
+                      REGION_OF_INTEREST)
+
+    def __init__(self, publisher, confidence_pub=None, verbose=False):
+        """Construct a LaneCamera.
 
-        # Mask out everything but white.
-        mask = mask_image(hsv_image, (0, 0, 255 - self.WHITE_SENSITIVITY),
-                          (255, self.WHITE_SENSITIVITY, 255))
+        :param publisher: The lane centroid publisher.
+        :type publisher: rospy.Publisher
+        :param confidence_pub: The lane confidence publisher, defaults to None
+        :type confidence_pub: rospy.Publisher, optional
+        :param verbose: If we should spam stuff, defaults to False
+        :type verbose: bool, optional
+        """
+        super(LaneCamera, self).__init__(publisher, verbose=verbose)
+        self.confidence_pub = confidence_pub
+        self.tracker = None
 
+    def process_frame(self, frame):
+        """Implement lane detection and publishes the lane centroid."""
         if self.verbose:
             cv2.namedWindow('Lane W Mask', cv2.WINDOW_NORMAL)
-            cv2.imshow('Lane W Mask', mask)
-
-        # Find contours in the ROI mask itself.
-        _, contours, _ = cv2.findContours(mask, 1, cv2.CHAIN_APPROX_SIMPLE)
-
-        if contours:
-            # Find the biggest contour.
-            c = max(contours, key=cv2.contourArea)
-            M = cv2.moments(c)
-
-            # Avoid division by zero...
-            if M['m00'] != 0:
-                # Find the centroid of the biggest contour.
-                cx = int(M['m10'] / M['m00'])
-                cy = int(M['m01'] / M['m00'])
-
-                # Image center => 0.0, left border => -1.0, right border => 1.0
-                image_center = hsv_image.shape[1] / 2
-                fraction = 0.0
-                if cx <= image_center:
-                    fraction = (cx - image_center) / image_center
-                else:
-                    fraction = -(image_center - cx) / image_center
-
-                msg = Float32()
-                msg.data = fraction
-                self.publisher.publish(msg)
+            cv2.imshow('Lane W Mask', frame[self.WHITE_MASK])
+
+        width = frame.width * frame.scale
+        if self.tracker is None or self.tracker.width != width:
+            self.tracker = LaneTracker(width)
+
+        # Only search around where we expect the lane to be.
+        self.tracker.predict(frame.stamp)
+        left, right = self.tracker.window()
+        window = (slice(None, None, None), slice(left, right, None))
+
+        # Find the biggest blob in the window of the ROI mask itself.
+        blob = frame[LargestBlob(self.WHITE_MASK, window)]
+        column = None
+        if blob is not None:
+            column = left + blob.cx * frame.scale
+        self.tracker.update(column)
+
+        if blob is not None:
+            # Find the filtered centroid of the biggest blob.
+            cx = int(self.tracker.x / frame.scale)
+
+            # Image center => 0.0, left border => -1.0, right border => 1.0
+            image_center = frame.width / 2
+            fraction = 0.0
+            if cx <= image_center:
+                fraction = (cx - image_center) / image_center
+            else:
+                fraction = -(image_center - cx) / image_center
+
+            self.publisher.publish(traced([fraction], frame.stamp,
+                                          frame.trace))
+
+        if self.confidence_pub is not None:
+            self.confidence_pub.publish(traced([self.tracker.confidence],
+                                               frame.stamp, frame.trace))
@@ -1,23 +1,38 @@
 from __future__ import division, print_function
 
 import cv2
-from std_msgs.msg import Float32, String
 
 from robot.common import POI
+from robot.messages import String
+from robot.tracing import traced
 
 from .camera_base import Camera
-from .mask import mask_image
+from .frame_graph import LargestBlob, Mask, freeze
 
 
 class NodeCamera(Camera):
     """Camera class for detecting nodes."""
 
-    # The minimum area of a contour required to be considered the goal.
-    MIN_NODE_AREA = 20000
-    MIN_POI_AREA = 5000
+    # The minimum area of a blob required to be considered the goal. These
+    # were 20000 and 5000 when they were the areas of the blob's contour,
+    # which runs about half a half resolution pixel in from its edge all
+    # round. That matters most in the short region of interest.
+    MIN_NODE_AREA = 20550
+    MIN_POI_AREA = 5600
+    # Nodes are big, so half resolution frames are plenty. The areas above are
+    # in full resolution pixels.
+    DECODE_SCALE = 2
     REGION_OF_INTEREST = (slice(460, 480, None), slice(0, None, None))
+    # Convert 0-360 range to 0-179 range.
+    HUE = 300 / 360 * 179
 
-    def __init__(self, error_pub, poi_pub, verbose=False):
+    PURPLE_MASK = Mask((HUE - 15, 40, 100), (HUE + 15, 255, 255))
+    # Both blob searches share the one purple mask.
+    NODE = LargestBlob(PURPLE_MASK)
+    NODE_POI = LargestBlob(PURPLE_MASK, REGION_OF_INTEREST)
+
+    def __init__(self, error_pub, poi_pub, confidence_pub=None,
+                 verbose=False):
         """Construct a NodeCamera.
 
         Overrides the default __init__ defined by the parent class.
@@ -26,6 +41,9 @@ class NodeCamera(Camera):
         :type error_pub: rospy.publisher
         :param poi_pub: The Point Of Interest publisher.
         :type poi_pub: rospy.publisher
+        :param confidence_pub: The node confidence publisher, defaults to
+        None
+        :type confidence_pub: rospy.Publisher, optional
         :param verbose: If we should spam stuff, defaults to False
         :type verbose: bool, optional
         """
@@ -35,67 +53,64 @@ class NodeCamera(Camera):
 
         self.error_pub = error_pub
         self.poi_pub = poi_pub
+        self.confidence_pub = confidence_pub
 
-    def process_image(self, hsv_image):
+    def process_frame(self, frame):
         """Publish left/right relative position of the node.
 
         Publish a float between -1 and 1 to indicate relative position of the
         node to the center of the frame. If the node is not visible, publish
         a 0.0.
         """
-        # Convert 0-360 range to 0-179 range.
-        hue = 300 / 360 * 179
-        purple_mask = mask_image(hsv_image, (hue - 15, 40, 100),
-                                 (hue + 15, 255, 255))
-
         if self.verbose:
+            purple_mask = frame[self.PURPLE_MASK]
             cv2.namedWindow('Node P Mask', cv2.WINDOW_NORMAL)
             cv2.imshow('Node P Mask', purple_mask)
 
             cv2.namedWindow('P Mask Slice', cv2.WINDOW_NORMAL)
-            cv2.imshow('P Mask Slice', purple_mask[self.REGION_OF_INTEREST])
+            poi_slice = frame.crop(purple_mask,
+                                   freeze(self.REGION_OF_INTEREST))
+            cv2.imshow('P Mask Slice', poi_slice)
 
-        _, contours, _ = cv2.findContours(purple_mask, 1,
-                                          cv2.CHAIN_APPROX_SIMPLE)
-        _, poi_contours, _ = cv2.findContours(
-            purple_mask[self.REGION_OF_INTEREST], 1, cv2.CHAIN_APPROX_SIMPLE)
+        blob = frame[self.NODE]
+        poi_blob = frame[self.NODE_POI]
 
-        error = Float32()
-        error.data = 0.0
+        error = 0.0
+        confidence = 0.0
         poi = String()
         poi.data = POI['NO_GRAPH_NODE']
 
-        # If we find any contours, find the biggest and call that the goal.
-        if contours:
-            max_contour = max(contours, key=cv2.contourArea)
-            area = cv2.contourArea(max_contour)
-            # print('goal area:', area)
+        # If we find any blobs, find the biggest and call that the goal.
+        if blob is not None:
+            # print('goal area:', blob.area)
+            # Half sure at the threshold, and sure at twice it.
+            confidence = min(1.0, blob.area * frame.scale ** 2 /
+                             (2 * self.MIN_NODE_AREA))
 
-            M = cv2.moments(max_contour)
-            # If the contour area is bigger than some threshold, try to find
-            # its centroid, if possible.
-            if area > self.MIN_NODE_AREA and M['m00'] != 0:
-                cx = int(M['m10'] / M['m00'])
-                # cy = int(M['m01'] / M['m00'])
+            # If the blob area is bigger than some threshold, use its
+            # centroid.
+            if blob.area * frame.scale ** 2 > self.MIN_NODE_AREA:
+                cx = int(blob.cx)
 
                 # Normalize the error so that it's -1.0 to 1.0, with 0.0 being
                 # an indication that the goal centroid is in the exact center
                 # of the frame.
                 signal = 0.0
-                mid = hsv_image.shape[1] / 2
+                mid = frame.width / 2
                 if cx <= mid:
                     signal = (cx - mid) / mid
                 else:
                     signal = -(mid - cx) / mid
 
-                error.data = signal
+                error = signal
 
-        if poi_contours:
-            max_contour = max(poi_contours, key=cv2.contourArea)
-            area = cv2.contourArea(max_contour)
-            if area >= self.MIN_POI_AREA:
-                # print('POI area:', area)
+        if poi_blob is not None:
+            if poi_blob.area * frame.scale ** 2 >= self.MIN_POI_AREA:
+                # print('POI area:', poi_blob.area)
                 poi.data = POI['GRAPH_NODE']
 
-        self.error_pub.publish(error)
+        self.error_pub.publish(traced([error], frame.stamp, frame.trace))
+        if self.confidence_pub is not None:
+            self.confidence_pub.publish(traced([confidence], frame.stamp,
+                                               frame.trace))
         self.poi_pub.publish(poi)
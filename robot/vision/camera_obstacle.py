@@ -1,13 +1,12 @@
 from __future__ import division, print_function
 
 import cv2
-import numpy as np
-from std_msgs.msg import String
 
 from robot.common import POI
+from robot.messages import String
 
 from .camera_base import Camera
-from .mask import mask_image
+from .frame_graph import Mask
 
 
 class ObstacleCamera(Camera):
@@ -22,13 +21,15 @@ class ObstacleCamera(Camera):
     # How many pixels of obstacle should count as an obstruction.
     OBSTRUCTION_TOLERANCE = 1000
 
-    def process_image(self, hsv_image):
-        """Determine if there is an obstacle directly in front of the robot."""
-        hsv_image = hsv_image[self.REGION_OF_INTEREST]
+    GREEN_MASK = Mask((40, 25, 50), (80, 255, 255), REGION_OF_INTEREST)
+    BLUE_MASK = Mask((110, 80, 80), (130, 255, 255), REGION_OF_INTEREST)
+    YELLOW_MASK = Mask((10, 0, 0), (50, 255, 255), REGION_OF_INTEREST)
 
-        green_mask = mask_image(hsv_image, (40, 25, 50), (80, 255, 255))
-        blue_mask = mask_image(hsv_image, (110, 80, 80), (130, 255, 255))
-        yellow_mask = mask_image(hsv_image, (10, 0, 0), (50, 255, 255))
+    def process_frame(self, frame):
+        """Determine if there is an obstacle directly in front of the robot."""
+        green_mask = frame[self.GREEN_MASK]
+        blue_mask = frame[self.BLUE_MASK]
+        yellow_mask = frame[self.YELLOW_MASK]
 
         if self.verbose:
             cv2.namedWindow('Obstacle G Mask', cv2.WINDOW_NORMAL)
@@ -39,18 +40,16 @@ class ObstacleCamera(Camera):
             cv2.imshow('Obstacle Y Mask', yellow_mask)
 
         # Join the two masks. This filters everything out but the "good" stuff
-        mask = green_mask + blue_mask
+        mask = self.arena.like('mask', green_mask)
+        cv2.bitwise_or(green_mask, blue_mask, dst=mask)
 
         # Swap 0 and 255 values in the combined mask.
-        mask[mask == 0] = 1
-        mask[mask >= 255] = 0
-        mask[mask == 1] = 255
+        cv2.bitwise_not(mask, dst=mask)
 
-        mask = mask + yellow_mask
-        mask[mask >= 255] = 255
+        cv2.bitwise_or(mask, yellow_mask, dst=mask)
 
         msg = String()
-        if np.sum(mask) / 255 >= self.OBSTRUCTION_TOLERANCE:
+        if cv2.countNonZero(mask) >= self.OBSTRUCTION_TOLERANCE:
             msg.data = POI['OBSTACLE']
         else:
             msg.data = POI['NO_OBSTACLE']
@@ -1,13 +1,12 @@
 from __future__ import division, print_function
 
 import cv2
-import numpy as np
-from std_msgs.msg import String
 
 from robot.common import POI
+from robot.messages import String
 
 from .camera_base import Camera
-from .mask import mask_image
+from .frame_graph import Mask
 
 
 class StoplightCamera(Camera):
@@ -21,16 +20,18 @@ class StoplightCamera(Camera):
     # How many red pixels count as a stoplight. Lol.
     STOP_THRESHOLD = 1000
 
-    def process_image(self, hsv_image):
+    # The same white mask the LaneCamera uses, so it only gets computed once.
+    WHITE_MASK = Mask((0, 0, 255 - SENSITIVITY), (255, SENSITIVITY, 255),
+                      REGION_OF_INTEREST)
+    BLACK_MASK = Mask((0, 0, 0), (180, 255, 200), REGION_OF_INTEREST)
+
+    def process_frame(self, frame):
         """ Publish a notification of a stoplight is encountered.
             inspiration: https://stackoverflow.com/a/25401596
         """
-        # Crop the image to deal only with whatever is directly in front of us.
-        hsv_image = hsv_image[self.REGION_OF_INTEREST]
-
-        white_mask = mask_image(hsv_image, (0, 0, 255 - self.SENSITIVITY),
-                                (255, self.SENSITIVITY, 255))
-        black_mask = mask_image(hsv_image, (0, 0, 0), (180, 255, 200))
+        # Deal only with whatever is directly in front of us.
+        white_mask = frame[self.WHITE_MASK]
+        black_mask = frame[self.BLACK_MASK]
 
         if self.verbose:
             cv2.namedWindow('Stoplight W Mask', cv2.WINDOW_NORMAL)
@@ -39,15 +40,15 @@ class StoplightCamera(Camera):
             cv2.namedWindow('Stoplight BLK Mask', cv2.WINDOW_NORMAL)
             cv2.imshow('Stoplight BLK Mask', black_mask)
 
-        # Join the two masks.
-        mask = white_mask + black_mask
+        # Join the two masks into our own buffer, so the shared masks are left
+        # untouched.
+        mask = self.arena.like('mask', white_mask)
+        cv2.bitwise_or(white_mask, black_mask, dst=mask)
         # Swap 0 and 255 values...
-        mask[mask == 0] = 1
-        mask[mask >= 255] = 0
-        mask[mask == 1] = 255
+        cv2.bitwise_not(mask, dst=mask)
 
         # We see a stoplight if there are more than some number of red pixels.
-        if np.sum(mask) / 255 > self.STOP_THRESHOLD:
+        if cv2.countNonZero(mask) > self.STOP_THRESHOLD:
             msg = String()
             msg.data = POI['STOPLIGHT']
             self.publisher.publish(msg)
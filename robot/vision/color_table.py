@@ -0,0 +1,155 @@
+from __future__ import division, print_function
+
+import cv2
+import numpy as np
+
+from .arena import BufferArena
+from .mask import denoise
+
+
+class ColorTable(object):
+    """A BGR -> color class lookup table.
+
+    Every HSV range our Cameras mask by is a color class, and each class gets
+    one bit. The table maps every possible BGR pixel to the bitfield of the
+    classes its HSV value falls in, so a single lookup pass over a frame
+    replaces the HSV conversion and every inRange call. Masking by a class is
+    then just a bit test.
+
+    The table is computed by running every BGR value through the same
+    cvtColor and inRange calls mask_image uses, so a mask of a classified
+    frame is identical to mask_image on the HSV conversion of that frame.
+
+    The pipeline blurs frames before masking them, though, and blurring
+    doesn't commute with the HSV conversion. Blurring in BGR and then
+    classifying moves the edges of colors by a pixel or two, and the hue
+    between two colors can differ, e.g. where the white lane meets the red
+    stoplight. On the synthetic scenes in every state, and on a simulated
+    drive around the course, no mask differs in 1% of its pixels, and every
+    summary the detectors publish is identical, except that the node
+    confidence, which follows the node's area, can be off by up to 0.05. The
+    color table tests hold the table path to that.
+    """
+
+    def __init__(self, ranges=()):
+        """Create a ColorTable for the given HSV ranges.
+
+        :param ranges: The HSV ranges to classify pixels by.
+        :type ranges: An iterable of ((H, S, V), (H, S, V)) (low, high) tuples.
+        """
+        self.ranges = ()
+        self.bits = {}
+        self.table = None
+        self.update(ranges)
+
+    @staticmethod
+    def ranges_of(cameras):
+        """Get every HSV range the given Cameras mask by.
+
+        :param cameras: The Cameras to get the ranges of.
+        :type cameras: An iterable of robot.vision.camera_base.Camera objects.
+        """
+        return tuple(sorted(set((mask.low, mask.high)
+                                for camera in cameras
+                                for mask in camera.masks)))
+
+    def update(self, ranges):
+        """Rebuild the table if the given HSV ranges differ from the current.
+
+        :param ranges: The HSV ranges to classify pixels by.
+        :type ranges: An iterable of ((H, S, V), (H, S, V)) (low, high) tuples.
+        :returns: Whether the table was rebuilt.
+        """
+        ranges = tuple(sorted(set(ranges)))
+        if ranges == self.ranges and self.table is not None:
+            return False
+
+        if len(ranges) <= 8:
+            dtype = np.uint8
+        elif len(ranges) <= 16:
+            dtype = np.uint16
+        else:
+            dtype = np.uint32
+
+        # Every possible BGR pixel, indexed by (r << 16) | (g << 8) | b.
+        everything = np.arange(1 << 24, dtype=np.uint32)
+        bgr = np.empty((4096, 4096, 3), dtype=np.uint8)
+        bgr[..., 0] = (everything & 0xFF).reshape(4096, 4096)
+        bgr[..., 1] = ((everything >> 8) & 0xFF).reshape(4096, 4096)
+        bgr[..., 2] = (everything >> 16).reshape(4096, 4096)
+        del everything
+        hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV)
+        del bgr
+
+        table = np.zeros(1 << 24, dtype=dtype)
+        bits = {}
+        for i, (low, high) in enumerate(ranges):
+            bit = dtype(1 << i)
+            inside = cv2.inRange(hsv, np.array(low), np.array(high))
+            table[inside.ravel() != 0] |= bit
+            bits[(low, high)] = bit
+
+        self.ranges = ranges
+        self.bits = bits
+        self.table = table
+        return True
+
+    def classify(self, bgr_image, arena=None):
+        """Look up the color classes of every pixel in the given image.
+
+        :param bgr_image: The image to classify.
+        :type bgr_image: An OpenCV BGR image.
+        :param arena: Where to keep the lookup index and classes, defaults to
+        allocating new arrays.
+        :type arena: robot.vision.arena.BufferArena, optional
+        :returns: The class bitfield of each pixel.
+        :rtype: A 2D numpy array.
+        """
+        if arena is None:
+            arena = BufferArena()
+        shape = bgr_image.shape[:2]
+        # index = (r << 16) | (g << 8) | b, which is a BGRA pixel read as a
+        # little endian uint32, without the alpha. Building it with shifts
+        # and ors would have NumPy allocate temporaries to widen each
+        # channel, and take() copies any index that isn't an intp.
+        bgra = arena.buffer('color bgra', shape + (4,))
+        cv2.cvtColor(bgr_image, cv2.COLOR_BGR2BGRA, dst=bgra)
+        index = arena.buffer('color index', shape, np.intp)
+        np.copyto(index, bgra.view('<u4')[..., 0])
+        np.bitwise_and(index, 0xFFFFFF, out=index)
+        classes = arena.buffer('color classes', shape, self.table.dtype)
+        # The index is always in bounds, and take() makes a temporary copy
+        # when mode='raise'.
+        return self.table.take(index, out=classes, mode='clip')
+
+    def mask(self, classes, low, high, dst=None, scratch=None):
+        """Mask a classified image by one of the table's HSV ranges.
+
+        The mask is denoised the same way mask_image denoises its masks.
+
+        :param classes: The class bitfields of an image.
+        :type classes: A 2D numpy array, as returned by classify().
+        :param low: The low HSV value.
+        :type low: A (H, S, V) tuple of integers.
+        :param high: The high HSV value.
+        :type high: A (H, S, V) tuple of integers.
+        :param dst: Where to put the mask, defaults to a new array.
+        :type dst: A 2D numpy uint8 array the same size as the image, optional
+        :param scratch: A temporary to use, defaults to a new array.
+        :type scratch: A 2D numpy uint8 array the same size as the image,
+        optional
+        """
+        if dst is None:
+            dst = np.empty(classes.shape, dtype=np.uint8)
+        if scratch is None:
+            scratch = np.empty(classes.shape, dtype=np.uint8)
+        bit = self.bits[(low, high)]
+        # Test the class bit, producing 0 and 1, then scale up to 0 and 255.
+        inside = dst.view(np.bool_)
+        if classes.dtype == np.uint8:
+            np.bitwise_and(classes, bit, out=scratch)
+            np.not_equal(scratch, 0, out=inside)
+        else:
+            np.not_equal(classes & bit, 0, out=inside)
+        np.multiply(dst, 255, out=dst)
+        return denoise(dst, scratch)
@@ -0,0 +1,86 @@
+from __future__ import division, print_function
+
+import cv2
+import numpy as np
+
+# libjpeg-turbo can decode at reduced scales *and* crop without decoding the
+# whole image. OpenCV can only do the former, so use it when we don't have
+# turbo.
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+except ImportError:
+    TurboJPEG = None
+
+# The OpenCV imdecode flags for each supported downscaling factor.
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# The MCU height for each of libjpeg-turbo's chroma subsampling types. We can
+# only crop a JPEG on an MCU boundary.
+MCU_HEIGHT = {
+    0: 8,   # 4:4:4
+    1: 8,   # 4:2:2
+    2: 16,  # 4:2:0
+    3: 8,   # Grayscale
+    4: 16,  # 4:4:0
+    5: 8,   # 4:1:1
+}
+
+
+def wrap(data):
+    """Wrap a compressed image payload in a NumPy array without copying it.
+
+    :param data: The compressed image payload.
+    :type data: The data of a sensor_msgs.msg.CompressedImage message.
+    """
+    return np.frombuffer(data, dtype=np.uint8)
+
+
+class FrameDecoder(object):
+    """Decode compressed frames, doing only as much work as we need to.
+
+    Frames can be decoded at 1/2, 1/4, or 1/8 scale, and if libjpeg-turbo is
+    available, we can skip decoding all but the bottom rows of the frame.
+    """
+
+    def __init__(self):
+        """Create a FrameDecoder, using libjpeg-turbo if it's installed."""
+        self.turbo = TurboJPEG() if TurboJPEG is not None else None
+
+    def decode(self, data, scale=1, top=0):
+        """Decode the given compressed frame.
+
+        :param data: The compressed image payload.
+        :type data: The data of a sensor_msgs.msg.CompressedImage message.
+        :param scale: Downscale the frame by this factor, defaults to 1
+        :type scale: One of 1, 2, 4, or 8, optional
+        :param top: The first (unscaled) row we need, defaults to 0
+        :type top: int, optional
+        :returns: A (bgr_frame, top) tuple. The BGR frame holds the bottom rows
+        of the scaled frame, starting at the returned (unscaled) top row, which
+        may be above the requested top row. The frame is None if it could not
+        be decoded.
+        """
+        buf = wrap(data)
+        if self.turbo is None:
+            return cv2.imdecode(buf, REDUCED_FLAGS[scale]), 0
+
+        try:
+            if top > 0:
+                width, height, subsample, _ = self.turbo.decode_header(buf)
+                top -= top % MCU_HEIGHT.get(subsample, 16)
+                if 0 < top < height:
+                    # A lossless crop is much cheaper than a full decode.
+                    buf = self.turbo.crop(buf, 0, top, width, height - top)
+                else:
+                    top = 0
+            bgr_frame = self.turbo.decode(
+                buf, pixel_format=TJPF_BGR, scaling_factor=(1, scale))
+        except (IOError, OSError) as e:
+            print(e)
+            return None, 0
+        return bgr_frame, top
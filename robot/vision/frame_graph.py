@@ -0,0 +1,235 @@
+from __future__ import division, print_function
+
+import threading
+import time
+from collections import namedtuple
+
+from .arena import BufferArena
+from .blob import largest_blob
+from .mask import mask_image
+
+# The entire frame. (y-slice, x-slice).
+FULL_FRAME = (slice(None, None, None), slice(None, None, None))
+
+
+def freeze(roi):
+    """Convert a (y-slice, x-slice) region of interest into a hashable key.
+
+    Slices aren't hashable, so we can't use them to key the graph's cache.
+
+    :param roi: The region of interest.
+    :type roi: A (y-slice, x-slice) tuple.
+    """
+    return tuple((s.start, s.stop, s.step) for s in roi)
+
+
+def thaw(key):
+    """Convert a frozen region of interest back into a (y-slice, x-slice)."""
+    return tuple(slice(*s) for s in key)
+
+
+class Mask(namedtuple('Mask', 'low high roi')):
+    """A denoised HSV mask of a region of interest.
+
+    The region is cropped *before* masking, so a mask of a ROI is a different
+    operation than a ROI of a full frame mask.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, low, high, roi=FULL_FRAME):
+        """Declare a mask of the given region between the given HSV colors."""
+        return super(Mask, cls).__new__(cls, tuple(low), tuple(high),
+                                        freeze(roi))
+
+    def compute(self, graph):
+        """Mask the region of interest of the graph's frame."""
+        region = graph.region(self.roi)
+        dst = graph.arena.buffer(('mask', self), region.shape[:2])
+        scratch = graph.arena.buffer(('scratch', self), region.shape[:2])
+        if graph.table is None:
+            return mask_image(region, self.low, self.high, dst, scratch)
+        return graph.table.mask(region, self.low, self.high, dst, scratch)
+
+
+class LargestBlob(namedtuple('LargestBlob', 'mask crop')):
+    """The biggest blob in a (possibly cropped) Mask."""
+
+    __slots__ = ()
+
+    def __new__(cls, mask, crop=FULL_FRAME):
+        """Declare the biggest blob of the given Mask after cropping it."""
+        return super(LargestBlob, cls).__new__(cls, mask, freeze(crop))
+
+    def compute(self, graph):
+        """Find the biggest blob in the mask.
+
+        :returns: The biggest blob, or None if there isn't one.
+        :rtype: robot.vision.blob.Blob
+        """
+        # Cameras on different threads may search for blobs at once, so each
+        # thread gets its own blob buffers.
+        return largest_blob(graph.crop(graph[self.mask], self.crop),
+                            graph.arena, threading.current_thread().ident)
+
+
+class FrameGraph(object):
+    """A per-frame graph of the image operations our Cameras need.
+
+    Each Camera declares the operations it needs (Masks, LargestBlobs, etc.) as
+    class attributes, and asks the graph for their results. The graph computes
+    each unique operation once per frame, and shares the result with every
+    Camera that asks for it. E.g., the LaneCamera and StoplightCamera both need
+    the same white mask of the bottom of the frame.
+
+    NOTE: The results are shared, so Cameras must not modify them in place.
+    """
+
+    def __init__(self, image, offset=0, height=None, scale=1, table=None,
+                 arena=None, stamp=None, trace=0):
+        """Create the operation graph for a single frame.
+
+        The image may be only a horizontal band of the full frame, and may
+        have been downscaled, in which case the offset, height, and scale
+        describe where the band came from. Regions of interest are always given
+        in full size, full frame coordinates.
+
+        :param image: The blurred HSV frame, or a band of rows of it. If a
+        ColorTable is given, the class bitfields of the blurred BGR frame.
+        :type image: An OpenCV HSV image, or a 2D numpy array.
+        :param offset: The full frame row the band starts at, defaults to 0
+        :type offset: int, optional
+        :param height: The height of the full frame, defaults to the height of
+        the given image.
+        :type height: int, optional
+        :param scale: How much the frame was downscaled by, defaults to 1
+        :type scale: int, optional
+        :param table: The table the image was classified with, defaults to None
+        :type table: robot.vision.color_table.ColorTable, optional
+        :param arena: Where to keep the operations' results, so they don't get
+        reallocated every frame, defaults to a new BufferArena.
+        :type arena: robot.vision.arena.BufferArena, optional
+        :param stamp: When the frame was taken, in seconds, defaults to now.
+        :type stamp: float, optional
+        :param trace: The frame's trace id, for following what's derived from
+        it through the robot, defaults to 0 for untraced.
+        :type trace: int, optional
+        """
+        self.arena = BufferArena() if arena is None else arena
+        self.results = {}
+        # Cameras may run on several threads at once, so make sure that only
+        # one of them computes each operation, and the others wait for it.
+        self.lock = threading.Lock()
+        self.pending = {}
+        # The pending events of earlier frames, to reuse.
+        self.spare = []
+        self.reset(image, offset, height, scale, table, stamp, trace)
+
+    def reset(self, image, offset=0, height=None, scale=1, table=None,
+              stamp=None, trace=0):
+        """Start over on a new frame, reusing the graph's bookkeeping.
+
+        Takes the same arguments as the constructor, except for the arena,
+        which is kept.
+
+        NOTE: Every result of the previous frame is forgotten, and its
+        buffers reused, so nobody may still be processing that frame.
+        """
+        self.image = image
+        self.offset = offset
+        self.scale = scale
+        self.height = image.shape[0] * scale if height is None else height
+        self.table = table
+        self.stamp = time.time() if stamp is None else stamp
+        self.trace = trace
+        self.results.clear()
+        for event in self.pending.values():
+            event.clear()
+            self.spare.append(event)
+        self.pending.clear()
+
+    @property
+    def width(self):
+        """The width of the (possibly downscaled) frame."""
+        return self.image.shape[1]
+
+    def crop(self, image, roi, offset=0, height=None):
+        """Crop an image of this frame to a full size region of interest.
+
+        :param image: The (possibly downscaled) image to crop.
+        :type image: A 2D or 3D numpy array.
+        :param roi: The region of interest, in full size coordinates.
+        :type roi: A frozen (y-slice, x-slice) tuple.
+        :param offset: The full size row the image starts at, defaults to 0
+        :type offset: int, optional
+        :param height: The full size height the region of interest is relative
+        to, defaults to the full size height of the image.
+        :type height: int, optional
+        """
+        s = self.scale
+        if height is None:
+            height = image.shape[0] * s
+        rows, cols = thaw(roi)
+        top, bottom, _ = rows.indices(height)
+        left, right, _ = cols.indices(image.shape[1] * s)
+        # Round the bottom and right edges up, so we don't lose partial rows.
+        return image[(top - offset) // s:-(-(bottom - offset) // s),
+                     left // s:-(-right // s)]
+
+    def region(self, roi):
+        """Get a region of interest of the frame.
+
+        :param roi: The region of interest.
+        :type roi: A frozen (y-slice, x-slice) tuple.
+        """
+        return self.crop(self.image, roi, self.offset, self.height)
+
+    def __getitem__(self, operation):
+        """Get the result of the given operation, computing it if needed."""
+        try:
+            return self.results[operation]
+        except KeyError:
+            pass
+
+        with self.lock:
+            computing = self.pending.get(operation)
+            if computing is None:
+                computing = (self.spare.pop() if self.spare
+                             else threading.Event())
+                self.pending[operation] = computing
+                owner = True
+            else:
+                owner = False
+
+        if owner:
+            try:
+                result = operation.compute(self)
+                self.results[operation] = result
+                return result
+            finally:
+                computing.set()
+
+        computing.wait()
+        if operation not in self.results:
+            # Whoever was computing it failed, so give it a go ourselves.
+            return operation.compute(self)
+        return self.results[operation]
+
+
+def plan_rows(cameras, height):
+    """Find the band of rows the given Cameras read out of a frame.
+
+    The band spans every row any of the Cameras reads, so only it needs to be
+    color converted and blurred.
+
+    :param cameras: The Cameras that will process the frame.
+    :type cameras: A list of robot.vision.camera_base.Camera objects.
+    :param height: The height of the full frame.
+    :type height: int
+    :returns: A (top, bottom) tuple of rows. The band is empty if there are no
+    Cameras.
+    """
+    bands = [camera.rows(height) for camera in cameras]
+    if not bands:
+        return 0, 0
+    return min(top for top, _ in bands), max(bottom for _, bottom in bands)
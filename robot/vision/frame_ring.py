@@ -0,0 +1,243 @@
+from __future__ import division, print_function
+
+import os
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# Where the camera's frame ring lives by default. /dev/shm is memory, so
+# mapping a file there is shared memory every process can open by name.
+RING_PATH = '/dev/shm/geekbot_frames'
+
+# Identifies a frame ring file.
+MAGIC = 0x47424652
+
+HEADER_DTYPE = np.dtype([
+    ('magic', '<u4'),
+    ('slots', '<u4'),
+    ('height', '<u4'),
+    ('width', '<u4'),
+    ('hsv', '<u4'),
+    ('padding', '<u4'),
+    # The sequence number of the newest complete frame, 0 if none yet.
+    ('sequence', '<u8'),
+])
+
+SLOT_DTYPE = np.dtype([
+    # The sequence number of the frame in the slot, 0 while it's written.
+    ('sequence', '<u8'),
+    # When the frame was taken, in seconds.
+    ('stamp', '<f8'),
+])
+
+# Keep the images cache line aligned.
+ALIGNMENT = 64
+
+# A frame in the ring. The images are views of the shared memory, so they're
+# only good until the writer comes back around to their slot. See
+# FrameRing.valid().
+RingFrame = namedtuple('RingFrame', 'sequence stamp bgr hsv')
+
+
+def align(size):
+    """Round a size up to the alignment."""
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+class FrameRing(object):
+    """A ring buffer of decoded frames in shared memory.
+
+    One process (the FrameService) decodes each camera frame once, into the
+    next of a fixed number of BGR (and optionally HSV) slots, and any number
+    of processes read the newest frame as zero-copy NumPy views.
+
+    Each slot is stamped with its frame's sequence number once the frame is
+    completely written, and cleared while it's being overwritten, so readers
+    can tell whether a view is still good.
+    """
+
+    def __init__(self, path, memory):
+        """Wrap a mapped frame ring. Use create() or open() instead."""
+        self.path = path
+        self.memory = memory
+        # Which file we mapped, in case the ring gets recreated.
+        self.inode = os.stat(path).st_ino
+        self.header = memory[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0]
+        slots = int(self.header['slots'])
+        shape = (int(self.header['height']), int(self.header['width']), 3)
+        image_size = align(shape[0] * shape[1] * 3)
+        slot_size = align(SLOT_DTYPE.itemsize) + image_size * (
+            2 if self.header['hsv'] else 1)
+        start = align(HEADER_DTYPE.itemsize)
+
+        self.slots = []
+        self.bgr = []
+        self.hsv = []
+        for i in range(slots):
+            offset = start + i * slot_size
+            self.slots.append(
+                memory[offset:offset + SLOT_DTYPE.itemsize].view(SLOT_DTYPE))
+            offset += align(SLOT_DTYPE.itemsize)
+            self.bgr.append(memory[offset:offset + shape[0] * shape[1] * 3]
+                            .reshape(shape))
+            if self.header['hsv']:
+                offset += image_size
+                self.hsv.append(memory[offset:offset + shape[0] * shape[1] * 3]
+                                .reshape(shape))
+
+    @staticmethod
+    def size(width, height, slots, hsv):
+        """How many bytes a frame ring of the given shape takes."""
+        image_size = align(width * height * 3)
+        slot_size = align(SLOT_DTYPE.itemsize) + image_size * (2 if hsv else 1)
+        return align(HEADER_DTYPE.itemsize) + slots * slot_size
+
+    @classmethod
+    def create(cls, path=RING_PATH, width=640, height=480, slots=4, hsv=False):
+        """Create a new frame ring, replacing any existing one.
+
+        :param path: The ring's file, defaults to RING_PATH
+        :type path: str, optional
+        :param width: The width of every frame, defaults to 640
+        :type width: int, optional
+        :param height: The height of every frame, defaults to 480
+        :type height: int, optional
+        :param slots: How many frames the ring holds. Readers have until the
+        writer comes back around to finish with a frame, defaults to 4
+        :type slots: int, optional
+        :param hsv: Also store the HSV conversion of each frame, defaults to
+        False
+        :type hsv: bool, optional
+        """
+        size = cls.size(width, height, slots, hsv)
+        # Build the ring under a temporary name, so readers never see a
+        # partial header.
+        temporary = '{}.{}'.format(path, os.getpid())
+        memory = np.memmap(temporary, dtype=np.uint8, mode='w+', shape=(size,))
+        header = memory[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0]
+        header['slots'] = slots
+        header['height'] = height
+        header['width'] = width
+        header['hsv'] = hsv
+        header['sequence'] = 0
+        header['magic'] = MAGIC
+        memory.flush()
+        os.rename(temporary, path)
+        return cls(path, memory)
+
+    @classmethod
+    def open(cls, path=RING_PATH, timeout=None):
+        """Open an existing frame ring.
+
+        :param path: The ring's file, defaults to RING_PATH
+        :type path: str, optional
+        :param timeout: How long to wait for the ring to be created, defaults
+        to not waiting.
+        :type timeout: float, optional
+        :returns: The ring, or None if there isn't one.
+        """
+        deadline = time.time() + (timeout or 0)
+        while not os.path.exists(path):
+            if time.time() >= deadline:
+                return None
+            time.sleep(0.1)
+        memory = np.memmap(path, dtype=np.uint8, mode='r')
+        header = memory[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0]
+        if header['magic'] != MAGIC:
+            raise ValueError('{} is not a frame ring'.format(path))
+        return cls(path, memory)
+
+    @property
+    def shape(self):
+        """The (height, width, 3) shape of every frame."""
+        return self.bgr[0].shape
+
+    @property
+    def stale(self):
+        """Whether the ring has been recreated (or removed) since we opened it.
+
+        The writer recreates the ring if the camera's resolution changes, so
+        readers should open() it again.
+        """
+        try:
+            return os.stat(self.path).st_ino != self.inode
+        except OSError:
+            return True
+
+    @property
+    def sequence(self):
+        """The sequence number of the newest frame, 0 if there isn't one."""
+        return int(self.header['sequence'])
+
+    def write(self, bgr_frame, stamp):
+        """Write the next frame into the ring.
+
+        :param bgr_frame: The decoded frame. Must be the ring's shape.
+        :type bgr_frame: An OpenCV BGR image.
+        :param stamp: When the frame was taken, in seconds.
+        :type stamp: float
+        :returns: The frame's sequence number.
+        """
+        sequence = self.sequence + 1
+        i = sequence % len(self.slots)
+        slot = self.slots[i]
+        # Invalidate the slot while we overwrite it.
+        slot['sequence'] = 0
+        np.copyto(self.bgr[i], bgr_frame)
+        if self.hsv:
+            cv2.cvtColor(self.bgr[i], cv2.COLOR_BGR2HSV, dst=self.hsv[i])
+        slot['stamp'] = stamp
+        slot['sequence'] = sequence
+        self.header['sequence'] = sequence
+        return sequence
+
+    def latest(self):
+        """Get the newest frame in the ring.
+
+        :returns: The newest frame, or None if there isn't one.
+        :rtype: RingFrame
+        """
+        sequence = self.sequence
+        if sequence == 0:
+            return None
+        i = sequence % len(self.slots)
+        slot = self.slots[i][0]
+        stamp = float(slot['stamp'])
+        if slot['sequence'] != sequence:
+            # The writer lapped us between reading the sequence and the slot.
+            return None
+        return RingFrame(sequence, stamp, self.bgr[i],
+                         self.hsv[i] if self.hsv else None)
+
+    def wait(self, after=0, timeout=None, interval=0.002):
+        """Wait for a frame newer than the given sequence number.
+
+        :param after: Wait for a frame newer than this, defaults to 0
+        :type after: int, optional
+        :param timeout: The longest to wait, in seconds, defaults to forever.
+        :type timeout: float, optional
+        :param interval: How often to check for a new frame, defaults to 0.002
+        :type interval: float, optional
+        :returns: The newest frame, or None if none came in time.
+        :rtype: RingFrame
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            if self.sequence > after:
+                frame = self.latest()
+                if frame is not None:
+                    return frame
+            if deadline is not None and time.time() >= deadline:
+                return None
+            time.sleep(interval)
+
+    def valid(self, frame):
+        """Whether a frame's views still hold that frame.
+
+        Check after using a frame, to know whether the writer overwrote it
+        while you were using it.
+        """
+        i = frame.sequence % len(self.slots)
+        return self.slots[i][0]['sequence'] == frame.sequence
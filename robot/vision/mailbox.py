@@ -0,0 +1,51 @@
+from __future__ import division, print_function
+
+import threading
+
+
+class Mailbox(object):
+    """A single slot mailbox that only ever holds the newest message.
+
+    Putting a message in a full mailbox replaces (drops) the stale message, so
+    whoever takes from the mailbox always gets the freshest message available.
+    """
+
+    def __init__(self):
+        """Create an empty Mailbox."""
+        self.condition = threading.Condition()
+        self.message = None
+        self.closed = False
+        # How many messages were replaced before anybody took them.
+        self.dropped = 0
+
+    def put(self, message):
+        """Put a message in the mailbox, replacing any stale message.
+
+        :param message: The message. Must not be None.
+        """
+        with self.condition:
+            if self.message is not None:
+                self.dropped += 1
+            self.message = message
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        """Take the newest message out of the mailbox.
+
+        :param timeout: How many seconds to wait for a message, defaults to
+        waiting forever.
+        :type timeout: float, optional
+        :returns: The message, or None if we timed out or the mailbox was
+        closed.
+        """
+        with self.condition:
+            if self.message is None and not self.closed:
+                self.condition.wait(timeout)
+            message, self.message = self.message, None
+            return message
+
+    def close(self):
+        """Close the mailbox, waking up anybody waiting on it."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
@@ -3,8 +3,28 @@ from __future__ import division, print_function
 import cv2
 import numpy as np
 
+# The structuring elements used to denoise masks. They never change, so there's
+# no point building them for every mask.
+ERODE_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (8, 8))
+DILATE_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
 
-def mask_image(image, low_color, high_color):
+# The numpy arrays for every HSV color we've masked by.
+bounds = {}
+
+
+def color_bound(color):
+    """Get the (cached) numpy array for an HSV color.
+
+    :param color: The HSV color.
+    :type color: A (H, S, V) tuple.
+    """
+    bound = bounds.get(color)
+    if bound is None:
+        bound = bounds[color] = np.array(color)
+    return bound
+
+
+def mask_image(image, low_color, high_color, dst=None, scratch=None):
     """Mask the given image.
 
     Filter out pixels that do not fall within the given HSV color ranges. Will
@@ -16,20 +36,25 @@ def mask_image(image, low_color, high_color):
     :type low_color: A (H, S, V) tuple of integers.
     :param high_color: The high HSV value.
     :type high_color: A (H, S, V) tuple of integers.
+    :param dst: Where to put the mask, defaults to a new array.
+    :type dst: A 2D numpy array the same size as the image, optional
+    :param scratch: A temporary to use while denoising, defaults to a new
+    array.
+    :type scratch: A 2D numpy array the same size as the image, optional
     """
-    # Convert the given tuples to numpy arrays.
-    low_color = np.array(low_color)
-    high_color = np.array(high_color)
     # Produce the mask.
-    mask = cv2.inRange(image, low_color, high_color)
-    # Denoise the mask.
-    mask = cv2.erode(
-        mask,
-        cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (8, 8)),
-        iterations=1)
-    mask = cv2.dilate(
-        mask,
-        cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5)),
-        iterations=1)
-
-    return mask
+    mask = cv2.inRange(image, color_bound(tuple(low_color)),
+                       color_bound(tuple(high_color)), dst=dst)
+    return denoise(mask, scratch)
+
+
+def denoise(mask, scratch=None):
+    """Denoise the given mask in place by eroding, then dilating it.
+
+    :param mask: The mask to denoise.
+    :type mask: A 2D numpy array of 0 and 255 values.
+    :param scratch: A temporary to erode into, defaults to a new array.
+    :type scratch: A 2D numpy array the same size as the mask, optional
+    """
+    eroded = cv2.erode(mask, ERODE_KERNEL, dst=scratch, iterations=1)
+    return cv2.dilate(eroded, DILATE_KERNEL, dst=mask, iterations=1)
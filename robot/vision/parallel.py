@@ -0,0 +1,53 @@
+from __future__ import division, print_function
+
+import threading
+import time
+
+# The messages published by the Camera running in the current thread, if the
+# Camera is running in a thread pool.
+outboxes = threading.local()
+
+
+class DeferredPublisher(object):
+    """Wrap a ROS publisher so Cameras running in a thread pool can use it.
+
+    Messages published by a Camera running in a pool thread are held in that
+    thread's outbox, so they can be published in a deterministic order once
+    every Camera has finished with the frame. Messages published from anywhere
+    else are published immediately.
+    """
+
+    def __init__(self, publisher):
+        """Wrap the given publisher.
+
+        :param publisher: The ROS publisher to publish messages with.
+        :type publisher: rospy.Publisher
+        """
+        self.publisher = publisher
+
+    def publish(self, msg):
+        """Publish a message, or hold it if a Camera is running in a pool."""
+        outbox = getattr(outboxes, 'messages', None)
+        if outbox is None:
+            self.publisher.publish(msg)
+        else:
+            outbox.append((self.publisher, msg))
+
+
+def process_deferred(args):
+    """Have a Camera process a frame, holding on to whatever it publishes.
+
+    :param args: The Camera and the frame graph it should process.
+    :type args: A (robot.vision.camera_base.Camera,
+    robot.vision.frame_graph.FrameGraph) tuple.
+    :returns: The (publisher, message) pairs the Camera published, and how
+    many seconds the Camera took.
+    """
+    camera, frame = args
+    outboxes.messages = []
+    try:
+        start = time.time()
+        camera.process_frame(frame)
+        return outboxes.messages, time.time() - start
+    finally:
+        outboxes.messages = None
@@ -0,0 +1,362 @@
+from __future__ import division, print_function
+
+import itertools
+import time
+from multiprocessing.pool import ThreadPool
+
+import cv2
+
+from robot.summary import SummaryBuilder, encode
+from robot.tracing import Tracer
+
+from .arena import BufferArena
+from .camera_base import Camera
+from .camera_goal import GoalCamera
+from .camera_lane import LaneCamera
+from .camera_node import NodeCamera
+from .camera_obstacle import ObstacleCamera
+from .camera_stoplight import StoplightCamera
+from .color_table import ColorTable
+from .decode import FrameDecoder
+from .frame_graph import FrameGraph, plan_rows
+from .parallel import DeferredPublisher, process_deferred
+from .schedule import DetectorScheduler
+
+
+class VisionPipeline(object):
+    """Decode each frame, and have the right detectors process it.
+
+    The pipeline knows nothing about ROS nodes or topics. It publishes with
+    whatever publishers it's given, so it can be driven by the
+    CameraController on the robot, or by a replay of recorded frames.
+    """
+
+    # How much do we blur the image
+    BLUR_KERNEL = (5, 5)
+    # The webcam streams 640x480 frames.
+    FRAME_HEIGHT = 480
+    # How long we can spend on each frame, in seconds, to keep up with the
+    # camera.
+    FRAME_BUDGET = 1 / 30
+
+    def __init__(self, publishers, verbose=False, color_table=False,
+                 threads=0, governor=False):
+        """Create a VisionPipeline.
+
+        :param publishers: The publisher for each of the topics the pipeline
+        publishes on, keyed by their robot.common.TOPIC key. A summary of what
+        the detectors found in each frame is published on VISION_SUMMARY. If
+        there's a TRACE publisher too, when each frame's been processed is
+        reported on it.
+        :type publishers: A dict of objects with a publish(msg) method.
+        :param verbose: Whether or not to console spam with useless random
+        info.
+        :type verbose: bool
+        :param color_table: Classify pixels with a precomputed lookup table
+        instead of converting to HSV and masking each color separately. The
+        table path blurs in BGR rather than HSV, so masks can differ at color
+        edges, but not enough to change what the detectors publish, beyond
+        the node confidence (see ColorTable), defaults to False
+        :type color_table: bool, optional
+        :param threads: Run the active Cameras concurrently on a pool of this
+        many threads. OpenCV releases the GIL, so this actually helps. Ignored
+        when verbose, since the GUI must stay on one thread, defaults to 0
+        :type threads: int, optional
+        :param governor: Run the goal, node, and obstacle detectors less often
+        when the detectors take longer than FRAME_BUDGET a frame, except the
+        one the robot's state steers by, defaults to False
+        :type governor: bool, optional
+        """
+        self.verbose = verbose
+        self.decoder = FrameDecoder()
+        # Preallocated buffers for converting and masking each frame, and the
+        # operation graph of the frame being processed.
+        self.arena = BufferArena()
+        self.graph = None
+        # The full size height of the last frame we decoded.
+        self.frame_height = self.FRAME_HEIGHT
+        # Every processed frame gets the next trace id.
+        self.traces = itertools.count(1)
+        self.tracer = Tracer(publishers.get('TRACE'), 'vision')
+
+        # The Cameras' publishers fill in one summary of each frame, which
+        # is published once they're all done with it.
+        self.summary_pub = publishers['VISION_SUMMARY']
+        self.summary = SummaryBuilder()
+        outputs = dict(self.summary.outputs)
+
+        self.threads = 0 if verbose else threads
+        self.pool = None
+        if self.threads:
+            # Cameras running in the pool publish in a deterministic order
+            # once they've all finished.
+            outputs = dict((name, DeferredPublisher(output))
+                           for name, output in outputs.items())
+        # What each Camera publishes with, by output name.
+        self.outputs = outputs
+
+        poi_pub = outputs['POINT_OF_INTEREST']
+        self.lane_camera = LaneCamera(outputs['LANE_CENTROID'],
+                                      outputs['LANE_CONFIDENCE'],
+                                      verbose=False)
+        self.stoplight_cam = StoplightCamera(poi_pub, verbose=False)
+        self.obstacle_cam = ObstacleCamera(poi_pub, verbose=False)
+        self.exit_cam = GoalCamera(outputs['GOAL_CENTROID'], poi_pub,
+                                   outputs['GOAL_CONFIDENCE'],
+                                   verbose=verbose)
+        self.node_cam = NodeCamera(outputs['NODE_CENTROID'], poi_pub,
+                                   outputs['NODE_CONFIDENCE'],
+                                   verbose=verbose)
+        self.cameras = [self.lane_camera, self.stoplight_cam, self.obstacle_cam,
+                        self.exit_cam, self.node_cam]
+        # Which detectors look at each frame is decided by the schedule.
+        self.scheduler = DetectorScheduler(
+            {
+                'lane': self.lane_camera,
+                'stoplight': self.stoplight_cam,
+                'obstacle': self.obstacle_cam,
+                'goal': self.exit_cam,
+                'node': self.node_cam,
+            },
+            budget=self.FRAME_BUDGET if governor else None)
+
+        # Build the table once up front, since it takes a moment.
+        self.color_table = None
+        if color_table:
+            self.color_table = ColorTable(ColorTable.ranges_of(self.cameras))
+        # The Camera.mask_version the table was built for.
+        self.mask_version = Camera.mask_version
+
+    def start(self):
+        """Start the thread pool, if we use one.
+
+        NOTE: Call this in the process that will be processing frames.
+        """
+        if self.threads and self.pool is None:
+            self.pool = ThreadPool(self.threads)
+
+    def stop(self):
+        """Stop the thread pool, and destroy any open OpenCV windows."""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+        if self.verbose:
+            cv2.destroyAllWindows()
+
+    def process(self, data, state, stamp=None):
+        """Process a compressed video frame.
+
+        Based on the given state, perform different analysis on the frame.
+
+        :param data: The compressed image payload.
+        :type data: The data of a sensor_msgs.msg.CompressedImage message.
+        :param state: The robot's current state.
+        :type state: robot.common.State
+        :param stamp: When the frame was taken, in seconds, defaults to now.
+        :type stamp: float, optional
+        """
+        if stamp is None:
+            stamp = time.time()
+        detectors = self.scheduler.due(state, stamp)
+        cameras = [camera for _, camera in detectors]
+        if not cameras and not self.verbose:
+            # Nobody cares about this frame, so don't bother decoding it.
+            self.scheduler.end_frame(state)
+            return
+
+        # Decode only as much of the frame as the Cameras will look at.
+        scale = min([camera.DECODE_SCALE for camera in cameras] or [1])
+        top, bottom = plan_rows(cameras, self.frame_height)
+        padding = self.BLUR_KERNEL[1] // 2 * scale
+        bgr_frame, bgr_top = self.decoder.decode(
+            data,
+            scale=scale,
+            top=0 if self.verbose else max(top - padding, 0))
+        if bgr_frame is None:
+            print('Failed to decode frame.')
+            self.scheduler.end_frame(state)
+            return
+        self.frame_height = bgr_top + bgr_frame.shape[0] * scale
+
+        self.detect(bgr_frame, bgr_top, scale, state, stamp, detectors)
+
+    def process_decoded(self, bgr_frame, state, stamp=None):
+        """Process a full size frame somebody else already decoded.
+
+        :param bgr_frame: The decoded video frame. It isn't modified.
+        :type bgr_frame: An OpenCV BGR image.
+        :param state: The robot's current state.
+        :type state: robot.common.State
+        :param stamp: When the frame was taken, in seconds, defaults to now.
+        :type stamp: float, optional
+        """
+        if stamp is None:
+            stamp = time.time()
+        detectors = self.scheduler.due(state, stamp)
+        self.frame_height = bgr_frame.shape[0]
+        self.detect(bgr_frame, 0, 1, state, stamp, detectors)
+
+    def detect(self, bgr_frame, bgr_top, scale, state, stamp, detectors):
+        """Have the scheduled detectors process a decoded frame.
+
+        :param bgr_frame: The bottom rows of the decoded video frame.
+        :type bgr_frame: An OpenCV BGR image.
+        :param bgr_top: The full size row the decoded rows start at.
+        :type bgr_top: int
+        :param scale: How much the frame was downscaled by when decoding.
+        :type scale: int
+        :param state: The robot's current state.
+        :type state: robot.common.State
+        :param stamp: When the frame was taken, in seconds.
+        :type stamp: float
+        :param detectors: The detectors scheduled for this frame.
+        :type detectors: A list of (name, robot.vision.camera_base.Camera)
+        tuples.
+        """
+        cameras = [camera for _, camera in detectors]
+        if cameras:
+            frame = self.convert_frame(bgr_frame, bgr_top, scale, cameras,
+                                       stamp, next(self.traces))
+            self.process_frame(frame, detectors)
+        self.scheduler.end_frame(state)
+
+        if self.verbose:
+            cv2.namedWindow('Camera', cv2.WINDOW_NORMAL)
+            cv2.imshow('Camera', bgr_frame)
+            cv2.waitKey(10)
+
+    def process_frame(self, frame, detectors):
+        """Have the given detectors process a frame, and publish its summary.
+
+        :param frame: The operation graph of the frame.
+        :type frame: robot.vision.frame_graph.FrameGraph
+        :param detectors: The Cameras to process the frame, in order.
+        :type detectors: A list of (name, robot.vision.camera_base.Camera)
+        tuples.
+        """
+        self.summary.reset(frame.stamp, frame.trace)
+        if self.pool is None or len(detectors) < 2:
+            for name, camera in detectors:
+                start = time.time()
+                camera.process_frame(frame)
+                self.scheduler.record(name, time.time() - start)
+        else:
+            # Publish in the same order the Cameras would have serially.
+            results = self.pool.map(
+                process_deferred, [(camera, frame) for _, camera in detectors])
+            for (name, _), (outbox, seconds) in zip(detectors, results):
+                self.scheduler.record(name, seconds)
+                for publisher, msg in outbox:
+                    publisher.publish(msg)
+
+        self.summary_pub.publish(encode(self.summary.summary()))
+        self.tracer.report(frame.stamp, frame.trace)
+
+    def convert_frame(self, bgr_frame, bgr_top, scale, cameras, stamp,
+                      trace=0):
+        """Convert and blur only the rows of a frame the given Cameras read.
+
+        In the ON_PATH state, the lane and stoplight Cameras only read a ten
+        row strip at the bottom of the frame, so there's no point converting
+        the other 470 rows. The band is padded by the blur kernel so that the
+        blurred rows come out the same as if the full frame were blurred.
+
+        :param bgr_frame: The bottom rows of the decoded video frame.
+        :type bgr_frame: An OpenCV BGR image.
+        :param bgr_top: The full size row the decoded rows start at.
+        :type bgr_top: int
+        :param scale: How much the frame was downscaled by when decoding.
+        :type scale: int
+        :param cameras: The Cameras that will process the frame.
+        :type cameras: A list of robot.vision.camera_base.Camera objects.
+        :param stamp: When the frame was taken, in seconds.
+        :type stamp: float
+        :param trace: The frame's trace id, defaults to 0 for untraced.
+        :type trace: int, optional
+        :returns: The operation graph of the converted band. It's reset by the
+        next call.
+        :rtype: robot.vision.frame_graph.FrameGraph
+        """
+        top, bottom = plan_rows(cameras, self.frame_height)
+        padding = self.BLUR_KERNEL[1] // 2
+        band, inner, offset = padded_band(bgr_frame, bgr_top, scale, top,
+                                          bottom, padding)
+        if self.color_table is None:
+            band = blur_hsv(band, self.BLUR_KERNEL, self.arena)
+        else:
+            # Rebuild the table if somebody changed the thresholds on us.
+            if self.mask_version != Camera.mask_version:
+                self.mask_version = Camera.mask_version
+                self.color_table.update(ColorTable.ranges_of(self.cameras))
+            # Blur, then find every color class in one lookup pass.
+            blurred = self.arena.like('blurred', band)
+            cv2.GaussianBlur(band, self.BLUR_KERNEL, 0, dst=blurred)
+            band = self.color_table.classify(blurred, self.arena)
+
+        # Every Camera shares the one operation graph, so masks and blobs
+        # that multiple Cameras need only get computed once. The graph itself
+        # is reused from frame to frame.
+        image = band[inner]
+        if self.graph is None:
+            self.graph = FrameGraph(image, arena=self.arena)
+        self.graph.reset(
+            image,
+            offset=offset,
+            height=self.frame_height,
+            scale=scale,
+            table=self.color_table,
+            stamp=stamp,
+            trace=trace)
+        return self.graph
+
+
+def padded_band(bgr_frame, bgr_top, scale, top, bottom, padding):
+    """Find the rows of a decoded frame to convert, padded for blurring.
+
+    :param bgr_frame: The bottom rows of the decoded video frame.
+    :type bgr_frame: An OpenCV BGR image.
+    :param bgr_top: The full size row the decoded rows start at.
+    :type bgr_top: int
+    :param scale: How much the frame was downscaled by when decoding.
+    :type scale: int
+    :param top: The first full size row we need.
+    :type top: int
+    :param bottom: The full size row after the last one we need.
+    :type bottom: int
+    :param padding: How many rows the blur kernel reaches, in decoded rows.
+    :type padding: int
+    :returns: A (band, inner, offset) tuple. The band is a view of the padded
+    rows, inner is the slice of the band's rows we need, and offset is the
+    full size row inner starts at.
+    """
+    # Work in the rows of the decoded (possibly downscaled) frame.
+    top = top // scale
+    bottom = -(-bottom // scale)
+    first = bgr_top // scale
+    padded_top = max(top - padding, first)
+    padded_bottom = min(bottom + padding, first + bgr_frame.shape[0])
+
+    band = bgr_frame[padded_top - first:padded_bottom - first]
+    return band, slice(top - padded_top, bottom - padded_top), top * scale
+
+
+def blur_hsv(band, kernel, arena, dst=None):
+    """Convert a band of a frame to HSV, and blur it.
+
+    :param band: The band to convert.
+    :type band: An OpenCV BGR image.
+    :param kernel: The Gaussian blur kernel size.
+    :type kernel: A (width, height) tuple.
+    :param arena: Where to keep the temporaries.
+    :type arena: robot.vision.arena.BufferArena
+    :param dst: Where to put the blurred band, defaults to the arena.
+    :type dst: An array the same shape as the band, optional
+    """
+    # Convert BGR to HSV.
+    hsv = arena.like('hsv', band)
+    cv2.cvtColor(band, cv2.COLOR_BGR2HSV, dst=hsv)
+
+    # Blur the image before doing anything.
+    if dst is None:
+        dst = arena.like('blurred', band)
+    return cv2.GaussianBlur(hsv, kernel, 0, dst=dst)
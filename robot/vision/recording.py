@@ -0,0 +1,117 @@
+from __future__ import division, print_function
+
+import os
+
+import numpy as np
+
+# One index record per frame: where the compressed payload is in the frames
+# file, when the frame was taken, and the robot's state when it arrived.
+# A state of 0 means we hadn't heard the robot's state yet.
+INDEX_DTYPE = np.dtype([
+    ('offset', '<u8'),
+    ('length', '<u4'),
+    ('stamp', '<f8'),
+    ('state', 'u1'),
+])
+
+
+def paths(path):
+    """Get the (frames, index) file paths of a recording."""
+    return path + '.frames', path + '.index'
+
+
+class RecordingWriter(object):
+    """Append compressed frames to a recording.
+
+    A recording is two files: the concatenated compressed payloads, and a
+    fixed size index record per frame. Both are only ever appended to, and
+    the index record is written after its payload, so a recording that was
+    cut short (e.g., by a Ctrl-C) is still readable up to its last frame.
+    """
+
+    def __init__(self, path):
+        """Create a new recording, replacing any existing one.
+
+        :param path: The recording's path, without extension.
+        :type path: str
+        """
+        frames_path, index_path = paths(path)
+        self.frames = open(frames_path, 'wb')
+        self.index = open(index_path, 'wb')
+        self.offset = 0
+        self.count = 0
+        self.record = np.zeros(1, dtype=INDEX_DTYPE)
+
+    def write(self, data, stamp, state=None):
+        """Append a compressed frame to the recording.
+
+        :param data: The compressed image payload.
+        :type data: The data of a sensor_msgs.msg.CompressedImage message.
+        :param stamp: When the frame was taken, in seconds.
+        :type stamp: float
+        :param state: The robot's state when the frame arrived, if known.
+        :type state: robot.common.State, optional
+        """
+        self.frames.write(data)
+        self.record['offset'] = self.offset
+        self.record['length'] = len(data)
+        self.record['stamp'] = stamp
+        self.record['state'] = 0 if state is None else state.value
+        self.index.write(self.record.tobytes())
+        self.offset += len(data)
+        self.count += 1
+
+    def flush(self):
+        """Flush the recording to disk."""
+        self.frames.flush()
+        self.index.flush()
+
+    def close(self):
+        """Finish the recording."""
+        self.frames.close()
+        self.index.close()
+
+
+class Recording(object):
+    """A memory mapped recording of compressed frames.
+
+    Frames are read straight out of the memory map, so opening even a long
+    recording is instant, and nothing gets copied until it's decoded.
+    """
+
+    def __init__(self, path):
+        """Open a recording.
+
+        :param path: The recording's path, without extension.
+        :type path: str
+        """
+        frames_path, index_path = paths(path)
+        # A partially written index record at the end is ignored.
+        count = os.path.getsize(index_path) // INDEX_DTYPE.itemsize
+        if count:
+            self.index = np.memmap(index_path, dtype=INDEX_DTYPE, mode='r',
+                                   shape=(count,))
+            self.frames = np.memmap(frames_path, dtype=np.uint8, mode='r')
+        else:
+            self.index = np.zeros(0, dtype=INDEX_DTYPE)
+            self.frames = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        """Get the number of frames in the recording."""
+        return len(self.index)
+
+    def __getitem__(self, i):
+        """Get a frame of the recording.
+
+        :returns: A (data, stamp, state) tuple. The data is a view of the
+        compressed payload, and the state is 0 if it wasn't known.
+        """
+        record = self.index[i]
+        offset = int(record['offset'])
+        data = self.frames[offset:offset + int(record['length'])]
+        return data, float(record['stamp']), int(record['state'])
+
+    @property
+    def stamps(self):
+        """When each frame was taken, in seconds."""
+        return self.index['stamp']
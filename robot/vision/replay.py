@@ -0,0 +1,109 @@
+from __future__ import division, print_function
+
+import time
+from collections import namedtuple
+
+from robot.common import State
+from robot.summary import decode
+
+from .pipeline import VisionPipeline
+from .recording import Recording
+
+# Something the pipeline published while processing a recorded frame.
+Output = namedtuple('Output', 'frame stamp topic data')
+
+# The topics the vision pipeline publishes on, by their TOPIC key.
+TOPICS = ('VISION_SUMMARY',)
+
+
+class CapturePublisher(object):
+    """Stand in for a ROS publisher, capturing everything that's published."""
+
+    def __init__(self, replay, topic):
+        """Capture messages for the given replay, on the given topic.
+
+        :param replay: The replay the messages are published during.
+        :type replay: Replay
+        :param topic: The TOPIC key of the topic.
+        :type topic: str
+        """
+        self.replay = replay
+        self.topic = topic
+
+    def publish(self, msg):
+        """Capture a message, along with the frame that produced it.
+
+        Summaries are captured unpacked, as robot.summary.Summary tuples.
+        """
+        data = msg.data
+        if self.topic == 'VISION_SUMMARY':
+            data = decode(msg)
+        self.replay.outputs.append(Output(self.replay.frame, self.replay.stamp,
+                                          self.topic, data))
+
+
+class Replay(object):
+    """Feed a recording straight into the vision pipeline, without ROS.
+
+    Every frame is processed in the state the robot was in when it was
+    recorded (ON_PATH, if that wasn't known), and everything the detectors
+    publish is captured, so different runs and implementations can be
+    compared exactly.
+    """
+
+    def __init__(self, recording, realtime=False, **options):
+        """Create a Replay.
+
+        :param recording: The recording, or its path.
+        :type recording: robot.vision.recording.Recording or str
+        :param realtime: Feed frames at their original timing rather than as
+        fast as possible, defaults to False
+        :type realtime: bool, optional
+        :param options: Any robot.vision.pipeline.VisionPipeline options.
+        """
+        if not isinstance(recording, Recording):
+            recording = Recording(recording)
+        self.recording = recording
+        self.realtime = realtime
+        self.outputs = []
+        # The frame being processed.
+        self.frame = None
+        self.stamp = None
+        publishers = dict((topic, CapturePublisher(self, topic))
+                          for topic in TOPICS)
+        self.pipeline = VisionPipeline(publishers, **options)
+
+    def run(self, states=None):
+        """Replay every frame of the recording.
+
+        :param states: Override the recorded state of every frame with this
+        state, defaults to the recorded states.
+        :type states: robot.common.State, optional
+        :returns: Everything the pipeline published, in order.
+        :rtype: A list of Output tuples.
+        """
+        self.outputs = []
+        self.pipeline.start()
+        try:
+            start = time.time()
+            first = None
+            for i in range(len(self.recording)):
+                data, stamp, state = self.recording[i]
+                if states is not None:
+                    state = states
+                else:
+                    state = State(state) if state else State.ON_PATH
+
+                if self.realtime:
+                    if first is None:
+                        first = stamp
+                    delay = (stamp - first) - (time.time() - start)
+                    if delay > 0:
+                        time.sleep(delay)
+
+                self.frame = i
+                self.stamp = stamp
+                self.pipeline.process(data, state, stamp)
+        finally:
+            self.pipeline.stop()
+        return self.outputs
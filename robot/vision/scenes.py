@@ -0,0 +1,130 @@
+from __future__ import division, print_function
+
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from robot.common import State
+
+# The webcam's frame size.
+WIDTH = 640
+HEIGHT = 480
+
+# BGR colors that land well inside each of the detectors' HSV ranges.
+GRAY = (110, 110, 110)
+WHITE = (255, 255, 255)
+RED = (0, 0, 255)
+GREEN = (40, 160, 40)
+BLUE = (220, 30, 30)
+YELLOW = (0, 220, 220)
+PURPLE = (220, 40, 220)
+
+# A synthetic frame, and the state the robot would be in when seeing it.
+Scene = namedtuple('Scene', 'name state image')
+
+
+def blank(color=GRAY):
+    """Create an empty floor of the given color."""
+    image = np.empty((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    image[...] = color
+    return image
+
+
+def add_noise(image, sigma, seed):
+    """Add some (repeatable) sensor noise to an image, in place."""
+    if sigma <= 0:
+        return image
+    noise = np.random.RandomState(seed).normal(0, sigma, image.shape)
+    image[...] = np.clip(image + noise, 0, 255)
+    return image
+
+
+def lane(offset=0.0, width=60):
+    """A white lane line, offset from the center by -1.0 to 1.0."""
+    image = blank()
+    center = int(WIDTH / 2 * (1 + offset))
+    # The line leans toward the center of the frame as it recedes.
+    top = WIDTH // 2 + (center - WIDTH // 2) // 3
+    points = np.array([[top - width // 4, HEIGHT // 2],
+                       [top + width // 4, HEIGHT // 2],
+                       [center + width // 2, HEIGHT],
+                       [center - width // 2, HEIGHT]], dtype=np.int32)
+    cv2.fillConvexPoly(image, points, WHITE)
+    return image
+
+
+def stoplight(offset=0.0):
+    """A red stop strip across the lane."""
+    image = lane(offset)
+    cv2.rectangle(image, (0, HEIGHT - 30), (WIDTH, HEIGHT), RED, -1)
+    return image
+
+
+def parking_lot(exit_offset=None, obstacle=None):
+    """A green parking lot, with the blue exit and an obstacle in view.
+
+    Anything in front of us that isn't the green lot or the blue exit (and
+    anything yellow) is an obstacle.
+
+    :param exit_offset: Where the exit is, from -1.0 to 1.0, or None.
+    :param obstacle: The obstacle's color, or None for a clear path.
+    """
+    image = blank(GREEN)
+    if exit_offset is not None:
+        center = int(WIDTH / 2 * (1 + exit_offset))
+        cv2.rectangle(image, (center - 90, 120), (center + 90, 300), BLUE, -1)
+    if obstacle is not None:
+        cv2.rectangle(image, (WIDTH // 4, 380), (3 * WIDTH // 4, HEIGHT),
+                      obstacle, -1)
+    return image
+
+
+def graph_node(distance=0.5, offset=0.0):
+    """A purple graph node on the lane, from 0.0 (far) to 1.0 (underfoot)."""
+    image = lane(offset)
+    center = int(WIDTH / 2 * (1 + offset))
+    bottom = int(HEIGHT / 2 + distance * HEIGHT / 2) + 40
+    cv2.ellipse(image, (center, bottom - 60), (150, 60), 0, 0, 360, PURPLE,
+                -1)
+    return image
+
+
+def scenes(noise=4.0, seed=0):
+    """Render every synthetic scene our detectors handle.
+
+    :param noise: The standard deviation of the added sensor noise, defaults
+    to 4.0
+    :type noise: float, optional
+    :param seed: Seed the noise with this, defaults to 0
+    :type seed: int, optional
+    :returns: A list of Scenes.
+    """
+    rendered = []
+    for offset in (-0.6, -0.3, 0.0, 0.3, 0.6):
+        rendered.append(Scene('lane {:+.1f}'.format(offset), State.ON_PATH,
+                              lane(offset)))
+    rendered.append(Scene('stoplight', State.ON_PATH, stoplight()))
+    rendered.append(Scene('parking lot', State.CANCER, parking_lot()))
+    for offset in (-0.5, 0.0, 0.5):
+        rendered.append(Scene('exit {:+.1f}'.format(offset), State.CANCER,
+                              parking_lot(exit_offset=offset)))
+    rendered.append(Scene('gray obstacle', State.CANCER,
+                          parking_lot(obstacle=GRAY)))
+    rendered.append(Scene('yellow obstacle', State.CANCER,
+                          parking_lot(obstacle=YELLOW)))
+    for distance in (0.2, 0.6, 1.0):
+        rendered.append(Scene('node {:.1f}'.format(distance),
+                              State.G_ON_PATH, graph_node(distance)))
+
+    for i, scene in enumerate(rendered):
+        add_noise(scene.image, noise, seed + i)
+    return rendered
+
+
+def encode(image, quality=80):
+    """JPEG compress an image, like the webcam does."""
+    ok, data = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError('Could not encode the image.')
+    return data.tobytes()
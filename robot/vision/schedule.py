@@ -0,0 +1,204 @@
+from __future__ import division, print_function
+
+import threading
+from collections import namedtuple
+
+from robot.common import State
+
+# How often a detector should run. Either every Nth frame, or at some rate in
+# Hz, but not both.
+Rate = namedtuple('Rate', 'every hz')
+
+
+def every(n=1):
+    """Run a detector every nth frame."""
+    return Rate(n, None)
+
+
+def hz(rate):
+    """Run a detector at (at most) the given rate, in Hz."""
+    return Rate(None, rate)
+
+
+# Which detectors run in each state, in the order they process each frame, and
+# how often. States that aren't listed don't look at frames at all.
+SCHEDULE = {
+    # Line follow
+    State.ON_PATH: (('lane', every()), ('stoplight', every())),
+    State.STOPPING: (('lane', every()), ('stoplight', every())),
+
+    # Parking Lot
+    State.CANCER: (('obstacle', every()), ('goal', every())),
+    State.SPIN: (('obstacle', every()), ('goal', every())),
+    State.TURN: (('obstacle', every()),),
+    State.MTG: (('goal', every()),),
+
+    # Graph
+    State.ORIENTING: (('lane', every()), ('node', every())),
+    State.G_ON_PATH: (('lane', every()), ('node', every())),
+    State.NODE_STOPPING: (('node', every()),),
+    State.NODE_STOPPED: (('node', every()),),
+    State.ROTATE_LEFT: (('node', every()),),
+    State.ROTATE_RIGHT: (('node', every()),),
+    State.FORWARD: (('node', every()),),
+    State.END: (('node', every()),),
+}
+
+# The detectors the governor may slow down, in the order it slows them down.
+# Anything else (the lane and stoplight) always runs at its scheduled rate.
+THROTTLE_ORDER = ('goal', 'node', 'obstacle')
+
+# The detector each state's control loop steers or decides by. The governor
+# never slows it down in that state, however long frames take.
+STEERING = {
+    State.ON_PATH: 'lane',
+    State.STOPPING: 'lane',
+    State.CANCER: 'goal',
+    State.SPIN: 'goal',
+    State.TURN: 'obstacle',
+    State.MTG: 'goal',
+    State.ORIENTING: 'node',
+    State.G_ON_PATH: 'node',
+    State.NODE_STOPPING: 'node',
+    State.NODE_STOPPED: 'node',
+    State.ROTATE_LEFT: 'node',
+    State.ROTATE_RIGHT: 'node',
+    State.FORWARD: 'node',
+    State.END: 'node',
+}
+
+
+class DetectorScheduler(object):
+    """Decide which detectors should look at each frame.
+
+    The scheduler runs the detectors in the SCHEDULE for the current state at
+    their scheduled rates. If given a frame budget, it also acts as a governor:
+    when the detectors take longer than the budget to process a frame, it runs
+    the detectors in THROTTLE_ORDER less often, and speeds them back up once
+    there's time to spare. The detector each state steers by (see STEERING)
+    always runs at its scheduled rate.
+
+    Only the detectors' own time counts against the budget, since slowing
+    them down can't make decoding or converting frames any faster. And only
+    frames that a detector the governor can slow down looked at count, so the
+    frames it skipped don't make it look like there's time to spare.
+
+    The StagedPipeline asks which detectors are due on the thread frames come
+    in on, and records how they did on its detect thread, so the scheduler
+    locks its state.
+    """
+
+    # How quickly the average frame cost follows the measured cost.
+    SMOOTHING = 0.1
+    # Speed detectors back up when frames take less than this much of the
+    # budget.
+    RELAX = 0.6
+    # The most a detector can be slowed down by.
+    MAX_DIVISOR = 8
+    # How many frames to wait after changing a rate before changing another,
+    # so we see the effect of the first change.
+    COOLDOWN = 15
+
+    def __init__(self, detectors, schedule=None, budget=None):
+        """Create a DetectorScheduler.
+
+        :param detectors: Each detector, by the name the schedule uses.
+        :type detectors: A dict of robot.vision.camera_base.Camera objects.
+        :param schedule: The detectors to run in each state, defaults to
+        SCHEDULE
+        :type schedule: A dict of State -> ((name, Rate), ...) tuples, optional
+        :param budget: How long processing a frame should take in seconds, or
+        None to never slow anything down, defaults to None
+        :type budget: float, optional
+        """
+        self.detectors = detectors
+        self.schedule = SCHEDULE if schedule is None else schedule
+        self.budget = budget
+        self.frame = 0
+        # When each Hz detector last ran.
+        self.last_run = {}
+        # How much slower than scheduled the governor is running each detector.
+        self.divisor = dict((name, 1) for name in detectors)
+        # The average cost of each detector, and of the detectors in each
+        # frame the governor counts, in seconds.
+        self.cost = dict((name, 0.0) for name in detectors)
+        self.frame_cost = 0.0
+        self.cooldown = 0
+        # The detectors that have processed the current frame, and how long
+        # they took altogether, in seconds.
+        self.ran = set()
+        self.spent = 0.0
+        self.lock = threading.Lock()
+
+    def due(self, state, now):
+        """Get the detectors that should process this frame.
+
+        :param state: The robot's current state.
+        :type state: robot.common.State
+        :param now: The current time, in seconds.
+        :type now: float
+        :returns: A list of (name, Camera) tuples, in processing order.
+        """
+        with self.lock:
+            self.frame += 1
+            steering = STEERING.get(state)
+            detectors = []
+            for name, rate in self.schedule.get(state, ()):
+                divisor = 1 if name == steering else self.divisor[name]
+                if rate.hz is not None:
+                    last = self.last_run.get(name)
+                    if last is not None and now - last < divisor / rate.hz:
+                        continue
+                    self.last_run[name] = now
+                elif self.frame % (rate.every * divisor) != 0:
+                    continue
+                detectors.append((name, self.detectors[name]))
+            return detectors
+
+    def throttleable(self, state):
+        """Get the detectors the governor may slow down in a state, in the
+        order it slows them down."""
+        scheduled = set(name for name, _ in self.schedule.get(state, ()))
+        return [name for name in THROTTLE_ORDER
+                if name in scheduled and name != STEERING.get(state)]
+
+    def record(self, name, seconds):
+        """Record how long a detector took to process the current frame."""
+        with self.lock:
+            self.cost[name] += self.SMOOTHING * (seconds - self.cost[name])
+            self.ran.add(name)
+            self.spent += seconds
+
+    def end_frame(self, state):
+        """Finish the current frame, and adjust detector rates.
+
+        :param state: The robot's current state.
+        :type state: robot.common.State
+        """
+        throttleable = self.throttleable(state)
+        with self.lock:
+            counted = not self.ran.isdisjoint(throttleable)
+            spent = self.spent
+            self.ran.clear()
+            self.spent = 0.0
+            if not counted:
+                return
+            self.frame_cost += self.SMOOTHING * (spent - self.frame_cost)
+            if self.budget is None:
+                return
+            if self.cooldown > 0:
+                self.cooldown -= 1
+                return
+
+            if self.frame_cost > self.budget:
+                for name in throttleable:
+                    if self.divisor[name] < self.MAX_DIVISOR:
+                        self.divisor[name] *= 2
+                        self.cooldown = self.COOLDOWN
+                        break
+            elif self.frame_cost < self.RELAX * self.budget:
+                for name in reversed(throttleable):
+                    if self.divisor[name] > 1:
+                        self.divisor[name] //= 2
+                        self.cooldown = self.COOLDOWN
+                        break
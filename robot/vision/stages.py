@@ -0,0 +1,332 @@
+from __future__ import division, print_function
+
+import ctypes
+import multiprocessing as mp
+import sys
+import threading
+import time
+import traceback
+from collections import deque, namedtuple
+
+try:
+    from queue import Empty, Full
+except ImportError:
+    from Queue import Empty, Full
+
+import numpy as np
+
+from .arena import BufferArena
+from .decode import FrameDecoder
+from .frame_graph import FrameGraph, plan_rows
+from .pipeline import blur_hsv, padded_band
+
+# A frame on its way through the stages, and everything each stage needs to
+# know about it. The scheduled detectors are given by name, the rows are the
+# full size band they read, and started is when the frame came in.
+Job = namedtuple('Job', 'sequence stamp state names scale top bottom started')
+
+# The stages, in order.
+STAGES = ('decode', 'convert', 'detect')
+
+# The most rows and columns a decoded frame can have.
+MAX_SHAPE = (480, 640, 3)
+
+
+class SlotPool(object):
+    """A fixed number of image buffers in memory shared with child processes.
+
+    Stages hand frames to each other by slot number, so the images themselves
+    are never pickled or copied between processes. Acquiring a slot blocks
+    until one is free, which bounds how many frames can be in flight.
+    """
+
+    def __init__(self, slots, shape=MAX_SHAPE):
+        """Create a SlotPool.
+
+        :param slots: How many buffers to create.
+        :type slots: int
+        :param shape: The largest image a buffer holds, defaults to MAX_SHAPE
+        :type shape: tuple, optional
+        """
+        size = int(np.prod(shape))
+        self.buffers = [mp.RawArray(ctypes.c_uint8, size)
+                        for _ in range(slots)]
+        self.free = mp.Queue()
+        for i in range(slots):
+            self.free.put(i)
+
+    def acquire(self):
+        """Wait for a free slot, and take it."""
+        return self.free.get()
+
+    def release(self, slot):
+        """Give a slot back."""
+        self.free.put(slot)
+
+    def view(self, slot, shape):
+        """Get a view of a slot's buffer as an image of the given shape."""
+        count = int(np.prod(shape))
+        return np.frombuffer(self.buffers[slot], dtype=np.uint8,
+                             count=count).reshape(shape)
+
+
+def decode_stage(inbox, outbox, bgr_pool):
+    """Decode compressed frames into the BGR slots, until given None."""
+    decoder = FrameDecoder()
+    while True:
+        item = inbox.get()
+        if item is None:
+            outbox.put(None)
+            return
+        job, data, top = item
+
+        start = time.time()
+        bgr_frame, bgr_top = decoder.decode(data, scale=job.scale, top=top)
+        if bgr_frame is None:
+            outbox.put((job, None, None, 0, {'decode': time.time() - start}))
+            continue
+        seconds = time.time() - start
+
+        slot = bgr_pool.acquire()
+        start = time.time()
+        bgr_pool.view(slot, bgr_frame.shape)[...] = bgr_frame
+        seconds += time.time() - start
+        outbox.put((job, slot, bgr_frame.shape, bgr_top,
+                    {'decode': seconds}))
+
+
+def convert_stage(inbox, outbox, bgr_pool, hsv_pool, kernel):
+    """Convert and blur the BGR slots into the HSV slots, until given None."""
+    arena = BufferArena()
+    padding = kernel[1] // 2
+    while True:
+        item = inbox.get()
+        if item is None:
+            outbox.put(None)
+            return
+        job, slot, shape, bgr_top, seconds = item
+        if slot is None:
+            outbox.put((job, None, None, None, None, bgr_top, seconds))
+            continue
+
+        hsv_slot = hsv_pool.acquire()
+        start = time.time()
+        bgr_frame = bgr_pool.view(slot, shape)
+        band, inner, offset = padded_band(bgr_frame, bgr_top, job.scale,
+                                          job.top, job.bottom, padding)
+        blur_hsv(band, kernel, arena, dst=hsv_pool.view(hsv_slot, band.shape))
+        bgr_pool.release(slot)
+        seconds['convert'] = time.time() - start
+        outbox.put((job, hsv_slot, band.shape, (inner.start, inner.stop),
+                    offset, bgr_top + shape[0] * job.scale, seconds))
+
+
+class StageTimes(object):
+    """The recent per-frame cost of each stage, and the pipeline as a whole."""
+
+    # How many frames to keep the times of.
+    HISTORY = 1000
+
+    def __init__(self):
+        """Create an empty StageTimes."""
+        self.seconds = dict((stage, deque(maxlen=self.HISTORY))
+                            for stage in STAGES)
+        self.latency = deque(maxlen=self.HISTORY)
+        self.done = deque(maxlen=self.HISTORY)
+
+    def record(self, seconds, latency):
+        """Record the stage times and total latency of a frame."""
+        for stage, value in seconds.items():
+            self.seconds[stage].append(value)
+        self.latency.append(latency)
+        self.done.append(time.time())
+
+    def report(self):
+        """Format the recent stage times as a table.
+
+        Throughput should approach the rate of the slowest stage, rather than
+        the rate of all of them back to back.
+        """
+        lines = ['{:<10} {:>7} {:>9} {:>9} {:>9}'.format(
+            'stage', 'frames', 'mean ms', 'p95 ms', 'max fps')]
+        total = 0.0
+        for stage in STAGES:
+            seconds = np.asarray(self.seconds[stage])
+            if not len(seconds):
+                continue
+            mean = seconds.mean()
+            total += mean
+            lines.append('{:<10} {:>7} {:>9.2f} {:>9.2f} {:>9.1f}'.format(
+                stage, len(seconds), mean * 1000,
+                np.percentile(seconds, 95) * 1000,
+                1 / mean if mean else 0.0))
+        if self.latency:
+            latency = np.asarray(self.latency)
+            lines.append('{:<10} {:>7} {:>9.2f} {:>9.2f} {:>9.1f}'.format(
+                'latency', len(latency), latency.mean() * 1000,
+                np.percentile(latency, 95) * 1000,
+                1 / total if total else 0.0))
+        if len(self.done) > 1:
+            elapsed = self.done[-1] - self.done[0]
+            lines.append('throughput {:.1f} fps'.format(
+                (len(self.done) - 1) / elapsed if elapsed else 0.0))
+        return '\n'.join(lines)
+
+
+class StagedPipeline(object):
+    """Run a VisionPipeline's decode, convert, and detect stages concurrently.
+
+    Frame N+1 is decoded (in one process) while frame N is converted and
+    blurred (in another) and frame N-1 is run through the detectors (in a
+    thread of this process). The stages hand frames to each other through
+    shared memory slots, and at most depth frames are in flight per stage.
+    Frames that arrive while the pipeline is full are dropped.
+
+    NOTE: The detectors see HSV frames, even if the pipeline was built with a
+    color table, and there's no verbose camera view.
+    """
+
+    def __init__(self, pipeline, depth=2):
+        """Create a StagedPipeline.
+
+        :param pipeline: The pipeline whose stages to run.
+        :type pipeline: robot.vision.pipeline.VisionPipeline
+        :param depth: How many frames each stage can have waiting, defaults
+        to 2
+        :type depth: int, optional
+        """
+        self.pipeline = pipeline
+        self.depth = depth
+        self.times = StageTimes()
+        self.sequence = 0
+        self.dropped = 0
+        self.arena = BufferArena()
+        # The operation graph of the frame being detected, reused every frame.
+        self.frame = None
+        self.inbox = None
+        self.converted = None
+        self.hsv_pool = None
+        self.workers = []
+        self.detector = None
+
+    def start(self):
+        """Start the stage processes and the detect thread.
+
+        NOTE: Call this in the process that will be processing frames.
+        """
+        self.pipeline.start()
+        bgr_pool = SlotPool(self.depth + 1)
+        self.hsv_pool = SlotPool(self.depth + 1)
+        self.inbox = mp.Queue(self.depth)
+        decoded = mp.Queue()
+        self.converted = mp.Queue()
+        self.workers = [
+            mp.Process(target=decode_stage,
+                       args=(self.inbox, decoded, bgr_pool)),
+            mp.Process(target=convert_stage,
+                       args=(decoded, self.converted, bgr_pool, self.hsv_pool,
+                             self.pipeline.BLUR_KERNEL)),
+        ]
+        for worker in self.workers:
+            worker.daemon = True
+            worker.start()
+        self.detector = threading.Thread(target=self.detect_stage)
+        self.detector.daemon = True
+        self.detector.start()
+
+    def stop(self):
+        """Stop every stage, and print how they did."""
+        if self.inbox is not None:
+            try:
+                self.inbox.put(None, timeout=1)
+            except Full:
+                pass
+            for worker in self.workers:
+                worker.join(1)
+                if worker.is_alive():
+                    worker.terminate()
+            self.inbox = None
+            print(self.times.report())
+            print('Dropped {} frames.'.format(self.dropped))
+        self.pipeline.stop()
+
+    def process(self, data, state, stamp=None):
+        """Send a compressed video frame down the pipeline.
+
+        Decide which detectors will process the frame, and how much of it to
+        decode, now, then leave the rest to the stages.
+
+        :param data: The compressed image payload.
+        :type data: The data of a sensor_msgs.msg.CompressedImage message.
+        :param state: The robot's current state.
+        :type state: robot.common.State
+        :param stamp: When the frame was taken, in seconds, defaults to now.
+        :type stamp: float, optional
+        """
+        start = time.time()
+        if stamp is None:
+            stamp = start
+        if self.inbox.full():
+            # Drop the frame before it's scheduled, so the scheduler doesn't
+            # count it as seen by anything. Only we put frames in the inbox,
+            # so it can't fill up again before we do.
+            self.dropped += 1
+            return
+        pipeline = self.pipeline
+        detectors = pipeline.scheduler.due(state, stamp)
+        if not detectors:
+            # Nobody cares about this frame, so don't bother decoding it.
+            return
+
+        cameras = [camera for _, camera in detectors]
+        scale = min(camera.DECODE_SCALE for camera in cameras)
+        top, bottom = plan_rows(cameras, pipeline.frame_height)
+        padding = pipeline.BLUR_KERNEL[1] // 2 * scale
+        self.sequence += 1
+        job = Job(self.sequence, stamp, state,
+                  tuple(name for name, _ in detectors), scale, top, bottom,
+                  start)
+        try:
+            self.inbox.put_nowait((job, data, max(top - padding, 0)))
+        except Full:
+            self.dropped += 1
+
+    def detect_stage(self):
+        """Run the detectors on the converted frames, until given None."""
+        pipeline = self.pipeline
+        while True:
+            try:
+                item = self.converted.get(timeout=0.5)
+            except Empty:
+                continue
+            if item is None:
+                return
+            job, slot, shape, inner, offset, height, seconds = item
+            if slot is None:
+                print('Failed to decode frame.')
+                continue
+            pipeline.frame_height = height
+
+            # A detector that raises on one frame mustn't stop the thread,
+            # or keep the frame's slot, or every later frame would be dropped.
+            start = time.time()
+            try:
+                hsv = self.hsv_pool.view(slot, shape)[inner[0]:inner[1]]
+                if self.frame is None:
+                    self.frame = FrameGraph(hsv, arena=self.arena)
+                frame = self.frame
+                frame.reset(hsv, offset=offset, height=height,
+                            scale=job.scale, stamp=job.stamp,
+                            trace=job.sequence)
+                detectors = [(name, pipeline.scheduler.detectors[name])
+                             for name in job.names]
+                pipeline.process_frame(frame, detectors)
+                seconds['detect'] = time.time() - start
+                self.times.record(seconds, time.time() - job.started)
+            except Exception:
+                print('Detecting frame {} raised:'.format(job.sequence),
+                      file=sys.stderr)
+                traceback.print_exc()
+            finally:
+                self.hsv_pool.release(slot)
+                pipeline.scheduler.end_frame(job.state)
@@ -0,0 +1,122 @@
+from __future__ import division, print_function
+
+import math
+
+
+class LaneTracker(object):
+    """A constant velocity Kalman filter tracking the lane's column.
+
+    The tracker predicts where the lane will be in the next frame, so we only
+    need to search a window around the prediction. The window widens every
+    frame the lane is lost, and the tracker starts over with the full width
+    once the lane has been lost for too long (or we haven't looked for a
+    while).
+
+    The state is the lane's column and its velocity, in full size pixels and
+    pixels per frame.
+    """
+
+    # How much we expect the lane's velocity to wander each frame.
+    PROCESS_NOISE = 4.0
+    # How noisy the measured lane column is.
+    MEASUREMENT_NOISE = 25.0
+    # How many standard deviations of the prediction the window covers.
+    WINDOW_SIGMAS = 3.0
+    # The narrowest the window (half width) gets, in full size pixels.
+    MIN_WINDOW = 40
+    # How many frames the lane can be lost before we start over.
+    MAX_MISSES = 4
+    # Start over if we haven't been updated in this many seconds.
+    MAX_GAP = 0.5
+
+    def __init__(self, width):
+        """Create a LaneTracker for frames of the given width.
+
+        :param width: The full size width of each frame.
+        :type width: int
+        """
+        self.width = width
+        self.reset()
+
+    def reset(self):
+        """Forget everything we know about the lane."""
+        self.tracking = False
+        self.x = self.width / 2
+        self.v = 0.0
+        # The state covariance [[p00, p01], [p01, p11]].
+        self.p00 = self.p01 = self.p11 = 0.0
+        self.misses = 0
+        self.stamp = None
+
+    def predict(self, stamp):
+        """Predict where the lane is in this frame.
+
+        :param stamp: When this frame was taken, in seconds.
+        :type stamp: float
+        """
+        if self.stamp is not None and stamp - self.stamp > self.MAX_GAP:
+            self.reset()
+        self.stamp = stamp
+        if not self.tracking:
+            return
+
+        q = self.PROCESS_NOISE
+        self.x += self.v
+        self.p00 += 2 * self.p01 + self.p11 + q / 4
+        self.p01 += self.p11 + q / 2
+        self.p11 += q
+
+    def window(self):
+        """Get the columns to search for the lane in this frame.
+
+        :returns: A (left, right) tuple of full size columns.
+        """
+        if not self.tracking:
+            return 0, self.width
+        sigma = math.sqrt(self.p00 + self.MEASUREMENT_NOISE)
+        half = max(self.MIN_WINDOW, self.WINDOW_SIGMAS * sigma)
+        # Widen the window every frame we can't find the lane.
+        half *= 2 ** self.misses
+        left = int(max(0, self.x - half))
+        right = int(min(self.width, self.x + half))
+        return left, right
+
+    def update(self, column):
+        """Correct the prediction with this frame's lane measurement.
+
+        :param column: The measured lane column, or None if we lost the lane.
+        :type column: float
+        """
+        if column is None:
+            self.misses += 1
+            if self.misses > self.MAX_MISSES:
+                self.reset()
+            return
+
+        self.misses = 0
+        if not self.tracking:
+            self.tracking = True
+            self.x = column
+            self.v = 0.0
+            self.p00 = self.MEASUREMENT_NOISE
+            self.p01 = 0.0
+            self.p11 = self.MEASUREMENT_NOISE
+            return
+
+        s = self.p00 + self.MEASUREMENT_NOISE
+        k0 = self.p00 / s
+        k1 = self.p01 / s
+        innovation = column - self.x
+        self.x += k0 * innovation
+        self.v += k1 * innovation
+        self.p11 -= k1 * self.p01
+        self.p01 -= k0 * self.p01
+        self.p00 -= k0 * self.p00
+
+    @property
+    def confidence(self):
+        """How much we trust the lane estimate, from 0.0 to 1.0."""
+        if not self.tracking:
+            return 0.0
+        sigma = math.sqrt(self.p00)
+        return max(0.0, 1.0 - sigma / self.MIN_WINDOW) / (1 + self.misses)
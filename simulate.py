@@ -0,0 +1,105 @@
+#!/usr/bin/env python2
+from __future__ import division, print_function
+
+import argparse
+import itertools
+import math
+
+from robot.course import MAP_PATH, START, Pose
+from robot.nodes import DriveLine
+from robot.simulator import Episode, sweep
+
+
+def parse_args():
+    """Parse the simulator's commandline arguments."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--seconds',
+        type=float,
+        default=30.0,
+        help='How long to run each episode for, in seconds of robot time. '
+             'Default is 30')
+    parser.add_argument(
+        '--kp',
+        type=float,
+        nargs='+',
+        default=[DriveLine.Kp],
+        help='The DriveLine Kp gains to sweep. Default is the stock one')
+    parser.add_argument(
+        '--ki',
+        type=float,
+        nargs='+',
+        default=[DriveLine.Ki],
+        help='The DriveLine Ki gains to sweep. Default is the stock one')
+    parser.add_argument(
+        '--kd',
+        type=float,
+        nargs='+',
+        default=[DriveLine.Kd],
+        help='The DriveLine Kd gains to sweep. Default is the stock one')
+    parser.add_argument(
+        '--start',
+        type=float,
+        nargs=3,
+        metavar=('X', 'Y', 'HEADING'),
+        default=None,
+        help='Where the robot starts, in cm from the top left of the map, '
+             'and its heading in degrees clockwise from the x axis. Default '
+             'is the bottom of the lane, heading up it')
+    parser.add_argument(
+        '--map',
+        default=MAP_PATH,
+        help='The course map. Default is experiments/map.png')
+    parser.add_argument(
+        '--processes',
+        type=int,
+        default=None,
+        help='How many episodes to run at once. Default is one per core')
+    parser.add_argument(
+        '--raw',
+        action='store_true',
+        default=False,
+        help="Don't JPEG compress the frames, so the pipeline doesn't have "
+             'to decode them.')
+    parser.add_argument(
+        '--event-driven',
+        action='store_true',
+        default=False,
+        help='Step the brain on sensor data, instead of polling at 100 Hz.')
+    parser.add_argument(
+        '--coalesce',
+        action='store_true',
+        default=False,
+        help='Only send wheel commands that change something, and rate limit '
+             'them.')
+    return parser.parse_args()
+
+
+def main(args):
+    """Drive the Brain around the course map, once per set of gains."""
+    start = START
+    if args.start is not None:
+        x, y, heading = args.start
+        start = Pose(x, y, math.radians(heading))
+    options = {'floor': args.map, 'compress': not args.raw,
+               'event_driven': args.event_driven, 'coalesce': args.coalesce}
+    episodes = [Episode(start, args.seconds, gains, options)
+                for gains in itertools.product(args.kp, args.ki, args.kd)]
+    trips = sweep(episodes, args.processes)
+
+    print('{:>6} {:>6} {:>6} {:>7} {:>8} {:>8} {:>9} {:>7}'.format(
+        'Kp', 'Ki', 'Kd', 'seconds', 'cm', 'on lane', 'mean |e|', 'speedup'))
+    for episode, trip in zip(episodes, trips):
+        error = (sum(abs(e) for e in trip.errors) / len(trip.errors)
+                 if trip.errors else float('nan'))
+        print('{:6.2f} {:6.2f} {:6.2f} {:7.2f} {:8.1f} {:7.1f}% {:9.3f} '
+              '{:6.1f}x{}'.format(
+                  episode.gains[0], episode.gains[1], episode.gains[2],
+                  trip.run.seconds, trip.distance, 100 * trip.on_lane,
+                  error, trip.run.seconds / trip.run.elapsed
+                  if trip.run.elapsed else 0,
+                  ' (left the map)' if trip.left_map else ''))
+
+
+if __name__ == "__main__":
+    main(parse_args())
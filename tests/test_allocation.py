@@ -0,0 +1,62 @@
+from __future__ import division, print_function
+
+import unittest
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from robot.vision.benchmark import NullPublisher, peak_allocated
+from robot.vision.pipeline import VisionPipeline
+from robot.vision.scenes import scenes
+
+
+class SummaryPublisher(NullPublisher):
+    """Hang on to the last summary, so it's not freed mid-measurement."""
+
+    def publish(self, msg):
+        self.count += 1
+        self.last = msg
+
+
+@unittest.skipIf(tracemalloc is None, 'needs tracemalloc')
+class FrameAllocationTest(unittest.TestCase):
+    """Processing a decoded frame doesn't allocate any frame sized arrays.
+
+    A handful of Python objects (messages, blobs, the summary) are still
+    allocated every frame, which is a few KiB. The smallest array a frame
+    needs, the lane's 10 row mask, is more than BUDGET.
+    """
+
+    BUDGET = 6 * 1024
+
+    def peaks(self, **options):
+        pipeline = VisionPipeline({'VISION_SUMMARY': SummaryPublisher()},
+                                  governor=False, **options)
+        pipeline.start()
+        try:
+            frames = [(scene.state, scene.image) for scene in scenes()]
+            # Everything is allocated the first time each state is seen.
+            for i, (state, image) in enumerate(frames):
+                pipeline.process_decoded(image, state, i / 30)
+            return [(state.name, peak_allocated(pipeline.process_decoded,
+                                                image, state, 1 + i / 30))
+                    for i, (state, image) in enumerate(frames * 2)]
+        finally:
+            pipeline.stop()
+
+    def assertWithinBudget(self, peaks):
+        for state, peak in peaks:
+            self.assertLess(peak, self.BUDGET, '{} allocated {} bytes'.format(
+                state, peak))
+
+    def test_hsv(self):
+        self.assertWithinBudget(self.peaks())
+
+    def test_color_table(self):
+        self.assertWithinBudget(self.peaks(color_table=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+from __future__ import division, print_function
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from robot.simulator import Simulator
+from robot.vision.blob import contour_blob, largest_blob
+from robot.vision.blob_check import agrees, compare, decoded, report
+from robot.vision.scenes import (BLUE, GREEN, PURPLE, add_noise, blank, lane,
+                                 scenes)
+
+
+def check(test, source, images):
+    agreements = compare(images)
+    for agreement in agreements:
+        test.assertTrue(agrees(agreement), report(source, agreements))
+    return agreements
+
+
+class LargestBlobTest(unittest.TestCase):
+    """largest_blob finds the blob the contours did, with its area counted
+    from pixels."""
+
+    def test_rectangle(self):
+        mask = np.zeros((100, 100), dtype=np.uint8)
+        mask[20:40, 10:50] = 255
+        blob = largest_blob(mask)
+        self.assertEqual(blob, (40 * 20, 29.5, 29.5, 10, 20, 40, 20))
+        # The contour runs through the centers of the edge pixels.
+        self.assertEqual(contour_blob(mask), (39 * 19, 29.5, 29.5, 10, 20,
+                                              40, 20))
+
+    def test_empty(self):
+        mask = np.zeros((100, 100), dtype=np.uint8)
+        self.assertIsNone(largest_blob(mask))
+        self.assertIsNone(contour_blob(mask))
+
+
+class ContourAgreementTest(unittest.TestCase):
+    """The detectors' blobs agree with the contours they replaced, within
+    robot.vision.blob_check's tolerances."""
+
+    def test_scenes(self):
+        check(self, 'scenes', [scene.image for scene in scenes()])
+
+    def test_thresholds(self):
+        # Goals and nodes from well under to well over their thresholds.
+        images = []
+        for seed, side in enumerate(range(80, 160, 3)):
+            image = blank(GREEN)
+            cv2.rectangle(image, (200, 150), (200 + side, 150 + side), BLUE,
+                          -1)
+            images.append(add_noise(image, 4.0, seed))
+        for seed, height in enumerate(range(30, 80, 2)):
+            image = lane()
+            cv2.ellipse(image, (320, 300), (height * 5 // 2, height), 0, 0,
+                        360, PURPLE, -1)
+            images.append(add_noise(image, 4.0, seed))
+        for seed, width in enumerate(range(100, 200, 4)):
+            image = lane()
+            cv2.ellipse(image, (320, 470), (width, 60), 0, 0, 360, PURPLE,
+                        -1)
+            images.append(add_noise(image, 4.0, seed))
+        agreements = check(self, 'thresholds', images)
+        self.assertTrue(all(agreement.frames for agreement in agreements))
+
+    def test_recording(self):
+        # Record the webcam driving the course map in closed loop.
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'course')
+        simulator = Simulator(recording=path)
+        try:
+            simulator.run(10.0)
+        finally:
+            simulator.stop()
+        check(self, path, decoded(path))
@@ -0,0 +1,88 @@
+from __future__ import division, print_function
+
+import unittest
+
+from robot.coalesce import CoalescingPublisher
+from robot.messages import Float64MultiArray
+from robot.nodes.scheduler import Scheduler, VirtualClock
+from robot.tracing import traced, traced_data
+
+
+class Outbox(object):
+    """Keep everything published, and when, on a scheduler's clock."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.sent = []
+
+    def publish(self, msg):
+        self.sent.append((self.clock.time(), list(msg.data)))
+
+    def unregister(self):
+        pass
+
+
+class CoalescingPublisherTest(unittest.TestCase):
+    """Unchanged and bursty messages are left out."""
+
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.scheduler = Scheduler(self.clock)
+        self.outbox = Outbox(self.clock)
+
+    def publisher(self, **options):
+        return CoalescingPublisher(self.outbox, Float64MultiArray,
+                                   scheduler=self.scheduler, **options)
+
+    def at(self, when, publisher, data, force=False):
+        """Publish some data at the given time."""
+        self.scheduler.run_until(when)
+        publisher.publish_data(data, force)
+
+    def test_keepalive(self):
+        publisher = self.publisher(keepalive=1.0)
+        for i in range(30):
+            self.at(i / 10, publisher, [1.0, 2.0])
+        self.at(3.0, publisher, [1.0, 3.0])
+        self.assertEqual(self.outbox.sent, [
+            (0.0, [1.0, 2.0]), (1.0, [1.0, 2.0]), (2.0, [1.0, 2.0]),
+            (3.0, [1.0, 3.0])])
+        self.assertEqual(publisher.suppressed, 27)
+
+    def test_coalesces_bursts(self):
+        publisher = self.publisher(max_rate=10)
+        for i in range(5):
+            self.at(i / 100, publisher, [float(i)])
+        self.scheduler.run_until(1.0)
+        # The first is sent at once, and only the newest of the rest once
+        # the rate allows.
+        self.assertEqual(self.outbox.sent, [(0.0, [0.0]), (0.1, [4.0])])
+        self.assertEqual(publisher.coalesced, 3)
+        self.assertEqual(publisher.saved, 3)
+
+    def test_ignores_trace(self):
+        publisher = self.publisher(traced=True)
+        for i in range(10):
+            self.at(i / 30, publisher, traced_data([0.5], i / 30, i + 1))
+        self.assertEqual(len(self.outbox.sent), 1)
+        self.assertEqual(publisher.key(traced([0.5], 1.0, 1).data),
+                         publisher.key(traced([0.5], 2.0, 2).data))
+        self.assertNotEqual(publisher.key(traced([0.5], 1.0, 1).data),
+                            publisher.key(traced([0.6], 1.0, 1).data))
+
+    def test_force(self):
+        publisher = self.publisher(keepalive=None, max_rate=10)
+        for i in range(5):
+            self.at(i / 100, publisher, [1.0], force=True)
+        self.assertEqual(len(self.outbox.sent), 5)
+        # Unchanged data is never sent again without force.
+        self.at(10.0, publisher, [1.0])
+        self.assertEqual(len(self.outbox.sent), 5)
+
+    def test_force_replaces_pending(self):
+        publisher = self.publisher(max_rate=10)
+        self.at(0.0, publisher, [1.0])
+        self.at(0.01, publisher, [2.0])
+        self.at(0.02, publisher, [3.0], force=True)
+        self.scheduler.run_until(1.0)
+        self.assertEqual(self.outbox.sent, [(0.0, [1.0]), (0.02, [3.0])])
@@ -0,0 +1,102 @@
+from __future__ import division, print_function
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from robot.common import State
+from robot.simulator import Simulator
+from robot.summary import decode
+from robot.vision.blob_check import decoded
+from robot.vision.camera_base import Camera
+from robot.vision.camera_lane import LaneCamera
+from robot.vision.frame_graph import Mask
+from robot.vision.pipeline import VisionPipeline
+from robot.vision.recording import Recording
+from robot.vision.scenes import scenes
+from robot.vision.schedule import SCHEDULE
+
+
+class SummaryInbox(object):
+    """Keep the last summary published."""
+
+    def publish(self, msg):
+        self.summary = decode(msg)
+
+
+def pipeline(color_table):
+    inbox = SummaryInbox()
+    return inbox, VisionPipeline({'VISION_SUMMARY': inbox},
+                                 color_table=color_table, governor=False)
+
+
+class ColorTableTest(unittest.TestCase):
+    """The color table path publishes what the HSV path does."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Every scene in every state, and a drive around the course map.
+        cls.frames = [(state, scene.image) for scene in scenes()
+                      for state in SCHEDULE]
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'course')
+            simulator = Simulator(recording=path)
+            try:
+                simulator.run(5.0)
+            finally:
+                simulator.stop()
+            states = [State(Recording(path)[i][2])
+                      for i in range(len(Recording(path)))]
+            cls.frames.extend(zip(states, decoded(path)))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_summaries(self):
+        hsv_inbox, hsv = pipeline(False)
+        table_inbox, table = pipeline(True)
+        for i, (state, image) in enumerate(self.frames):
+            hsv.process_decoded(image, state, i / 30)
+            table.process_decoded(image, state, i / 30)
+            # The node confidence follows the node's area, so it moves with
+            # the node's edges.
+            self.assertEqual(table_inbox.summary._replace(node_confidence=0),
+                             hsv_inbox.summary._replace(node_confidence=0))
+            self.assertAlmostEqual(table_inbox.summary.node_confidence,
+                                   hsv_inbox.summary.node_confidence,
+                                   delta=0.05)
+
+    def test_masks(self):
+        _, hsv = pipeline(False)
+        _, table = pipeline(True)
+        for _, image in self.frames:
+            for hsv_camera, table_camera in zip(hsv.cameras, table.cameras):
+                graph = hsv.convert_frame(image, 0, 1, [hsv_camera], 0.0)
+                masks = [graph[mask].copy() for mask in hsv_camera.masks]
+                graph = table.convert_frame(image, 0, 1, [table_camera], 0.0)
+                for mask, hsv_mask in zip(table_camera.masks, masks):
+                    differ = np.count_nonzero(graph[mask] != hsv_mask)
+                    self.assertLess(differ, hsv_mask.size / 100)
+
+    def test_set_mask(self):
+        _, table = pipeline(True)
+        stock = LaneCamera.WHITE_MASK
+        self.addCleanup(LaneCamera.set_mask, 'WHITE_MASK', stock)
+        version = Camera.mask_version
+        retuned = Mask((0, 0, 180), (255, 60, 255),
+                       LaneCamera.REGION_OF_INTEREST)
+        LaneCamera.set_mask('WHITE_MASK', retuned)
+        self.assertEqual(Camera.mask_version, version + 1)
+        self.assertIn(retuned, table.lane_camera.masks)
+        self.assertNotIn(stock, table.lane_camera.masks)
+
+        # The table is rebuilt on the next frame.
+        state, image = self.frames[0]
+        table.process_decoded(image, state, 0.0)
+        self.assertIn((retuned.low, retuned.high), table.color_table.bits)
+
+        with self.assertRaises(ValueError):
+            LaneCamera.set_mask('THRESH_VALUE', retuned)
@@ -0,0 +1,140 @@
+from __future__ import division, print_function
+
+import math
+import random
+import unittest
+
+from robot.graph import COURSE, CourseGraph, Turn, classify, wrap
+from robot.nodes import Brain
+
+# The routes the Brain's hand written tables drove before the course graph:
+# the path to each target node, and the turn (and how long the Brain
+# rotated for, in seconds) at the start of each leg.
+BASELINE_PATHS = {
+    0: (0,),
+    1: (0, 1),
+    2: (0, 1, 2),
+    3: (0, 1, 3),
+    4: (0, 1, 4),
+    5: (0, 1, 4, 5),
+}
+BASELINE_TURNS = {
+    (0, 1): (Turn.FORWARD, 0.0),
+    (1, 2): (Turn.FORWARD, 0.0),
+    (1, 3): (Turn.RIGHT, 1.0),
+    (1, 4): (Turn.LEFT, 0.6),
+    (4, 5): (Turn.LEFT, 1.5),
+}
+
+
+def generated(count, seed=0):
+    """A random course of nodes joined to their nearest neighbors, with
+    edges weighted up to twice their length, and some weighted exactly."""
+    rng = random.Random(seed)
+    nodes = dict((i, (rng.uniform(0, 1000), rng.uniform(0, 1000)))
+                 for i in range(count))
+    edges = []
+    for a, (ax, ay) in nodes.items():
+        nearest = sorted(nodes, key=lambda b: math.hypot(nodes[b][0] - ax,
+                                                         nodes[b][1] - ay))
+        for b in nearest[1:4]:
+            length = math.hypot(nodes[b][0] - ax, nodes[b][1] - ay)
+            if rng.random() < 0.5:
+                edges.append((a, b))
+            else:
+                edges.append((a, b, length * rng.uniform(1.0, 2.0)))
+    return CourseGraph(nodes, edges)
+
+
+def cost(graph, path):
+    """The total weight of a path's edges."""
+    return sum(graph.neighbors[a][b] for a, b in zip(path, path[1:]))
+
+
+class CourseTest(unittest.TestCase):
+    """COURSE drives the routes the Brain's tables did."""
+
+    def test_routes(self):
+        for target, path in BASELINE_PATHS.items():
+            legs = COURSE.route(target)
+            self.assertEqual(tuple((leg.start, leg.end) for leg in legs),
+                             tuple(zip(path, path[1:])), target)
+
+    def test_turns(self):
+        for target in BASELINE_PATHS:
+            for leg in COURSE.route(target):
+                turn, seconds = BASELINE_TURNS[(leg.start, leg.end)]
+                self.assertEqual(leg.turn, turn, leg)
+                if turn != Turn.FORWARD:
+                    self.assertAlmostEqual(Brain.TURN_TIME * leg.angle,
+                                           seconds, places=2, msg=leg)
+
+    def test_unknown_node(self):
+        with self.assertRaises(ValueError):
+            COURSE.route(6)
+
+
+class ShortestPathTest(unittest.TestCase):
+    """A* and Dijkstra's algorithm find equally short paths."""
+
+    def setUp(self):
+        self.graph = generated(300)
+
+    def test_astar_matches_dijkstra(self):
+        rng = random.Random(1)
+        sources = rng.sample(sorted(self.graph.nodes), 10)
+        for source in sources:
+            costs, _ = self.graph.tree(source)
+            for target in rng.sample(sorted(costs), min(30, len(costs))):
+                path = self.graph.astar(source, target)
+                self.assertEqual((path[0], path[-1]), (source, target))
+                self.assertAlmostEqual(cost(self.graph, path), costs[target],
+                                       places=6)
+
+    def test_path_from_tree(self):
+        # Once a node's tree is computed, paths from it come from the tree.
+        lazy = self.graph.path(150, 0)
+        graph = generated(300)
+        graph.tree(0)
+        self.assertAlmostEqual(cost(graph, graph.path(150, 0)),
+                               cost(self.graph, lazy), places=6)
+
+    def test_unreachable(self):
+        graph = CourseGraph({0: (0, 0), 1: (1, 0), 2: (5, 5)}, [(0, 1)])
+        self.assertIsNone(graph.astar(0, 2))
+        with self.assertRaises(ValueError):
+            graph.path(2, 0)
+        graph.tree(0)
+        with self.assertRaises(ValueError):
+            graph.path(2, 0)
+
+    def test_negative_weight(self):
+        with self.assertRaises(ValueError):
+            CourseGraph({0: (0, 0), 1: (1, 0)}, [(0, 1, -1.0)])
+
+
+class TurnTest(unittest.TestCase):
+    """Turns are classified from the angle between legs."""
+
+    def test_wrap(self):
+        self.assertAlmostEqual(wrap(3 * math.pi / 2), -math.pi / 2)
+        self.assertAlmostEqual(wrap(-3 * math.pi / 2), math.pi / 2)
+        self.assertAlmostEqual(wrap(-math.pi), math.pi)
+
+    def test_classify(self):
+        self.assertEqual(classify(math.radians(10)),
+                         (Turn.FORWARD, math.radians(10)))
+        self.assertEqual(classify(math.radians(90))[0], Turn.LEFT)
+        self.assertEqual(classify(math.radians(-90))[0], Turn.RIGHT)
+        # The long way round is the short way the other way.
+        turn, angle = classify(math.radians(270))
+        self.assertEqual(turn, Turn.RIGHT)
+        self.assertAlmostEqual(angle, math.pi / 2)
+
+    def test_turn(self):
+        graph = CourseGraph({0: (0, 0), 1: (0, 10), 2: (-10, 10),
+                             3: (10, 10), 4: (0, 20)},
+                            [(0, 1), (1, 2), (1, 3), (1, 4)])
+        self.assertEqual(graph.turn(0, 1, 2)[0], Turn.LEFT)
+        self.assertEqual(graph.turn(0, 1, 3)[0], Turn.RIGHT)
+        self.assertEqual(graph.turn(0, 1, 4)[0], Turn.FORWARD)
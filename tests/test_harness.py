@@ -0,0 +1,57 @@
+from __future__ import division, print_function
+
+import unittest
+
+from robot.common import State
+from robot.graph import Turn
+from robot.nodes.harness import BrainHarness
+
+
+def turns(run):
+    """The turns the Brain made at the graph's nodes, and how long it
+    rotated for, in seconds."""
+    states = [event for event in run.events if event.kind == 'state']
+    made = []
+    for i, event in enumerate(states):
+        if event.value != State.ROTATE_LEFT:
+            continue
+        following = states[i + 1]
+        if following.value == State.FORWARD:
+            made.append((Turn.LEFT, following.time - event.time))
+            continue
+        forward = states[i + 2]
+        if forward.time - following.time > 0.1:
+            made.append((Turn.RIGHT, forward.time - following.time))
+        else:
+            made.append((Turn.FORWARD, 0.0))
+    return made
+
+
+class BrainHarnessTest(unittest.TestCase):
+    """The Brain drives the whole scripted course to its target."""
+
+    def check(self, event_driven):
+        harness = BrainHarness(target=5, event_driven=event_driven)
+        try:
+            run = harness.run()
+        finally:
+            harness.stop()
+        self.assertEqual(run.state, State.END)
+        states = [event.value for event in run.events
+                  if event.kind == 'state']
+        self.assertEqual(states[-1], State.END)
+        # 0 -> 1 straight on, 1 -> 4 left, then 4 -> 5 left.
+        made = turns(run)
+        self.assertEqual([turn for turn, _ in made],
+                         [Turn.FORWARD, Turn.LEFT, Turn.LEFT])
+        for (_, seconds), expected in zip(made, (0.0, 0.6, 1.5)):
+            self.assertAlmostEqual(seconds, expected, delta=0.1)
+        return run
+
+    def test_polling(self):
+        first = self.check(False)
+        # Runs on the virtual clock come out the same every time.
+        self.assertEqual(self.check(False).events, first.events)
+
+    def test_event_driven(self):
+        self.check(True)
@@ -0,0 +1,67 @@
+from __future__ import division, print_function
+
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The ROS modules, and the ROS only plotting, that the tools mustn't need.
+ROS_MODULES = ('rospy', 'std_msgs', 'std_msgs.msg', 'sensor_msgs',
+               'sensor_msgs.msg', 'matplotlib', 'matplotlib.pyplot')
+
+
+def run_without_ros(code):
+    """Run some code in a fresh interpreter that can't import ROS.
+
+    :returns: The interpreter's exit status and output.
+    """
+    # A None in sys.modules makes importing that module raise ImportError,
+    # even where ROS is installed.
+    code = 'import sys\nsys.modules.update(dict.fromkeys({!r}))\n{}'.format(
+        ROS_MODULES, code)
+    process = subprocess.Popen([sys.executable, '-c', code], cwd=ROOT,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT)
+    output, _ = process.communicate()
+    return process.returncode, output.decode('utf-8', 'replace')
+
+
+class ImportWithoutRosTest(unittest.TestCase):
+    """The offline tools import without ROS installed."""
+
+    def assertImports(self, module):
+        status, output = run_without_ros('import ' + module)
+        self.assertEqual(status, 0, '{} needs ROS:\n{}'.format(module,
+                                                               output))
+
+    def test_replay(self):
+        self.assertImports('robot.vision.replay')
+
+    def test_benchmark(self):
+        self.assertImports('robot.vision.benchmark')
+
+    def test_harness(self):
+        self.assertImports('robot.nodes.harness')
+
+    def test_simulator(self):
+        # First, so nothing else has imported what it needs already.
+        self.assertImports('robot.simulator')
+
+    def test_tuning(self):
+        self.assertImports('robot.tuning')
+
+    def test_coalesce(self):
+        # First, since the Brain it's imported by imports it too.
+        self.assertImports('robot.coalesce')
+
+    def test_messages_are_plain(self):
+        status, output = run_without_ros(
+            'from robot.messages import String\n'
+            'assert String("stoplight").data == "stoplight"\n')
+        self.assertEqual(status, 0, output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+from __future__ import division, print_function
+
+import unittest
+
+from robot.nodes.latency import LatencyHistogram
+
+
+class LatencyHistogramTest(unittest.TestCase):
+    """A histogram's memory stays bounded over a long run."""
+
+    def test_long_run(self):
+        histogram = LatencyHistogram(seed=0)
+        count = 5 * histogram.RESERVOIR
+        for i in range(count):
+            histogram.add(i % 1000 / 10000)
+        self.assertEqual(len(histogram.samples), histogram.RESERVOIR)
+        self.assertEqual(histogram.counts.sum(), count)
+        report = histogram.report('total')
+        self.assertIn('{} samples'.format(count), report)
+        self.assertIn('mean 50.0 ms', report)
+        self.assertIn('max 99.9 ms', report)
+        p50 = float(report.split('p50 ')[1].split(' ms')[0])
+        self.assertAlmostEqual(p50, 50.0, delta=2.0)
+
+    def test_short_run(self):
+        histogram = LatencyHistogram()
+        for ms in (1, 2, 3):
+            histogram.add(ms / 1000)
+        self.assertIn('3 samples, mean 2.0 ms, p50 2.0 ms',
+                      histogram.report('total'))
+        self.assertEqual(LatencyHistogram().report('total'),
+                         'total: no samples')
@@ -0,0 +1,111 @@
+from __future__ import division, print_function
+
+import math
+import time
+import unittest
+
+import numpy as np
+
+from robot.course import START, Pose, load_floor
+from robot.nodes.drive_line import DriveLine
+from robot.nodes.localizer import ParticleFilter
+from robot.simulator import DiffDrive
+
+# The Brain's DriveLine's wheel radius and half-axle length, in cm.
+R = 5.0
+L = 19.5 / 2
+# How often frames arrive, in seconds.
+DT = 1 / 30
+
+
+def twist(left, right):
+    """The forward speed and turn rate of the DriveLine's wheel model."""
+    return R * (left + right) / 2, R * (left - right) / (2 * L)
+
+
+class ParticleFilterTest(unittest.TestCase):
+    """The particle filter tracks the robot on the course map."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.floor = load_floor()
+
+    def test_predict(self):
+        # Without noise, every particle drives the arc the wheels do.
+        particles = ParticleFilter(self.floor, count=10, start=START, seed=0)
+        particles.SPEED_NOISE = particles.TURN_NOISE = 0.0
+        particles.x[:], particles.y[:] = START.x, START.y
+        particles.heading[:] = START.heading
+        left, right = DriveLine(R, L).calcWheelSpeeds(8.0, 8.0, 0.3)
+        drive = DiffDrive(START, R, L)
+        drive.left, drive.right = left, right
+        v, w = twist(left, right)
+        for i in range(60):
+            particles.predict(v, w, DT)
+            drive.advance((i + 1) * DT)
+        np.testing.assert_allclose(particles.x, drive.pose.x, atol=0.1)
+        np.testing.assert_allclose(particles.y, drive.pose.y, atol=0.1)
+        np.testing.assert_allclose(particles.heading, drive.pose.heading,
+                                   atol=1e-6)
+
+    def test_converges_on_the_lane(self):
+        # Start a few cm or degrees off, and drive up the lane, seeing the
+        # lane error a particle at the true pose would.
+        for dx, dheading in ((10.0, 0.0), (-10.0, 0.0), (0.0, 0.2),
+                             (8.0, -0.15)):
+            start = Pose(START.x + dx, START.y, START.heading + dheading)
+            particles = ParticleFilter(self.floor, start=start, seed=1)
+            truth = ParticleFilter(self.floor, count=1, start=START, seed=0)
+            drive = DiffDrive(START, R, L)
+            drive.left, drive.right = 8.0, 7.6
+            v, w = twist(8.0, 7.6)
+            for i in range(60):
+                drive.advance((i + 1) * DT)
+                particles.predict(v, w, DT)
+                truth.x[:], truth.y[:] = drive.pose.x, drive.pose.y
+                truth.heading[:] = drive.pose.heading
+                errors, visible = truth.lane_errors()
+                if visible[0]:
+                    particles.observe_lane(errors[0])
+            pose, spread = particles.estimate()
+            off = math.hypot(pose.x - drive.pose.x, pose.y - drive.pose.y)
+            self.assertLess(off, 4.0, (dx, dheading))
+            self.assertLess(spread, 10.0, (dx, dheading))
+
+    def test_resample(self):
+        particles = ParticleFilter(self.floor, count=100, start=START, seed=0)
+        particles.weights[:] = 0.0
+        particles.weights[7] = 1.0
+        x = particles.x[7]
+        particles.resample()
+        np.testing.assert_array_equal(particles.x, x)
+        np.testing.assert_allclose(particles.weights, 1 / 100)
+
+    def test_estimate(self):
+        particles = ParticleFilter(self.floor, count=20000, start=START,
+                                   seed=0)
+        pose, spread = particles.estimate()
+        self.assertAlmostEqual(pose.x, START.x, delta=0.2)
+        self.assertAlmostEqual(pose.y, START.y, delta=0.2)
+        self.assertAlmostEqual(pose.heading, START.heading, delta=0.01)
+        # The start is spread 5cm each way.
+        self.assertAlmostEqual(spread, math.hypot(5.0, 5.0), delta=0.2)
+
+        # Headings average around the circle, not across it.
+        particles = ParticleFilter(self.floor, count=2, start=START, seed=0)
+        particles.heading[:] = (math.pi - 0.1, -math.pi + 0.1)
+        pose, _ = particles.estimate()
+        self.assertAlmostEqual(abs(pose.heading), math.pi)
+
+    def test_update_time(self):
+        # Thousands of particles in a few milliseconds an update.
+        particles = ParticleFilter(self.floor, count=2000, start=START,
+                                   seed=0)
+        seconds = []
+        for _ in range(100):
+            start = time.time()
+            particles.predict(40.0, 0.1, DT)
+            particles.observe_lane(0.1)
+            particles.estimate()
+            seconds.append(time.time() - start)
+        self.assertLess(np.median(seconds), 0.005)
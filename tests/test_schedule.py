@@ -0,0 +1,119 @@
+from __future__ import division, print_function
+
+import multiprocessing as mp
+import unittest
+
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+from robot.common import State
+from robot.vision.benchmark import NullPublisher
+from robot.vision.pipeline import VisionPipeline
+from robot.vision.schedule import STEERING, DetectorScheduler
+from robot.vision.stages import Job, SlotPool, StagedPipeline
+
+NAMES = ('lane', 'stoplight', 'obstacle', 'goal', 'node')
+
+
+def run(scheduler, state, frames, seconds):
+    """Have every due detector take the given time on some frames.
+
+    :returns: How many frames each detector ran on.
+    """
+    ran = dict.fromkeys(NAMES, 0)
+    for i in range(frames):
+        for name, _ in scheduler.due(state, i / 30):
+            scheduler.record(name, seconds)
+            ran[name] += 1
+        scheduler.end_frame(state)
+    return ran
+
+
+class GovernorTest(unittest.TestCase):
+    """The governor only slows down what the robot isn't steering by."""
+
+    def setUp(self):
+        self.scheduler = DetectorScheduler(dict((name, object())
+                                                for name in NAMES),
+                                           budget=1 / 30)
+
+    def test_off_by_default(self):
+        pipeline = VisionPipeline({'VISION_SUMMARY': NullPublisher()})
+        self.assertIsNone(pipeline.scheduler.budget)
+
+    def test_steering_detector_keeps_its_rate(self):
+        for state in (State.CANCER, State.SPIN, State.MTG, State.G_ON_PATH,
+                      State.NODE_STOPPING):
+            steering = STEERING[state]
+            ran = run(self.scheduler, state, 200, 0.1)
+            self.assertEqual(ran[steering], 200, state)
+
+    def test_throttles_the_rest(self):
+        ran = run(self.scheduler, State.CANCER, 200, 0.1)
+        self.assertEqual(ran['goal'], 200)
+        self.assertGreater(self.scheduler.divisor['obstacle'], 1)
+        self.assertLess(ran['obstacle'], 100)
+
+    def test_relaxes(self):
+        run(self.scheduler, State.CANCER, 200, 0.1)
+        run(self.scheduler, State.CANCER, 1000, 0.001)
+        self.assertEqual(self.scheduler.divisor['obstacle'], 1)
+
+    def test_counts_only_throttleable_frames(self):
+        run(self.scheduler, State.CANCER, 50, 0.02)
+        cost = self.scheduler.frame_cost
+        # The lane can't be slowed down, and the goal is steered by, so
+        # neither frame counts.
+        run(self.scheduler, State.ON_PATH, 50, 0.0)
+        self.scheduler.due(State.CANCER, 0.0)
+        self.scheduler.record('goal', 0.0)
+        self.scheduler.end_frame(State.CANCER)
+        self.assertEqual(self.scheduler.frame_cost, cost)
+
+
+class Broken(object):
+    """A detector that raises on every frame."""
+
+    def process_frame(self, frame):
+        raise ValueError('broken')
+
+
+class StagedTest(unittest.TestCase):
+    """The staged pipeline doesn't schedule frames it drops, and survives
+    detectors that raise."""
+
+    def test_dropped_frames(self):
+        staged = StagedPipeline(
+            VisionPipeline({'VISION_SUMMARY': NullPublisher()}), depth=1)
+        staged.inbox = mp.Queue(1)
+        self.addCleanup(staged.inbox.close)
+        staged.inbox.put(None)
+        scheduler = staged.pipeline.scheduler
+        last_run = dict(scheduler.last_run)
+        staged.process(b'', State.CANCER, 0.0)
+        self.assertEqual(staged.dropped, 1)
+        self.assertEqual(staged.sequence, 0)
+        self.assertEqual(scheduler.frame, 0)
+        self.assertEqual(scheduler.last_run, last_run)
+
+    def test_detector_raises(self):
+        staged = StagedPipeline(
+            VisionPipeline({'VISION_SUMMARY': NullPublisher()}), depth=1)
+        scheduler = staged.pipeline.scheduler
+        scheduler.detectors['lane'] = Broken()
+        ended = []
+        scheduler.end_frame = ended.append
+        staged.hsv_pool = SlotPool(1, (20, 640, 3))
+        slot = staged.hsv_pool.acquire()
+        staged.converted = Queue()
+        job = Job(1, 0.0, State.ON_PATH, ('lane',), 1, 460, 480, 0.0)
+        staged.converted.put((job, slot, (20, 640, 3), (0, 20), 460, 480,
+                              {'decode': 0.0, 'convert': 0.0}))
+        staged.converted.put(None)
+        # The thread carries on to the next item, and gives the slot back.
+        staged.detect_stage()
+        self.assertEqual(staged.hsv_pool.free.get(timeout=1), slot)
+        self.assertEqual(ended, [State.ON_PATH])
+        self.assertFalse(staged.times.latency)
@@ -0,0 +1,48 @@
+from __future__ import division, print_function
+
+import threading
+import unittest
+
+from robot.nodes.scheduler import Scheduler, VirtualClock
+
+
+def fail():
+    return 1 / 0
+
+
+class SchedulerErrorTest(unittest.TestCase):
+    """A callback that raises doesn't stop the scheduler."""
+
+    def test_virtual_clock_keeps_running(self):
+        scheduler = Scheduler(VirtualClock())
+        ticks = []
+        scheduler.call_every(0.01, fail)
+        scheduler.call_every(0.01, lambda: ticks.append(scheduler.clock.now))
+        scheduler.call_later(0.015, fail)
+        scheduler.run_until(0.1)
+        self.assertEqual(len(ticks), 10)
+
+    def test_thread_keeps_running(self):
+        scheduler = Scheduler()
+        ticked = threading.Event()
+        ticks = []
+
+        def tick():
+            ticks.append(None)
+            if len(ticks) >= 5:
+                ticked.set()
+
+        scheduler.call_soon(fail)
+        scheduler.call_every(0.01, tick)
+        scheduler.start()
+        thread = scheduler.thread
+        try:
+            ticked.wait(2)
+            self.assertTrue(thread.is_alive())
+            self.assertGreaterEqual(len(ticks), 5)
+        finally:
+            scheduler.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
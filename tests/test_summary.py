@@ -0,0 +1,44 @@
+from __future__ import division, print_function
+
+import unittest
+
+from robot.common import State
+from robot.summary import GOAL, NODE, decode, encode, summarize
+from robot.vision.pipeline import VisionPipeline
+from robot.vision.scenes import scenes
+
+
+class SummaryInbox(object):
+    """Keep the last summary published."""
+
+    def publish(self, msg):
+        self.summary = decode(msg)
+
+
+class SummaryTest(unittest.TestCase):
+    """Summaries carry every detector's confidence."""
+
+    def test_round_trip(self):
+        summary = summarize(1.5, 7, lane=0.25, goal=-0.5, node=0.75,
+                            confidence=1.0, goal_confidence=0.5,
+                            node_confidence=0.25, stoplight=True)
+        self.assertEqual(decode(encode(summary)), summary)
+        self.assertEqual(summarize(0.0, goal_confidence=0.5).valid, GOAL)
+
+    def test_confidences(self):
+        inbox = SummaryInbox()
+        pipeline = VisionPipeline({'VISION_SUMMARY': inbox})
+        found = {}
+        for scene in scenes():
+            for state in (State.CANCER, State.G_ON_PATH):
+                pipeline.process_decoded(scene.image, state, 0.0)
+                summary = inbox.summary
+                if summary.valid & GOAL:
+                    found['goal'] = max(found.get('goal', 0.0),
+                                        summary.goal_confidence)
+                if summary.valid & NODE:
+                    found['node'] = max(found.get('node', 0.0),
+                                        summary.node_confidence)
+        for name in ('goal', 'node'):
+            self.assertGreater(found[name], 0.0, name)
+            self.assertLessEqual(found[name], 1.0, name)
@@ -0,0 +1,74 @@
+from __future__ import division, print_function
+
+import unittest
+
+from robot.vision.tracker import LaneTracker
+
+# How often frames arrive, in seconds.
+DT = 1 / 30
+
+
+def follow(tracker, columns, start=0):
+    """Track the lane through some frames' measured columns."""
+    for i, column in enumerate(columns):
+        tracker.predict((start + i) * DT)
+        tracker.update(column)
+
+
+class LaneTrackerTest(unittest.TestCase):
+    """The tracker follows a lane moving at a constant speed."""
+
+    def setUp(self):
+        self.tracker = LaneTracker(640)
+        # The lane drifts right 3 pixels a frame.
+        self.lane = [100 + 3 * i for i in range(60)]
+        follow(self.tracker, self.lane)
+
+    def test_converges(self):
+        self.assertAlmostEqual(self.tracker.x, self.lane[-1], delta=1.0)
+        self.assertAlmostEqual(self.tracker.v, 3.0, delta=0.2)
+        self.assertGreater(self.tracker.confidence, 0.5)
+        # Once it's converged, it only searches near the lane.
+        left, right = self.tracker.window()
+        self.assertLess(right - left, 2 * LaneTracker.MIN_WINDOW + 1)
+
+    def test_rejects_outlier(self):
+        # A blob well away from the lane is outside the search window, so
+        # it's never measured.
+        self.tracker.predict(60 * DT)
+        left, right = self.tracker.window()
+        self.assertFalse(left <= 280 + 150 < right)
+        # A noisy measurement in the window only pulls the estimate part of
+        # the way, and the lane pulls it straight back.
+        self.tracker.update(280 + 30)
+        self.assertLess(self.tracker.x - 280, 25)
+        follow(self.tracker, [283 + 3 * i for i in range(30)], start=61)
+        self.assertAlmostEqual(self.tracker.x, 283 + 3 * 29, delta=2.0)
+
+    def test_coasts(self):
+        # Without a measurement, the lane keeps moving at its speed, and the
+        # window widens while we look for it.
+        self.tracker.predict(60 * DT)
+        left, right = self.tracker.window()
+        self.tracker.update(None)
+        self.assertTrue(self.tracker.tracking)
+        self.assertAlmostEqual(self.tracker.x, 280, delta=1.5)
+        self.tracker.predict(61 * DT)
+        self.assertAlmostEqual(self.tracker.x, 283, delta=1.5)
+        wider = self.tracker.window()
+        self.assertGreater(wider[1] - wider[0], right - left)
+        self.assertLess(self.tracker.confidence, 0.5)
+
+        # It picks the lane back up where it expected it.
+        self.tracker.update(283)
+        self.assertEqual(self.tracker.misses, 0)
+        self.assertAlmostEqual(self.tracker.x, 283, delta=1.0)
+
+    def test_gives_up(self):
+        follow(self.tracker, [None] * (LaneTracker.MAX_MISSES + 1), start=60)
+        self.assertFalse(self.tracker.tracking)
+        self.assertEqual(self.tracker.window(), (0, 640))
+
+    def test_starts_over_after_a_gap(self):
+        self.tracker.predict(60 * DT + LaneTracker.MAX_GAP + 0.1)
+        self.assertFalse(self.tracker.tracking)
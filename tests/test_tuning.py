@@ -0,0 +1,28 @@
+from __future__ import division, print_function
+
+import unittest
+
+import numpy as np
+
+from robot.tuning import Gains, Scenario, evaluate, stock, ticks
+
+
+class EvaluateTest(unittest.TestCase):
+    """evaluate() drives the robot the way the Brain does."""
+
+    def setUp(self):
+        self.times = ticks(10.0)
+        straight = np.zeros_like(self.times)
+        self.centered = Scenario('centered', 0.0, straight, straight)
+
+    def test_trim(self):
+        # With no steering, the left wheel's trim turns the robot off a
+        # straight lane.
+        still = Gains(np.zeros(1), np.zeros(1), np.zeros(1))
+        scores = evaluate(still, [self.centered], self.times)
+        self.assertGreater(scores.settling[0, 0], 0)
+
+    def test_holds_the_lane(self):
+        scores = evaluate(stock(), [self.centered], self.times)
+        self.assertFalse(scores.lost.any())
+
@@ -0,0 +1,92 @@
+#!/usr/bin/env python2
+from __future__ import division, print_function
+
+import argparse
+import time
+
+import numpy as np
+
+from robot.tuning import (evaluate, grid, plant_scenarios, ranked,
+                          recorded_errors, stock, ticks, trace_scenario)
+
+
+def gain_range(name, default):
+    """Add a MIN MAX COUNT gain range argument to a parser."""
+    return dict(type=float, nargs=3, metavar=('MIN', 'MAX', 'COUNT'),
+                default=default,
+                help='The {} gains to try. Default is {} {} {:.0f}'.format(
+                    name, *default))
+
+
+def parse_args():
+    """Parse the gain tuner's commandline arguments."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--kp', **gain_range('Kp', [0.0, 8.0, 81]))
+    parser.add_argument('--ki', **gain_range('Ki', [0.0, 0.2, 5]))
+    parser.add_argument('--kd', **gain_range('Kd', [0.0, 4.0, 41]))
+    parser.add_argument(
+        '--seconds',
+        type=float,
+        default=10.0,
+        help='How long to line follow each scenario for, in seconds. '
+             'Default is 10')
+    parser.add_argument(
+        '--recording',
+        action='append',
+        default=[],
+        help='Also follow a lane that moves like the lane error in this '
+             'recording, without extension.')
+    parser.add_argument(
+        '--no-plant',
+        action='store_true',
+        default=False,
+        help="Don't score the stock offset and bend scenarios, only the "
+             'recordings.')
+    parser.add_argument(
+        '--event-driven',
+        action='store_true',
+        default=False,
+        help='Step the brain on sensor data, instead of polling at 100 Hz.')
+    parser.add_argument(
+        '--top',
+        type=int,
+        default=10,
+        help='How many of the best gain sets to print. Default is 10')
+    return parser.parse_args()
+
+
+def main(args):
+    """Score a grid of DriveLine gains, and print the best of them."""
+    times = ticks(args.seconds)
+    scenarios = [] if args.no_plant else plant_scenarios(times)
+    for path in args.recording:
+        stamps, errors = recorded_errors(path)
+        scenarios.append(trace_scenario(path, stamps, errors, times))
+    if not scenarios:
+        raise SystemExit('Nothing to score the gains on.')
+
+    gains = grid(*[np.linspace(low, high, int(count))
+                   for low, high, count in (args.kp, args.ki, args.kd)])
+    start = time.time()
+    scores = evaluate(gains, scenarios, times, args.event_driven)
+    elapsed = time.time() - start
+    baseline = evaluate(stock(), scenarios, times, args.event_driven)
+
+    print('Scored {} gain sets on {} scenarios in {:.2f}s.'.format(
+        len(scores.cost), len(scenarios), elapsed))
+    print('{:>6} {:>6} {:>6} {:>8} {:>9} {:>9} {:>9} {:>5}'.format(
+        'Kp', 'Ki', 'Kd', 'cost', 'overshoot', 'settling', 'crossings',
+        'lost'))
+    rows = [(baseline, 0, ' (stock)')]
+    rows.extend((scores, i, '') for i in ranked(scores, args.top))
+    for result, i, note in rows:
+        print('{:6.2f} {:6.2f} {:6.2f} {:8.2f} {:9.3f} {:8.2f}s {:9.1f} '
+              '{:>5}{}'.format(
+                  result.gains.kp[i], result.gains.ki[i], result.gains.kd[i],
+                  result.cost[i], result.overshoot[i].mean(),
+                  result.settling[i].mean(), result.crossings[i].mean(),
+                  int(result.lost[i].sum()), note))
+
+
+if __name__ == "__main__":
+    main(parse_args())